@@ -4,19 +4,24 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 import os
+import time
 import datetime
+import tempfile
 
 from ansible.errors import AnsibleError, AnsibleActionFail
 from ansible.module_utils._text import to_text, to_native
 from ansible.module_utils.six import string_types
+from ansible.module_utils.six.moves import shlex_quote
 from ansible.module_utils.parsing.convert_bool import boolean
 from ansible.plugins.action import ActionBase
 from ansible.utils.display import Display
 from ansible.utils.hashing import checksum
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_compression
 __ibmi_module_version__ = "2.0.1"
 
 display = Display()
+IBMi_COPY_COMPRESSION = ['none', 'gzip']
 
 
 class ActionModule(ActionBase):
@@ -25,6 +30,7 @@ class ActionModule(ActionBase):
         'lib_name',
         'force',
         'backup',
+        'compression',
     ))
 
     def _calculate_savf_path(self, savefile_name, lib_name):
@@ -66,6 +72,29 @@ class ActionModule(ActionBase):
 
         return savf_name, savf_path, msg
 
+    def _transfer_gzip(self, src, savefile_path, task_vars):
+        '''Compresses src on local, puts it to the remote tmp dir and decompresses it to the save file.
+        Returns the bytes transferred'''
+        fd, local_gz = tempfile.mkstemp(suffix='.gz')
+        os.close(fd)
+        tmpdir = self._connection._shell.tmpdir or self._make_tmp_path()
+        remote_file = self._connection._shell.join_path(tmpdir, os.path.basename(savefile_path))
+        remote_gz = remote_file + '.gz'
+        try:
+            compressed_bytes = ibmi_compression.gzip_file(src, local_gz)
+            display.debug(f"ibm i debug: transfer {local_gz} to {remote_gz}")
+            self._transfer_file(local_gz, remote_gz)
+        finally:
+            os.remove(local_gz)
+        self._fixup_perms2((tmpdir, remote_gz))
+        cmd = f'gzip -dc {shlex_quote(remote_gz)} > {shlex_quote(remote_file)} && cp {shlex_quote(remote_file)} {shlex_quote(savefile_path)}'
+        module_output = self._execute_module(module_name='command', module_args={'_raw_params': cmd, '_uses_shell': True}, task_vars=task_vars)
+        if module_output.get('rc') == ibmi_compression.GZIP_NOT_FOUND_RC:
+            raise AnsibleError(ibmi_compression.GZIP_NOT_FOUND_MSG)
+        if module_output.get('rc') != 0:
+            raise AnsibleError(f"Failed to decompress {remote_gz} to {savefile_path}: {module_output.get('stderr')}")
+        return compressed_bytes
+
     def run(self, tmp=None, task_vars=None):
 
         display.debug("version: " + __ibmi_module_version__)
@@ -102,6 +131,7 @@ class ActionModule(ActionBase):
             lib_name = self._task.args.get('lib_name', None)
             force = boolean(self._task.args.get('force', False), strict=True)
             backup = boolean(self._task.args.get('backup', False), strict=True)
+            compression = self._task.args.get('compression', 'none')
 
             if lib_name is None:
                 result['msg'] = "lib_name is required."
@@ -110,6 +140,8 @@ class ActionModule(ActionBase):
             # validate dest are strings FIXME: use basic.py and module specs
             elif not isinstance(src, string_types):
                 result['msg'] = "Invalid type supplied for src option, it must be a string."
+            elif compression not in IBMi_COPY_COMPRESSION:
+                result['msg'] = f"compression can only be one of {', '.join(IBMi_COPY_COMPRESSION)}."
 
             if result.get('msg'):
                 result['failed'] = True
@@ -187,8 +219,13 @@ class ActionModule(ActionBase):
                 result['rc'] = save_result['rc']
                 result['failed'] = True
                 return result
-            display.debug(f"ibm i debug: transfer {src} to {savefile_path}")
-            self._transfer_file(src, savefile_path)
+            if compression == 'gzip':
+                transfer_start = time.time()
+                compressed_bytes = self._transfer_gzip(src, savefile_path, task_vars)
+                result['compression_summary'] = ibmi_compression.summary(os.path.getsize(src), compressed_bytes, time.time() - transfer_start)
+            else:
+                display.debug(f"ibm i debug: transfer {src} to {savefile_path}")
+                self._transfer_file(src, savefile_path)
 
             local_checksum = checksum(src)
             remote_stat = None
@@ -223,4 +260,6 @@ class ActionModule(ActionBase):
                     result['msg'] += f"Failed to delete the new created save file {savefile_path} on remote. "
                     result['job_log'] = save_result['job_log']
 
+            self._remove_tmp_path(self._connection._shell.tmpdir)
+
         return result
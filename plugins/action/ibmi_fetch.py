@@ -4,21 +4,32 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 import os
+import re
+import time
+import gzip
 import base64
+import hashlib
 import datetime
 
 from ansible.errors import AnsibleError
 from ansible.module_utils._text import to_text
 from ansible.module_utils._text import to_bytes
 from ansible.module_utils.six import string_types
+from ansible.module_utils.six.moves import shlex_quote
 from ansible.module_utils.parsing.convert_bool import boolean
 from ansible.plugins.action import ActionBase
 from ansible.utils.display import Display
-from ansible.utils.hashing import checksum, checksum_s, md5, secure_hash
+from ansible.utils.hashing import checksum, md5, secure_hash
 from ansible.utils.path import makedirs_safe
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_compression
 __ibmi_module_version__ = "2.0.1"
 
 ifs_dir = '/tmp/.ansible'
+# Bytes of the save file read by one command when the file is fetched in chunks,
+# the memory used on both nodes is bounded by it
+IBMi_FETCH_CHUNK_SIZE = 16 * 1024 * 1024
+IBMi_FETCH_COMPRESSION = ['none', 'low', 'medium', 'high', 'gzip']
+SHA1_HEX_PATTERN = re.compile(r'^[0-9a-fA-F]{40}$')
 display = Display()
 
 
@@ -36,6 +47,7 @@ class ActionModule(ActionBase):
         'dest',
         'flat',
         'validate_checksum',
+        'compression',
     ))
 
     def _calculate_savf_path(self, object_names, lib_name):
@@ -91,6 +103,104 @@ class ActionModule(ActionBase):
                 savf_path = f'/QSYS.LIB/{savefile_name}.FILE'
         return savf_name, savf_path
 
+    def _copy_to_ifs(self, savf_path, task_vars, result):
+        '''Copies the save file to ifs_dir. Returns False with result updated if the copy failed'''
+        commandmk = f'mkdir {ifs_dir}'
+        command = f'cp {savf_path} {ifs_dir}'
+
+        module_output = self._execute_module(module_name='command', module_args={'_raw_params': commandmk}, task_vars=task_vars)
+        save_result = module_output
+        rc = save_result['rc']
+        if rc != 0 and ('exists' not in save_result['stderr']):
+            result['msg'] = save_result['msg']
+            result['stderr'] = save_result['stderr_lines']
+            result['rc'] = save_result['rc']
+            result['failed'] = True
+            return False
+        module_output = self._execute_module(module_name='command', module_args={'_raw_params': command}, task_vars=task_vars)
+        save_result = module_output
+        rc = save_result['rc']
+        if rc != 0:
+            result['msg'] = save_result['msg']
+            result['failed'] = True
+            result['stderr'] = save_result['stderr_lines']
+            result['stdout'] = save_result['stdout_lines']
+            result['rc'] = save_result['rc']
+            return False
+        return True
+
+    def _remote_checksum(self, source, task_vars):
+        '''Returns the sha1 checksum of the remote file computed on the remote node, None if it
+        cannot be read'''
+        command = f'openssl dgst -sha1 < {shlex_quote(source)}'
+        module_output = self._execute_module(module_name='command', module_args={'_raw_params': command, '_uses_shell': True},
+                                             task_vars=task_vars)
+        if module_output.get('rc') != 0:
+            return None
+        # e.g. SHA1(stdin)= 2aae6c35...
+        digest = module_output.get('stdout', '').strip().rsplit(' ', 1)[-1]
+        return digest.lower() if SHA1_HEX_PATTERN.match(digest) else None
+
+    def _fetch_gzip(self, source, dest, task_vars):
+        '''Compresses the remote file to the remote tmp dir, fetches it and decompresses it to dest.
+        Returns the sha1 checksum of the data decompressed and the bytes fetched'''
+        tmpdir = self._connection._shell.tmpdir or self._make_tmp_path()
+        remote_gz = self._connection._shell.join_path(tmpdir, os.path.basename(source) + '.gz')
+        command = f'gzip -c {shlex_quote(source)} > {shlex_quote(remote_gz)}'
+        module_output = self._execute_module(module_name='command', module_args={'_raw_params': command, '_uses_shell': True},
+                                             task_vars=task_vars)
+        if module_output.get('rc') == ibmi_compression.GZIP_NOT_FOUND_RC:
+            raise AnsibleError(ibmi_compression.GZIP_NOT_FOUND_MSG)
+        if module_output.get('rc') != 0:
+            raise AnsibleError(f"Failed to compress {source}: {module_output.get('stderr')}")
+        local_gz = dest + '.gz'
+        try:
+            self._connection.fetch_file(remote_gz, local_gz)
+            compressed_bytes = os.path.getsize(local_gz)
+            size, new_checksum = ibmi_compression.gunzip_file(local_gz, dest)
+        finally:
+            if os.path.exists(local_gz):
+                os.remove(local_gz)
+        return new_checksum, compressed_bytes
+
+    def _fetch_chunked(self, source, dest, task_vars, compress=False):
+        '''Reads the remote file IBMi_FETCH_CHUNK_SIZE bytes at a time and writes the chunks to dest,
+        the digest is updated as the chunks arrive. With compress, each chunk is gzip compressed on
+        the remote node. Returns the sha1 checksum of the data fetched and the bytes transferred'''
+        digest = hashlib.sha1()
+        transferred = 0
+        part = to_bytes(dest + '.part', errors='surrogate_or_strict')
+        chunk = 0
+        try:
+            with open(part, 'wb') as f:
+                while True:
+                    command = f'dd if={shlex_quote(source)} bs={IBMi_FETCH_CHUNK_SIZE} skip={chunk} count=1 2>/dev/null'
+                    if compress:
+                        command += ' | gzip -c'
+                    command += ' | openssl base64'
+                    module_output = self._execute_module(module_name='command', module_args={'_raw_params': command, '_uses_shell': True},
+                                                         task_vars=task_vars)
+                    if module_output.get('rc') != 0:
+                        raise AnsibleError(f"Failed to read {source} at byte {chunk * IBMi_FETCH_CHUNK_SIZE}: {module_output.get('stderr')}")
+                    data = base64.b64decode(module_output.get('stdout', ''))
+                    transferred += len(data)
+                    if compress:
+                        # the gzip output is never empty, even for an empty chunk
+                        if not data:
+                            raise AnsibleError(f"Failed to compress {source}. {ibmi_compression.GZIP_NOT_FOUND_MSG}")
+                        data = gzip.decompress(data)
+                    f.write(data)
+                    digest.update(data)
+                    if len(data) < IBMi_FETCH_CHUNK_SIZE:
+                        break
+                    chunk += 1
+            os.rename(part, to_bytes(dest, errors='surrogate_or_strict'))
+        except Exception:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        return digest.hexdigest(), transferred
+
     def run(self, tmp=None, task_vars=None):
 
         display.debug("version: " + __ibmi_module_version__)
@@ -143,6 +253,7 @@ class ActionModule(ActionBase):
             dest = self._task.args.get('dest', None)
             flat = boolean(self._task.args.get('flat', False), strict=True)
             validate_checksum = boolean(self._task.args.get('validate_checksum', True), strict=True)
+            compression = self._task.args.get('compression', 'none')
 
             # validate dest are strings FIXME: use basic.py and module specs
             if not isinstance(dest, string_types):
@@ -168,6 +279,9 @@ class ActionModule(ActionBase):
             if format != "*SAVF":
                 result['msg'] = "format can only be *SAVF."
 
+            if compression not in IBMi_FETCH_COMPRESSION:
+                result['msg'] = f"compression can only be one of {', '.join(IBMi_FETCH_COMPRESSION)}."
+
             if result.get('msg'):
                 result['failed'] = True
                 return result
@@ -203,17 +317,19 @@ class ActionModule(ActionBase):
                         result.update(save_result)
                         return result
             if is_savf is False:
+                # the data compression of the save command, a save file fetched directly is sent as it is
+                save_compression = f' DTACPR(*{compression.upper()})' if compression in ('low', 'medium', 'high') else ''
                 savf_name, savf_path = self._calculate_savf_name(object_names, lib_name, is_lib, savefile_name, task_vars,
                                                                  result)
                 if is_lib is True:
-                    omitfile = f'OMITOBJ(({lib_name}/{savf_name} *FILE))'
+                    omitfile = f'OMITOBJ(({lib_name}/{savf_name} *FILE)){save_compression}'
                     module_args = {'lib_name': lib_name, 'savefile_name': savf_name, 'savefile_lib': lib_name,
                                    'target_release': target_release, 'force_save': force_save, 'joblog': True,
                                    'parameters': omitfile}
                     display.debug(f"ibm i debug: call ibmi_lib_save {module_args}")
                     module_output = self._execute_module(module_name='ibmi_lib_save', module_args=module_args, task_vars=task_vars)
                 else:
-                    omitfile = f'OMITOBJ(({lib_name}/{savf_name} *FILE))'
+                    omitfile = f'OMITOBJ(({lib_name}/{savf_name} *FILE)){save_compression}'
                     module_args = {'object_names': object_names, 'object_lib': lib_name, 'object_types': object_types,
                                    'savefile_name': savf_name, 'savefile_lib': lib_name, 'target_release': target_release,
                                    'force_save': force_save, 'joblog': True, 'parameters': omitfile}
@@ -232,72 +348,25 @@ class ActionModule(ActionBase):
                     return result
                 created = True
 
-            source = savf_path
-            commandmk = f'mkdir {ifs_dir}'
-            command = f'cp {savf_path} {ifs_dir}'
-
-            module_output = self._execute_module(module_name='command', module_args={'_raw_params': commandmk}, task_vars=task_vars)
-            save_result = module_output
-            rc = save_result['rc']
-            if rc != 0 and ('exists' not in save_result['stderr']):
-                result['msg'] = save_result['msg']
-                result['stderr'] = save_result['stderr_lines']
-                result['rc'] = save_result['rc']
-                result['failed'] = True
-                return result
-            module_output = self._execute_module(module_name='command', module_args={'_raw_params': command}, task_vars=task_vars)
-            save_result = module_output
-            rc = save_result['rc']
-            if rc != 0:
-                result['msg'] = save_result['msg']
-                result['failed'] = True
-                result['stderr'] = save_result['stderr_lines']
-                result['stdout'] = save_result['stdout_lines']
-                result['rc'] = save_result['rc']
+            # the save file is read straight from its /QSYS.LIB path, it is only copied to an
+            # IFS stream file if the connection cannot read it
+            source = self._connection._shell.join_path(savf_path)
+            # Force execute_remote_stat to follow symlinks because fetch always follows symlinks
+            remote_stat = self._execute_remote_stat(source, all_vars=task_vars, follow=True)
+            if not remote_stat['exists']:
+                result['msg'] = "the remote file does not exist, not transferring"
+                result['file'] = source
+                result['changed'] = False
                 return result
-            ifs_created = True
-
-            source = f'{ifs_dir}/{os.path.basename(savf_path)}'
-            if not isinstance(source, string_types):
-                result['msg'] = "Invalid type supplied for source option, it must be a string"
+            # empty when the file cannot be read by the stat module, the file is hashed by a
+            # command on the remote node then
+            remote_checksum = remote_stat['checksum'] or self._remote_checksum(source, task_vars)
+            if remote_checksum is None and validate_checksum:
+                result['changed'] = False
+                result['file'] = source
+                result['msg'] = "unexpected error: unable to calculate the checksum of the remote file"
                 result['failed'] = True
                 return result
-            source = self._connection._shell.join_path(source)
-            source = self._remote_expand_user(source)
-            remote_stat = None
-            remote_checksum = None
-            if not self._connection.become:
-                # calculate checksum for the remote file, don't bother if using become as slurp will be used
-                # Force execute_remote_stat to follow symlinks because fetch always follows symlinks
-                remote_stat = self._execute_remote_stat(source, all_vars=task_vars, follow=True)
-                remote_checksum = remote_stat['checksum']
-
-            # use slurp if permissions are lacking or another issue
-            remote_data = None
-            if remote_checksum in ('1', '', None):
-                slurpres = self._execute_module(module_name='slurp', module_args=dict(src=source), task_vars=task_vars)
-                if slurpres.get('failed'):
-                    if (slurpres.get('msg').startswith('file not found') or remote_checksum == '1'):
-                        result['msg'] = "the remote file does not exist, not transferring"
-                        result['file'] = source
-                        result['changed'] = False
-                    else:
-                        result.update(slurpres)
-                    return result
-                else:
-                    if slurpres['encoding'] == 'base64':
-                        remote_data = base64.b64decode(slurpres['content'])
-                    if remote_data is not None:
-                        remote_checksum = checksum_s(remote_data)
-                    else:
-                        # Unexpected error case
-                        remote_checksum = None
-                    # the source path may have been expanded on the
-                    # target system, so we compare it here and use the
-                    # expanded version if it's different
-                    remote_source = slurpres.get('source')
-                    if remote_source and remote_source != source:
-                        source = remote_source
 
             # calculate the destination name
             if os.path.sep not in self._connection._shell.join_path('a', ''):
@@ -323,35 +392,50 @@ class ActionModule(ActionBase):
                 dest = f"{self._loader.path_dwim(dest)}/{target_name}/{source_local}"
 
             dest = os.path.normpath(dest)
-            if remote_checksum is None:
-                result['changed'] = False
-                result['file'] = source
-                result['msg'] = "unexpected error: unable to calculate the checksum of the remote file"
-                result['failed'] = True
-                return result
 
             # calculate checksum for the local file
             local_checksum = checksum(dest)
-            if remote_checksum != local_checksum:
+            # without a checksum of the remote file, the local file cannot be known to be the same
+            if remote_checksum is None or remote_checksum != local_checksum:
                 # create the containing directories, if needed
                 makedirs_safe(os.path.dirname(dest))
 
                 # fetch the file and check for changes
-                display.debug(f"ibm i debug: fetch {source} {dest}")
-                if remote_data is None:
-                    self._connection.fetch_file(source, dest)
+                fetch_start = time.time()
+                stream_gzip = compression == 'gzip'
+                if self._connection.become:
+                    # fetch_file reads as the remote user, the become user reads the chunks
+                    display.debug(f"ibm i debug: fetch {source} {dest} in chunks")
+                    method = 'chunked'
+                    new_checksum, transferred_bytes = self._fetch_chunked(source, dest, task_vars, compress=stream_gzip)
+                elif stream_gzip:
+                    display.debug(f"ibm i debug: fetch {source} {dest} compressed")
+                    method = 'gzip'
+                    new_checksum, transferred_bytes = self._fetch_gzip(source, dest, task_vars)
                 else:
-                    re_raise = False  # workaround to pass the raise-missing-from pylint issue
-                    inst = None
+                    display.debug(f"ibm i debug: fetch {source} {dest}")
+                    method = 'fetch_file'
                     try:
-                        with open(to_bytes(dest, errors='surrogate_or_strict'), 'wb') as f:
-                            f.write(remote_data)
-                    except (IOError, OSError) as e:
-                        re_raise = True
-                        inst = e
-                    if re_raise:
-                        raise AnsibleError(f"Failed to fetch the file: {inst}")
-                new_checksum = secure_hash(dest)
+                        self._connection.fetch_file(source, dest)
+                    except AnsibleError as e:
+                        display.debug(f"ibm i debug: fetch {source} failed, copy it to {ifs_dir}: {to_text(e)}")
+                        ifs_created = self._copy_to_ifs(savf_path, task_vars, result)
+                        if not ifs_created:
+                            return result
+                        method = 'ifs_copy'
+                        source = self._remote_expand_user(self._connection._shell.join_path(f'{ifs_dir}/{os.path.basename(savf_path)}'))
+                        self._connection.fetch_file(source, dest)
+                    new_checksum = secure_hash(dest)
+                fetch_seconds = time.time() - fetch_start
+                fetched_bytes = os.path.getsize(dest)
+                result['transfer_summary'] = dict(
+                    method=method,
+                    bytes=fetched_bytes,
+                    seconds=round(fetch_seconds, 3),
+                    bytes_per_second=int(fetched_bytes / fetch_seconds) if fetch_seconds > 0 else fetched_bytes,
+                )
+                if stream_gzip:
+                    result['compression_summary'] = ibmi_compression.summary(fetched_bytes, transferred_bytes, fetch_seconds)
                 # For backwards compatibility. We'll return None on FIPS enabled systems
                 try:
                     new_md5 = md5(dest)
@@ -17,6 +17,9 @@ class ActionModule(ActionBase):
         'dest',
         'remote_user',
         'private_key',
+        'max_channels',
+        'only_changed',
+        'checksum_database',
     ))
 
     def run(self, tmp=None, task_vars=None):
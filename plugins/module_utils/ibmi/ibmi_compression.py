@@ -0,0 +1,58 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# gzip stream compression of the save files sent between the controller and an
+# IBM i node. The controller side is done here with the gzip module, a chunk at
+# a time, the IBM i side by the gzip command of PASE (yum install gzip). The
+# save files written on the controller are hashed while they are decompressed.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import gzip
+import shutil
+import hashlib
+
+IBMi_COMPRESSION_CHUNK_SIZE = 1024 * 1024
+IBMi_GZIP_LEVEL = 6
+# rc of the shell when the gzip command is not found
+GZIP_NOT_FOUND_RC = 127
+GZIP_NOT_FOUND_MSG = 'gzip is not found on the IBM i node, install it by yum or set compression to none. '
+
+
+def gzip_file(src, dest, level=IBMi_GZIP_LEVEL):
+    '''Compresses the file src to dest. Returns the bytes of dest'''
+    with open(src, 'rb') as f_in:
+        with open(dest, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=level) as f_out:
+                shutil.copyfileobj(f_in, f_out, IBMi_COMPRESSION_CHUNK_SIZE)
+            return raw.tell()
+
+
+def gunzip_file(src, dest, algorithm='sha1'):
+    '''Decompresses the gzip file src to dest. Returns the bytes of dest and their hex digest'''
+    digest = hashlib.new(algorithm)
+    size = 0
+    with gzip.open(src, 'rb') as f_in:
+        with open(dest, 'wb') as f_out:
+            while True:
+                data = f_in.read(IBMi_COMPRESSION_CHUNK_SIZE)
+                if not data:
+                    break
+                f_out.write(data)
+                digest.update(data)
+                size += len(data)
+    return size, digest.hexdigest()
+
+
+def summary(uncompressed_bytes, compressed_bytes, seconds):
+    '''Returns a dict of the bytes before and after compression, their ratio and the seconds saved
+    compared to transferring the uncompressed bytes at the throughput measured. seconds is the
+    wall-clock time of the compression, transfer and decompression'''
+    ratio = uncompressed_bytes / compressed_bytes if compressed_bytes else 1.0
+    return dict(
+        uncompressed_bytes=uncompressed_bytes,
+        compressed_bytes=compressed_bytes,
+        ratio=round(ratio, 2),
+        seconds=round(seconds, 3),
+        estimated_seconds_saved=round(seconds * (ratio - 1), 3),
+    )
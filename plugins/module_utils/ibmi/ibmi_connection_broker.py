@@ -0,0 +1,667 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+# Opt-in connection broker for the IBM i managed node.
+#
+# The broker is a long-lived process, forked by the first IBMiModule that finds
+# it enabled but not running. It keeps a pool of ibm_db_dbi connections keyed by
+# (database, become user) and serves them over a Unix socket, so consecutive
+# tasks reuse one QZDASOINIT job instead of connecting, swapping the profile and
+# disconnecting every time.
+#
+# A task borrows a connection for its whole life. The BrokeredConnection object
+# returned to the task implements the part of the PEP-249 connection and cursor
+# API that the modules and itoolkit DatabaseTransport use, every call is
+# forwarded to the broker which runs it on the pooled connection.
+#
+# Enable it in ibmi_ansible.cfg, for example with ibmi_module_config:
+#     {
+#         "connection_broker":
+#         {
+#             "enabled": true,
+#             "max_size": 8,
+#             "idle_timeout": 300,
+#             "health_check_interval": 60
+#         }
+#     }
+
+import os
+import json
+import time
+import errno
+import fcntl
+import base64
+import socket
+import struct
+import hashlib
+import datetime
+import decimal
+import tempfile
+import threading
+
+import socketserver
+import collections
+
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_logging
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+
+try:
+    import ibm_db_dbi as dbi
+    HAS_IBM_DB = True
+except ImportError:
+    HAS_IBM_DB = False
+
+BROKER_CONFIG_SECTION = 'connection_broker'
+BROKER_DEFAULT_MAX_SIZE = 8
+BROKER_DEFAULT_IDLE_TIMEOUT = 300
+BROKER_DEFAULT_HEALTH_CHECK_INTERVAL = 60
+BROKER_START_TIMEOUT = 10
+BROKER_FETCH_SIZE = 500
+
+# Column type objects of ibm_db_dbi, the broker sends the name and the client
+# maps it back so comparisons like `col_type in [dbi.STRING]` keep working.
+DBI_TYPE_NAMES = ['STRING', 'TEXT', 'XML', 'BINARY', 'NUMBER', 'BIGINT', 'FLOAT', 'DECIMAL',
+                  'DATE', 'TIME', 'DATETIME', 'ROWID']
+
+_HEADER = struct.Struct('!I')
+
+
+class BrokerError(Exception):
+    pass
+
+
+def get_broker_settings():
+    settings = dict(
+        enabled=False,
+        max_size=BROKER_DEFAULT_MAX_SIZE,
+        idle_timeout=BROKER_DEFAULT_IDLE_TIMEOUT,
+        health_check_interval=BROKER_DEFAULT_HEALTH_CHECK_INTERVAL,
+    )
+    config = ibmi_logging.read_ansible_config().get(BROKER_CONFIG_SECTION)
+    if isinstance(config, dict):
+        for key in settings:
+            if key in config:
+                settings[key] = config[key]
+    return settings
+
+
+def get_socket_path():
+    return os.path.join(tempfile.gettempdir(), f'ibmi_ansible_broker_{os.getuid()}', 'broker.sock')
+
+
+def get_pool_key(db_name, become_user_name=None, become_user_password=None):
+    """The password only goes into a digest, so a pooled profile swap is only
+    reused by a task that presents the same credentials."""
+    user = become_user_name.upper() if become_user_name else ''
+    digest = ''
+    if become_user_name and become_user_password is not None:
+        digest = hashlib.sha256(('%s:%s' % (user, become_user_password)).encode('utf-8')).hexdigest()
+    return '|'.join([(db_name or ibmi_util.SYSBAS).upper(), user, digest])
+
+
+# Wire format: a 4 byte length followed by a JSON document. Values that JSON
+# cannot carry are tagged.
+def _encode_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'__b__': base64.b64encode(bytes(value)).decode('ascii')}
+    if isinstance(value, decimal.Decimal):
+        return {'__dec__': str(value)}
+    if isinstance(value, datetime.datetime):
+        return {'__dt__': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'__d__': value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {'__t__': value.isoformat()}
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(v) for v in value]
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    if isinstance(value, dict) and len(value) == 1:
+        tag, data = next(iter(value.items()))
+        if tag == '__b__':
+            return base64.b64decode(data)
+        if tag == '__dec__':
+            return decimal.Decimal(data)
+        if tag == '__dt__':
+            return datetime.datetime.strptime(data, '%Y-%m-%dT%H:%M:%S.%f' if '.' in data else '%Y-%m-%dT%H:%M:%S')
+        if tag == '__d__':
+            return datetime.datetime.strptime(data, '%Y-%m-%d').date()
+        if tag == '__t__':
+            return datetime.datetime.strptime(data, '%H:%M:%S.%f' if '.' in data else '%H:%M:%S').time()
+    return value
+
+
+def _send_message(sock, message):
+    data = json.dumps(dict((k, _encode_value(v)) for k, v in message.items())).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise BrokerError('connection to the broker closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_message(sock):
+    size = _HEADER.unpack(_recv_exact(sock, _HEADER.size))[0]
+    message = json.loads(_recv_exact(sock, size).decode('utf-8'))
+    return dict((k, _decode_value(v)) for k, v in message.items())
+
+
+class BrokeredCursor(object):
+    """PEP-249 cursor proxy, rows are fetched from the broker in batches. The
+    broker side cursor is only opened by the first execute or callproc, since
+    itoolkit DatabaseTransport creates a cursor just to probe for callproc."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor_id = None
+        self.description = None
+        self.rowcount = -1
+        self.arraysize = 1
+        self._rows = collections.deque()
+        self._exhausted = True
+
+    def _set_result(self, response):
+        description = response.get('description')
+        if description is not None:
+            description = [
+                tuple([d[0], getattr(dbi, d[1]) if d[1] in DBI_TYPE_NAMES and HAS_IBM_DB else d[1]] + list(d[2:]))
+                for d in description]
+        self.description = description
+        self.rowcount = response.get('rowcount', -1)
+        self._rows = collections.deque(tuple(row) for row in response.get('rows', []))
+        self._exhausted = description is None or response.get('exhausted', True)
+
+    def _open(self):
+        if self.cursor_id is None:
+            self.cursor_id = self.connection._request('cursor')['cursor']
+        return self.cursor_id
+
+    def execute(self, sql, parameters=None):
+        self._open()
+        response = self.connection._request(
+            'execute', cursor=self.cursor_id, sql=sql, parameters=list(parameters) if parameters else None)
+        self._set_result(response)
+        return response.get('result', True)
+
+    def callproc(self, procname, parameters=None):
+        self._open()
+        response = self.connection._request(
+            'callproc', cursor=self.cursor_id, procname=procname,
+            parameters=list(parameters) if parameters is not None else None)
+        self._set_result(response)
+        result = response.get('result')
+        return tuple(result) if isinstance(result, list) else result
+
+    def _fill(self, size):
+        while not self._exhausted and (size is None or len(self._rows) < size):
+            response = self.connection._request('fetch', cursor=self.cursor_id,
+                                                size=max(size or 0, BROKER_FETCH_SIZE))
+            self._rows.extend(tuple(row) for row in response['rows'])
+            self._exhausted = response['exhausted']
+
+    def fetchone(self):
+        self._fill(1)
+        if not self._rows:
+            return None
+        return self._rows.popleft()
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        self._fill(size)
+        return [self._rows.popleft() for i in range(min(size, len(self._rows)))]
+
+    def fetchall(self):
+        self._fill(None)
+        rows = list(self._rows)
+        self._rows.clear()
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        if self.cursor_id is not None and self.connection.sock is not None:
+            try:
+                self.connection._request('close_cursor', cursor=self.cursor_id)
+            except Exception:
+                pass
+        self.cursor_id = None
+        return True
+
+
+class BrokeredConnection(object):
+    """A connection borrowed from the broker. close() hands it back."""
+
+    def __init__(self, sock, job_name):
+        self.sock = sock
+        self.job_name = job_name
+        self._lock = threading.Lock()
+
+    def _request(self, op, **kwargs):
+        if self.sock is None:
+            raise BrokerError('brokered connection is closed')
+        kwargs['op'] = op
+        with self._lock:
+            _send_message(self.sock, kwargs)
+            response = _recv_message(self.sock)
+        if 'error' in response:
+            raise Exception(response['error'])
+        return response
+
+    def cursor(self):
+        return BrokeredCursor(self)
+
+    def commit(self):
+        return self._request('commit').get('result', True)
+
+    def rollback(self):
+        return self._request('rollback').get('result', True)
+
+    def close(self):
+        if self.sock is None:
+            return True
+        try:
+            self._request('release')
+        finally:
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+            self.sock = None
+        return True
+
+
+def _connect_socket(socket_path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+
+def borrow(db_name, become_user_name, become_user_password, connect_func, settings=None):
+    """Borrow a pooled connection, starting the broker if needed.
+
+    connect_func(db_name, become_user_name, become_user_password) is used by
+    the broker to open new connections and must return (conn, logon, job_name).
+    Returns a BrokeredConnection or None, the caller then connects directly."""
+    if settings is None:
+        settings = get_broker_settings()
+    socket_path = get_socket_path()
+    try:
+        sock = _connect_socket(socket_path)
+    except (OSError, socket.error):
+        if not start_broker(socket_path, connect_func, settings):
+            return None
+        try:
+            sock = _connect_socket(socket_path)
+        except (OSError, socket.error):
+            return None
+    try:
+        _send_message(sock, dict(op='acquire', key=get_pool_key(db_name, become_user_name, become_user_password),
+                                 db_name=db_name, become_user_name=become_user_name,
+                                 become_user_password=become_user_password))
+        response = _recv_message(sock)
+    except Exception as inst:
+        ibmi_util.log_info(f"Connection broker is not available: {inst}", "connection_broker")
+        sock.close()
+        return None
+    if 'error' in response:
+        ibmi_util.log_info(f"Connection broker did not lend a connection: {response['error']}", "connection_broker")
+        sock.close()
+        return None
+    return BrokeredConnection(sock, response.get('job_name'))
+
+
+class PooledConnection(object):
+    def __init__(self, key, conn, logon, job_name):
+        self.key = key
+        self.conn = conn
+        self.logon = logon
+        self.job_name = job_name
+        self.last_used = time.time()
+        self.last_checked = self.last_used
+
+    def is_healthy(self):
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('VALUES 1')
+            cursor.fetchall()
+            cursor.close()
+            self.last_checked = time.time()
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            if self.logon:
+                self.logon.release_profile_handle()
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool(object):
+    """Idle connections per key plus a count of all open connections, which is
+    capped by max_size. Idle connections are evicted after idle_timeout and
+    checked with a trivial query before they are lent again if they were not
+    used for health_check_interval seconds."""
+
+    def __init__(self, connect_func, max_size, idle_timeout, health_check_interval):
+        self.connect_func = connect_func
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.idle = {}
+        self.size = 0
+        self.leased = 0
+        self.last_activity = time.time()
+        self.lock = threading.Lock()
+
+    def acquire(self, key, db_name, become_user_name, become_user_password):
+        while True:
+            with self.lock:
+                self.last_activity = time.time()
+                pooled = self.idle[key].pop() if self.idle.get(key) else None
+                if pooled is None:
+                    if self.size >= self.max_size and not self._evict_lru():
+                        raise BrokerError(f'connection pool is full ({self.max_size} connections)')
+                    self.size += 1
+                self.leased += 1
+            if pooled is None:
+                try:
+                    conn, logon, job_name = self.connect_func(db_name, become_user_name, become_user_password)
+                except Exception:
+                    self._discard()
+                    raise
+                return PooledConnection(key, conn, logon, job_name)
+            if time.time() - pooled.last_checked < self.health_check_interval or pooled.is_healthy():
+                return pooled
+            pooled.close()
+            self._discard()
+
+    def release(self, pooled, reusable=True):
+        try:
+            pooled.conn.rollback()
+        except Exception:
+            reusable = False
+        with self.lock:
+            self.leased -= 1
+            self.last_activity = time.time()
+            if reusable:
+                pooled.last_used = self.last_activity
+                self.idle.setdefault(pooled.key, []).append(pooled)
+                return
+            self.size -= 1
+        pooled.close()
+
+    def _discard(self):
+        with self.lock:
+            self.size -= 1
+            self.leased -= 1
+
+    def _evict_lru(self):
+        """Close the least recently used idle connection, caller holds the lock."""
+        candidates = [p for pooled_list in self.idle.values() for p in pooled_list]
+        if not candidates:
+            return False
+        lru = min(candidates, key=lambda p: p.last_used)
+        self.idle[lru.key].remove(lru)
+        self.size -= 1
+        lru.close()
+        return True
+
+    def evict_idle(self):
+        now = time.time()
+        expired = []
+        with self.lock:
+            for key in list(self.idle):
+                keep = []
+                for pooled in self.idle[key]:
+                    (expired if now - pooled.last_used > self.idle_timeout else keep).append(pooled)
+                if keep:
+                    self.idle[key] = keep
+                else:
+                    del self.idle[key]
+            self.size -= len(expired)
+            is_unused = self.size == 0 and self.leased == 0 and now - self.last_activity > self.idle_timeout
+        for pooled in expired:
+            pooled.close()
+        return is_unused
+
+    def close_all(self):
+        with self.lock:
+            pooled_list = [p for idle_list in self.idle.values() for p in idle_list]
+            self.idle = {}
+            self.size -= len(pooled_list)
+        for pooled in pooled_list:
+            pooled.close()
+
+
+class BrokerRequestHandler(socketserver.BaseRequestHandler):
+    """Serves one task: acquire, then cursor operations, then release."""
+
+    def handle(self):
+        pool = self.server.pool
+        pooled = None
+        reusable = True
+        cursors = {}
+        try:
+            request = _recv_message(self.request)
+            if request.get('op') != 'acquire':
+                _send_message(self.request, dict(error='acquire expected'))
+                return
+            try:
+                pooled = pool.acquire(request['key'], request.get('db_name'),
+                                      request.get('become_user_name'), request.get('become_user_password'))
+            except Exception as inst:
+                _send_message(self.request, dict(error=str(inst)))
+                return
+            _send_message(self.request, dict(job_name=pooled.job_name))
+            while True:
+                request = _recv_message(self.request)
+                op = request.get('op')
+                if op == 'release':
+                    _send_message(self.request, dict(result=True))
+                    return
+                try:
+                    response = self.dispatch(op, request, pooled, cursors)
+                except Exception as inst:
+                    response = dict(error=str(inst))
+                _send_message(self.request, response)
+        except Exception as inst:
+            # The task went away without releasing, the job state is unknown.
+            ibmi_util.log_info(f"Connection dropped by the broker: {inst}", "connection_broker")
+            reusable = False
+        finally:
+            for cursor in cursors.values():
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            if pooled is not None:
+                pool.release(pooled, reusable)
+
+    def dispatch(self, op, request, pooled, cursors):
+        if op == 'cursor':
+            cursor_id = len(cursors) + 1
+            while cursor_id in cursors:
+                cursor_id += 1
+            cursors[cursor_id] = pooled.conn.cursor()
+            return dict(cursor=cursor_id)
+        if op == 'commit':
+            return dict(result=pooled.conn.commit())
+        if op == 'rollback':
+            return dict(result=pooled.conn.rollback())
+        cursor = cursors[request['cursor']]
+        if op == 'close_cursor':
+            del cursors[request['cursor']]
+            cursor.close()
+            return dict(result=True)
+        if op == 'fetch':
+            rows = cursor.fetchmany(request.get('size') or BROKER_FETCH_SIZE)
+            return dict(rows=[list(row) for row in rows], exhausted=len(rows) < (request.get('size') or BROKER_FETCH_SIZE))
+        if op == 'execute':
+            if request.get('parameters') is not None:
+                result = cursor.execute(request['sql'], tuple(request['parameters']))
+            else:
+                result = cursor.execute(request['sql'])
+        elif op == 'callproc':
+            if request.get('parameters') is not None:
+                result = cursor.callproc(request['procname'], tuple(request['parameters']))
+            else:
+                result = cursor.callproc(request['procname'])
+        else:
+            raise BrokerError(f'unknown operation {op}')
+        return self.describe(cursor, result)
+
+    def describe(self, cursor, result):
+        if isinstance(result, (list, tuple)):
+            result = list(result)
+        elif result is not None and not isinstance(result, (bool, int, str)):
+            result = True
+        response = dict(result=result, rowcount=getattr(cursor, 'rowcount', -1))
+        description = getattr(cursor, 'description', None)
+        if description:
+            described = []
+            for d in description:
+                type_name = d[1] if d[1] is None else str(d[1])
+                for name in DBI_TYPE_NAMES if HAS_IBM_DB else []:
+                    if hasattr(dbi, name) and d[1] == getattr(dbi, name):
+                        type_name = name
+                        break
+                described.append([d[0], type_name] + list(d[2:]))
+            rows = cursor.fetchmany(BROKER_FETCH_SIZE)
+            response['description'] = described
+            response['rows'] = [list(row) for row in rows]
+            response['exhausted'] = len(rows) < BROKER_FETCH_SIZE
+        return response
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path, connect_func, settings):
+    pool = ConnectionPool(connect_func, int(settings['max_size']), int(settings['idle_timeout']),
+                          int(settings['health_check_interval']))
+    server = BrokerServer(socket_path, BrokerRequestHandler)
+    os.chmod(socket_path, 0o0600)
+    server.pool = pool
+
+    def evictor():
+        interval = max(1, min(30, int(settings['idle_timeout']) // 2))
+        while True:
+            time.sleep(interval)
+            if pool.evict_idle():
+                server.shutdown()
+                return
+
+    thread = threading.Thread(target=evictor)
+    thread.daemon = True
+    thread.start()
+    ibmi_util.log_info(f"Connection broker started on {socket_path}, settings {settings}", "connection_broker")
+    try:
+        server.serve_forever()
+    finally:
+        pool.close_all()
+        server.server_close()
+        try:
+            os.remove(socket_path)
+        except OSError:
+            pass
+        ibmi_util.log_info("Connection broker stopped", "connection_broker")
+
+
+def start_broker(socket_path, connect_func, settings):
+    """Fork a detached broker unless another task is starting one, then wait
+    until the socket accepts connections."""
+    socket_dir = os.path.dirname(socket_path)
+    try:
+        if not os.path.isdir(socket_dir):
+            os.makedirs(socket_dir, 0o0700)
+        if os.stat(socket_dir).st_uid != os.getuid():
+            return False
+        lock_file = open(os.path.join(socket_dir, 'broker.lock'), 'a')
+    except OSError:
+        return False
+    try:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError) as e:
+            if e.errno not in (errno.EAGAIN, errno.EACCES):
+                return False
+            # Another task is starting the broker
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            return _wait_for_broker(socket_path)
+        try:
+            sock = _connect_socket(socket_path)
+            sock.close()
+            return True
+        except (OSError, socket.error):
+            pass
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        pid = os.fork()
+        if pid == 0:
+            _run_detached(socket_path, connect_func, settings, lock_file)
+        os.waitpid(pid, 0)
+        return _wait_for_broker(socket_path)
+    finally:
+        lock_file.close()
+
+
+def _wait_for_broker(socket_path):
+    deadline = time.time() + BROKER_START_TIMEOUT
+    while time.time() < deadline:
+        try:
+            sock = _connect_socket(socket_path)
+            sock.close()
+            return True
+        except (OSError, socket.error):
+            time.sleep(0.1)
+    return False
+
+
+def _run_detached(socket_path, connect_func, settings, lock_file):
+    """Runs in the forked child, never returns."""
+    try:
+        os.setsid()
+        if os.fork() != 0:
+            os._exit(0)
+        # The ssh session of the task waits for stdout/stderr to be closed
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        os.close(devnull)
+        os.chdir('/')
+        # The parent keeps holding the start lock until the socket accepts
+        lock_file.close()
+        ibmi_logging.reset()
+        serve(socket_path, connect_func, settings)
+    except Exception as inst:
+        ibmi_util.log_error(f"Connection broker failed: {inst}", "connection_broker")
+    finally:
+        ibmi_logging.shutdown()
+        os._exit(0)
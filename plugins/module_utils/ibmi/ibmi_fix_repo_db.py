@@ -0,0 +1,203 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# SQLite storage of the fix repositories. connect() opens the database once per
+# task with WAL journaling, applies the pending schema migrations of the module
+# owning them, tracked per owner in the schema_version table as modules can share
+# a database file, and find_rows() resolves a batch of lookups with one join
+# against a temp table instead of one SELECT per lookup. get_checksums() keeps
+# the digests of the image files in a cache table so unchanged files are not
+# read again.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import sqlite3
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+
+# Seconds a connection waits for the lock of another task writing to the database
+IBMi_FIX_REPO_BUSY_TIMEOUT = 30
+
+IBMi_FIX_REPO_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000',
+]
+
+FIND_KEYS_TABLE = 'find_keys'
+
+SCHEMA_VERSION_TABLE = 'schema_version'
+
+CHECKSUM_CACHE_TABLE = 'file_checksum_cache'
+# A cached digest is used while the size, mtime_ns and inode of the file are unchanged
+CHECKSUM_CACHE_SCHEMA = [
+    f'CREATE TABLE IF NOT EXISTS {CHECKSUM_CACHE_TABLE} (path TEXT NOT NULL, algorithm CHAR(10) NOT NULL, '
+    'size INTEGER, mtime_ns INTEGER, inode INTEGER, checksum TEXT, '
+    'add_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (path, algorithm))',
+]
+
+IBMi_CHECKSUM_BUFFER_SIZE = 4 * 1024 * 1024
+IBMi_CHECKSUM_MAX_WORKERS = 4
+
+
+def connect(database, migrations=None, owner=None):
+    '''Opens the database, creating its directory if needed, sets the pragmas and applies
+    the pending migrations of owner'''
+    db_dir = os.path.dirname(database)
+    if db_dir and not os.path.isdir(db_dir):
+        ibmi_util.ensure_dir(db_dir)
+    conn = sqlite3.connect(database, timeout=IBMi_FIX_REPO_BUSY_TIMEOUT)
+    try:
+        for pragma in IBMi_FIX_REPO_PRAGMAS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.Error as e:
+                # e.g. WAL is not supported by the file system, keep the default
+                ibmi_util.log_info(f"{pragma} failed: {e}", 'ibmi_fix_repo_db')
+        if migrations:
+            migrate(conn, migrations, owner)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def get_schema_version(conn, owner):
+    '''Returns the number of migrations of owner applied to the database, 0 if none'''
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (owner TEXT PRIMARY KEY, version INTEGER)')
+    row = conn.execute(f'SELECT version FROM {SCHEMA_VERSION_TABLE} WHERE owner = ?', (owner,)).fetchone()
+    return row[0] if row else 0
+
+
+def migrate(conn, migrations, owner):
+    '''migrations is a list of lists of SQL statements of the tables of owner, usually the name
+    of the module. Migration n (counting from 1) runs once, when the version of owner in the
+    database is lower than n. A statement can also be a function taking the connection, for data
+    migrations. Returns the schema version'''
+    target_version = len(migrations)
+    if get_schema_version(conn, owner) >= target_version:
+        return target_version
+    # BEGIN IMMEDIATE takes the write lock, a task migrating at the same time waits for it
+    # and finds the migrations done when it reads the version again
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = get_schema_version(conn, owner)
+        for statements in migrations[version:]:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+        conn.execute(f'INSERT OR REPLACE INTO {SCHEMA_VERSION_TABLE} (owner, version) VALUES(?, ?)',
+                     (owner, target_version))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return target_version
+
+
+def column_type(definition):
+    '''Returns the type of a column definition, e.g. INTEGER from INTEGER DEFAULT 0'''
+    return definition.split()[0]
+
+
+def rows_to_dicts(cursor, rows):
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in rows]
+
+
+def find_rows(conn, table, table_dict, keys_list):
+    '''Finds the rows of table matching each dict of column values in keys_list. The dicts
+    with the same columns are matched by one join with a temp table, the columns of the temp
+    table have the types of the table so the values compare the same way bound parameters do.
+    Returns a list of matched rows per dict of keys_list, in table order'''
+    found = [[] for keys in keys_list]
+    batches = {}
+    for idx, keys in enumerate(keys_list):
+        batches.setdefault(tuple(sorted(keys)), []).append(idx)
+    for columns, indexes in batches.items():
+        column_defs = ', '.join(f'{column} {column_type(table_dict[column])}' for column in columns)
+        conn.execute(f'DROP TABLE IF EXISTS temp.{FIND_KEYS_TABLE}')
+        conn.execute(f'CREATE TEMP TABLE {FIND_KEYS_TABLE} (find_idx INTEGER, {column_defs})')
+        placeholders = ', '.join('?' for column in columns)
+        conn.executemany(
+            f'INSERT INTO temp.{FIND_KEYS_TABLE} VALUES(?, {placeholders})',
+            ([idx] + [keys_list[idx][column] for column in columns] for idx in indexes))
+        on = ' AND '.join(f't.{column} = k.{column}' for column in columns)
+        cursor = conn.execute(
+            f'SELECT k.find_idx AS find_idx, t.* FROM temp.{FIND_KEYS_TABLE} k '
+            f'JOIN {table} t ON {on} ORDER BY k.find_idx, t.rowid')
+        for row in rows_to_dicts(cursor, cursor.fetchall()):
+            found[row.pop('find_idx')].append(row)
+        conn.execute(f'DROP TABLE temp.{FIND_KEYS_TABLE}')
+    return found
+
+
+def hash_file(path, algorithm):
+    '''Returns the hex digest of the file, None if it cannot be read'''
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(IBMi_CHECKSUM_BUFFER_SIZE)
+    view = memoryview(buffer)
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    break
+                digest.update(view[:size])
+    except (IOError, OSError):
+        return None
+    return digest.hexdigest()
+
+
+def get_checksums(conn, paths, algorithm, force_rehash=False, max_workers=IBMi_CHECKSUM_MAX_WORKERS):
+    '''Returns a dict of path to the hex digest of the file, None if the file does not exist or
+    cannot be read, and a dict of counts of the cached and rehashed files. The digests of the
+    files changed since they were cached, or of all files with force_rehash, are computed by
+    a pool of max_workers threads and stored in the cache table'''
+    checksums = {}
+    stats = dict(cached=0, rehashed=0)
+    file_stats = {}
+    for path in set(paths):
+        try:
+            st = os.stat(path)
+            file_stats[path] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        except OSError:
+            checksums[path] = None
+    cached = {}
+    if file_stats and not force_rehash:
+        cursor = conn.execute(
+            f'SELECT path, size, mtime_ns, inode, checksum FROM {CHECKSUM_CACHE_TABLE} WHERE algorithm = ?', (algorithm,))
+        for path, size, mtime_ns, inode, checksum in cursor:
+            if file_stats.get(path) == (size, mtime_ns, inode):
+                cached[path] = checksum
+    to_hash = []
+    for path in file_stats:
+        if path in cached:
+            checksums[path] = cached[path]
+            stats['cached'] += 1
+        else:
+            to_hash.append(path)
+    if to_hash:
+        # the largest files first, so one large image does not start last
+        to_hash.sort(key=lambda p: file_stats[p][0], reverse=True)
+        workers = max(1, min(max_workers, len(to_hash)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for path, checksum in zip(to_hash, executor.map(lambda p: hash_file(p, algorithm), to_hash)):
+                checksums[path] = checksum
+        stats['rehashed'] = len(to_hash)
+        with conn:
+            conn.executemany(
+                f'INSERT OR REPLACE INTO {CHECKSUM_CACHE_TABLE} (path, algorithm, size, mtime_ns, inode, checksum) '
+                'VALUES(?, ?, ?, ?, ?, ?)',
+                [(path, algorithm) + file_stats[path] + (checksums[path],) for path in to_hash if checksums[path]])
+    missing = [(path, algorithm) for path, checksum in checksums.items() if checksum is None]
+    if missing:
+        with conn:
+            conn.executemany(f'DELETE FROM {CHECKSUM_CACHE_TABLE} WHERE path = ? AND algorithm = ?', missing)
+    return checksums, stats
@@ -0,0 +1,64 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Queries of QSYS2.JOBLOG_INFO. select_statement() pushes the filters of the
+# messages, the minimum severity, the message ids and types, the time window and
+# the ordinal position to start after, into the where clause with parameter
+# markers, and FETCH FIRST stops the query at the limit. Only the columns asked
+# for are selected, so the first and second level texts, the longest columns of
+# the job log, are not transferred and decoded unless they are wanted.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+# The columns returned by default, in the order of the job log maps
+JOB_LOG_COLUMNS = [
+    'ORDINAL_POSITION', 'MESSAGE_ID', 'MESSAGE_TYPE', 'MESSAGE_SUBTYPE', 'SEVERITY', 'MESSAGE_TIMESTAMP',
+    'FROM_LIBRARY', 'FROM_PROGRAM', 'FROM_MODULE', 'FROM_PROCEDURE', 'FROM_INSTRUCTION',
+    'TO_LIBRARY', 'TO_PROGRAM', 'TO_MODULE', 'TO_PROCEDURE', 'TO_INSTRUCTION',
+    'FROM_USER', 'MESSAGE_FILE', 'MESSAGE_LIBRARY', 'MESSAGE_TEXT', 'MESSAGE_SECOND_LEVEL_TEXT',
+]
+# Columns only returned if asked for
+JOB_LOG_OTHER_COLUMNS = ['MESSAGE_TOKEN_LENGTH', 'MESSAGE_KEY']
+JOB_LOG_TEXT_COLUMNS = ['MESSAGE_TEXT', 'MESSAGE_SECOND_LEVEL_TEXT']
+JOB_LOG_MESSAGE_TYPES = ['COMMAND', 'COMPLETION', 'DIAGNOSTIC', 'ESCAPE', 'INFORMATIONAL', 'INQUIRY',
+                         'NOTIFY', 'REPLY', 'REQUEST', 'SENDER']
+# The column of the cursor of the messages, selected whatever the columns asked for
+JOB_LOG_ORDINAL_COLUMN = 'ORDINAL_POSITION'
+
+
+def select_statement(job_name, columns=None, start_time=None, end_time=None, since_ordinal=None,
+                     min_severity=None, message_ids=None, message_types=None, limit=None, newest_first=True):
+    '''Returns the statement selecting the messages of the job log of job_name and the values of
+    its parameter markers. columns defaults to JOB_LOG_COLUMNS, the messages are ordered by
+    their ordinal position'''
+    columns = list(columns or JOB_LOG_COLUMNS)
+    if JOB_LOG_ORDINAL_COLUMN not in columns:
+        columns.insert(0, JOB_LOG_ORDINAL_COLUMN)
+    conditions = []
+    parameters = []
+    if start_time:
+        conditions.append('MESSAGE_TIMESTAMP >= ?')
+        parameters.append(str(start_time))
+    if end_time:
+        conditions.append('MESSAGE_TIMESTAMP <= ?')
+        parameters.append(str(end_time))
+    if since_ordinal is not None:
+        conditions.append('ORDINAL_POSITION > ?')
+        parameters.append(int(since_ordinal))
+    if min_severity is not None:
+        conditions.append('SEVERITY >= ?')
+        parameters.append(int(min_severity))
+    if message_ids:
+        conditions.append('MESSAGE_ID IN (' + ', '.join('?' for message_id in message_ids) + ')')
+        parameters.extend(message_id.strip().upper() for message_id in message_ids)
+    if message_types:
+        conditions.append('MESSAGE_TYPE IN (' + ', '.join('?' for message_type in message_types) + ')')
+        parameters.extend(message_type.strip().upper() for message_type in message_types)
+    sql = 'SELECT ' + ', '.join(columns) + \
+          " FROM TABLE(QSYS2.JOBLOG_INFO('" + job_name.replace("'", "''") + "')) A "
+    if conditions:
+        sql = sql + 'WHERE ' + ' AND '.join(conditions) + ' '
+    sql = sql + 'ORDER BY ORDINAL_POSITION' + (' DESC' if newest_first else '')
+    if limit:
+        sql = sql + ' FETCH FIRST ' + str(int(limit)) + ' ROWS ONLY'
+    return sql, parameters
@@ -0,0 +1,196 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Waiting for submitted jobs. submitted_job() finds the job SBMJOB submitted
+# from its CPC1221 message instead of reading the whole job log. JobWaiter
+# checks the status of all the jobs it waits for with one query, the jobs
+# joined to QSYS2.GET_JOB_INFO, and sleeps between the checks with Backoff,
+# an interval growing from one second up to the check interval with some
+# jitter, so jobs submitted at the same time are not checked at the same time.
+# To wait for jobs to end, JobWaiter can instead block in RCVMSG on a
+# CompletionQueue, the message queue SBMJOB MSGQ() sends the CPF1240/CPF1241
+# completion message of the jobs to. The number of checks, the time waited and
+# the latency, the longest time a job reached its status before it was seen,
+# are returned by summary().
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import random
+import re
+import time
+import uuid
+
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+
+IBMi_JOB_WAIT_INITIAL_INTERVAL = 1.0
+IBMi_JOB_WAIT_BACKOFF_FACTOR = 2.0
+IBMi_JOB_WAIT_JITTER = 0.2
+IBMi_JOB_WAIT_MSGQ_LIBRARY = 'QGPL'
+
+JOB_NAME_PATTERN = r'\d{6}/[A-Za-z0-9#_]{1,10}/[A-Za-z0-9#_]{1,10}'
+JOB_SUBMITTED_MESSAGE = 'CPC1221'
+# Job ended abnormally, job completed normally
+JOB_COMPLETION_MESSAGES = ('CPF1240', 'CPF1241')
+# The status of a job that ended, the statuses a completion message can be waited for
+JOB_END_STATUSES = ('*OUTQ', '*COMPLETE', '*UNKNOWN')
+JOB_STATUS_COLUMNS = 'V_JOB_STATUS as "job_status", V_ACTIVE_JOB_STATUS as "active_job_status"'
+JOB_NAME_COLUMN = 'ansible_job_name'
+
+
+def submitted_job(ibmi_module, startd):
+    '''Returns the qualified name of the job submitted by SBMJOB since startd, '' if not found'''
+    sql = "SELECT MESSAGE_TEXT FROM TABLE(QSYS2.JOBLOG_INFO('*')) A WHERE MESSAGE_ID = '" + \
+          JOB_SUBMITTED_MESSAGE + "' AND MESSAGE_TIMESTAMP >= '" + str(startd) + \
+          "' ORDER BY ORDINAL_POSITION DESC FETCH FIRST 1 ROWS ONLY"
+    rc, out, err = ibmi_module.itoolkit_run_sql(sql)
+    if rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS or not out:
+        return ''
+    job = re.search(JOB_NAME_PATTERN, out[0]['MESSAGE_TEXT'])
+    return job.group() if job else ''
+
+
+class Backoff(object):
+    '''Sleeps an interval growing by factor from initial up to maximum, less a random part of
+    jitter, never past timeout seconds after it was created'''
+
+    def __init__(self, timeout, maximum=None, initial=IBMi_JOB_WAIT_INITIAL_INTERVAL,
+                 factor=IBMi_JOB_WAIT_BACKOFF_FACTOR, jitter=IBMi_JOB_WAIT_JITTER):
+        self.start = time.time()
+        self.deadline = self.start + max(timeout, 0)
+        self.maximum = initial if maximum is None else max(maximum, 0)
+        self.interval = min(initial, self.maximum)
+        self.factor = factor
+        self.jitter = jitter
+
+    def remaining(self):
+        return max(self.deadline - time.time(), 0)
+
+    def sleep(self):
+        '''Returns False without sleeping if the time is up'''
+        remaining = self.remaining()
+        if remaining <= 0:
+            return False
+        delay = self.interval * (1 - self.jitter * random.random())
+        time.sleep(min(delay, remaining))
+        self.interval = min(self.interval * self.factor, self.maximum)
+        return True
+
+
+class CompletionQueue(object):
+    '''A message queue which receives the completion messages of the jobs submitted with the
+    SBMJOB parameter of parameter()'''
+
+    def __init__(self, ibmi_module, library=IBMi_JOB_WAIT_MSGQ_LIBRARY):
+        self.ibmi_module = ibmi_module
+        self.path = library + '/ANS' + uuid.uuid4().hex[:7].upper()
+        self.created = False
+
+    def create(self):
+        rc, out, err = self.ibmi_module.itoolkit_run_command(
+            "QSYS/CRTMSGQ MSGQ(" + self.path + ") TEXT('Ansible job completion')")
+        self.created = rc == ibmi_util.IBMi_COMMAND_RC_SUCCESS
+        return self.created
+
+    def parameter(self):
+        return 'MSGQ(' + self.path + ')'
+
+    def receive(self, wait):
+        '''Blocks up to wait seconds for a message, returns the job a completion message is about,
+        '' for other messages and None if no message arrived'''
+        rc, out, err = self.ibmi_module.itoolkit_run_rtv_command(
+            'QSYS/RCVMSG MSGQ(' + self.path + ') WAIT(' + str(max(int(wait), 1)) + ') RMV(*YES)',
+            {'MSGID': 'char', 'MSGDTA': 'char'})
+        msg_id = out.get('MSGID', '').strip() if rc == ibmi_util.IBMi_COMMAND_RC_SUCCESS else ''
+        if not msg_id:
+            return None
+        if msg_id not in JOB_COMPLETION_MESSAGES:
+            return ''
+        # the message data starts with the job name, user and number
+        data = out.get('MSGDTA', '')
+        return data[20:26] + '/' + data[10:20].strip() + '/' + data[0:10].strip()
+
+    def delete(self):
+        if self.created:
+            self.ibmi_module.itoolkit_run_command('QSYS/DLTMSGQ MSGQ(' + self.path + ')')
+            self.created = False
+
+
+class JobWaiter(object):
+    '''Waits for jobs to turn into one of some statuses, checking all the jobs with one query'''
+
+    def __init__(self, ibmi_module, timeout, check_interval=None, columns=JOB_STATUS_COLUMNS):
+        self.ibmi_module = ibmi_module
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.columns = columns
+        self.polls = 0
+        self.messages = 0
+        self.latency = 0.0
+        self.seconds = 0.0
+        self.timed_out = False
+
+    def query(self, jobs):
+        '''Returns rc, a dict of job to its GET_JOB_INFO row and the error, jobs not found have no row'''
+        values = ', '.join("('" + job + "')" for job in jobs)
+        sql = 'SELECT J.JOB_NAME as "' + JOB_NAME_COLUMN + '", ' + self.columns + \
+              ' FROM (VALUES ' + values + ') J(JOB_NAME), TABLE(QSYS2.GET_JOB_INFO(J.JOB_NAME)) A'
+        self.polls += 1
+        rc, out, err = self.ibmi_module.itoolkit_run_sql(sql)
+        rows = {}
+        if rc == ibmi_util.IBMi_COMMAND_RC_SUCCESS:
+            for row in out:
+                rows[row.pop(JOB_NAME_COLUMN).strip()] = row
+        return rc, rows, err
+
+    def wait(self, jobs, statuses, completion_queue=None):
+        '''Returns rc, a dict of job to its last GET_JOB_INFO row and the error. If
+        completion_queue is given and all the statuses are statuses of ended jobs, blocks on
+        the queue until the jobs end instead of checking their status'''
+        start = time.time()
+        backoff = Backoff(self.timeout, self.check_interval)
+        pending = list(jobs)
+        rows = {}
+        if completion_queue and set(statuses) <= set(JOB_END_STATUSES):
+            self.receive_completions(completion_queue, pending, backoff)
+        last_poll = time.time()
+        while True:
+            rc, found, err = self.query(pending)
+            if rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS:
+                break
+            now = time.time()
+            rows.update(found)
+            done = [job for job in pending if self.status(found.get(job)) in statuses]
+            if done:
+                self.latency = max(self.latency, now - last_poll)
+                pending = [job for job in pending if job not in done]
+            last_poll = now
+            if not pending:
+                break
+            if not backoff.sleep():
+                self.timed_out = True
+                break
+        self.seconds += time.time() - start
+        return rc, rows, err
+
+    def receive_completions(self, completion_queue, pending, backoff):
+        '''Blocks on completion_queue until all the pending jobs ended or the time is up'''
+        waiting = set(pending)
+        while waiting and backoff.remaining() > 0:
+            job = completion_queue.receive(backoff.remaining())
+            if job is None:
+                break
+            self.messages += 1
+            waiting.discard(job)
+
+    @staticmethod
+    def status(row):
+        return row['job_status'].strip() if row else ''
+
+    def summary(self):
+        return dict(
+            polls=self.polls,
+            messages=self.messages,
+            seconds=round(self.seconds, 3),
+            latency=round(self.latency, 3),
+            timed_out=self.timed_out,
+        )
@@ -0,0 +1,249 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+import os
+import json
+import datetime
+import tempfile
+import logging
+import logging.handlers
+import zipfile
+import socket
+import atexit
+import queue
+
+IBMi_DEFAULT_CONFIG_DIR = '/etc/ansible'
+IBMi_ANSIBLE_CONFIG_FILE = 'ibmi_ansible.cfg'
+IBMi_DEFAULT_LOG_DIR = '/var/log'
+IBMi_DEFAULT_LOG_FILE = 'ibmi_ansible_modules.log'
+IBMi_DEFAULT_LOG_LEVEL_STR = 'INFO'
+IBMi_DEFAULT_MAX_LOG_SIZE = 5 * 1024 * 1024
+IBMi_DEFAULT_MAX_LOG_BACKUPS = 0
+
+IBMi_LOGGER_NAME = 'ibmi_util'
+IBMi_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Per-process state. The logging configuration, host name and ip are resolved
+# once by the first log call, every later call only does a level check and
+# puts the record on the queue.
+_state = {
+    'configured': False,
+    'no_log': False,
+    'logger': None,
+    'listener': None,
+    'hostname': None,
+    'ip': None,
+}
+
+
+def get_host_and_ip():
+    if _state['hostname'] is None:
+        hostname = 'UNKNOWN_HOST'
+        ip = 'UNKNOWN_IP'
+        try:
+            hostname = socket.gethostname()
+            ip = socket.gethostbyname(hostname)
+        except Exception:
+            pass
+        _state['hostname'] = hostname
+        _state['ip'] = ip
+    return _state['hostname'], _state['ip']
+
+
+def _archive_namer(name):
+    return name + '_' + str(datetime.datetime.now()).replace(' ', '_').replace(':', '.') + '.zip'
+
+
+def _archive_rotator(source, dest):
+    with zipfile.ZipFile(dest, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.write(source, os.path.basename(source))
+    os.remove(source)
+
+
+class ArchivingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler which zips the rotated log the same way the log
+    archive was named before, <log_file>_<timestamp>.zip. If backupCount is
+    greater than 0, archives beyond backupCount are removed oldest first."""
+
+    def __init__(self, filename, maxBytes=0, backupCount=0):
+        super(ArchivingRotatingFileHandler, self).__init__(
+            filename, mode='a', maxBytes=maxBytes, backupCount=backupCount, delay=True)
+        self.namer = _archive_namer
+        self.rotator = _archive_rotator
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename):
+            self.rotate(self.baseFilename, self.rotation_filename(self.baseFilename))
+        self._remove_old_archives()
+        self.stream = self._open()
+        try:
+            os.chmod(self.baseFilename, 0o0777)
+        except Exception:
+            pass
+
+    def _remove_old_archives(self):
+        if self.backupCount <= 0:
+            return
+        log_dir, log_file = os.path.split(self.baseFilename)
+        try:
+            archives = sorted(f for f in os.listdir(log_dir)
+                              if f.startswith(log_file + '_') and f.endswith('.zip'))
+            for f in archives[:-self.backupCount]:
+                os.remove(os.path.join(log_dir, f))
+        except OSError:
+            pass
+
+
+def read_ansible_config():
+    """Return the content of ibmi_ansible.cfg, the file in HOME takes
+    precedence over the one in /etc/ansible. Returns {} if there is none."""
+    try:
+        config_file_path = os.path.join(os.getenv('HOME', IBMi_DEFAULT_CONFIG_DIR), IBMi_ANSIBLE_CONFIG_FILE)
+        # Try again to read from default log config path
+        if not os.path.exists(config_file_path):
+            config_file_path = os.path.join(IBMi_DEFAULT_CONFIG_DIR, IBMi_ANSIBLE_CONFIG_FILE)
+        with open(config_file_path, 'r', encoding='utf-8') as load_f:
+            return json.load(load_f)
+    except Exception:
+        return {}
+
+
+def read_log_config():
+    """Default logging configuration in /etc/ansible/ibmi_ansible.cfg"""
+    """
+    {
+        "log_config":
+        {
+            "log_level": "INFO",
+            "log_dir": "/var/log",
+            "log_file": "ibmi_ansible_modules.log",
+            "no_log": false,
+            "max_log_size_mb": 5,
+            "max_log_backups": 0
+        }
+    }
+    """
+    log_config = {
+        'log_level': IBMi_DEFAULT_LOG_LEVEL_STR,
+        'log_dir': IBMi_DEFAULT_LOG_DIR,
+        'log_file': IBMi_DEFAULT_LOG_FILE,
+        'no_log': False,
+        'max_log_size': IBMi_DEFAULT_MAX_LOG_SIZE,
+        'max_log_backups': IBMi_DEFAULT_MAX_LOG_BACKUPS,
+    }
+    try:
+        log_dict = read_ansible_config()['log_config']
+        log_config['no_log'] = log_dict.get('no_log', False)
+        log_config['log_dir'] = log_dict.get('log_dir', IBMi_DEFAULT_LOG_DIR)
+        log_config['log_file'] = log_dict.get('log_file', IBMi_DEFAULT_LOG_FILE)
+        log_config['log_level'] = log_dict.get('log_level', IBMi_DEFAULT_LOG_LEVEL_STR)
+        log_config['max_log_size'] = log_dict.get('max_log_size_mb', 5) * 1024 * 1024
+        log_config['max_log_backups'] = log_dict.get('max_log_backups', IBMi_DEFAULT_MAX_LOG_BACKUPS)
+    except Exception:
+        pass
+    return log_config
+
+
+def shutdown():
+    """Stop the QueueListener, which writes out the queued records."""
+    listener = _state['listener']
+    _state['listener'] = None
+    if listener:
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+
+def reset():
+    """Drop the per-process logging setup, a forked child calls it since the
+    QueueListener thread of the parent does not exist in the child."""
+    logger = _state['logger']
+    if logger is not None:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+    _state['configured'] = False
+    _state['no_log'] = False
+    _state['logger'] = None
+    _state['listener'] = None
+
+
+def configure(default_log_level=logging.INFO):
+    """Configure the ibmi logger once per process. The file handler runs on a
+    QueueListener thread so the caller never blocks on the log file, the queue
+    is drained at interpreter exit."""
+    if _state['configured']:
+        return _state['logger']
+    _state['configured'] = True
+
+    log_config = read_log_config()
+    if log_config['no_log']:
+        _state['no_log'] = True
+        return None
+
+    log_path = log_config['log_dir']
+    try:
+        if not os.path.exists(log_path):
+            os.makedirs(log_path, 0o0777)
+    except Exception:
+        log_path = tempfile.gettempdir()
+    log_file_path = os.path.join(log_path, log_config['log_file'])
+
+    log_level = logging.getLevelName(str(log_config['log_level']).upper())
+    if not isinstance(log_level, int):
+        log_level = default_log_level
+
+    logger = logging.getLogger(IBMi_LOGGER_NAME)
+    logger.setLevel(log_level)
+    logger.propagate = False
+    try:
+        file_handler = ArchivingRotatingFileHandler(
+            log_file_path, maxBytes=log_config['max_log_size'], backupCount=log_config['max_log_backups'])
+        file_handler.setFormatter(logging.Formatter(IBMi_LOG_FORMAT))
+        if os.path.exists(log_file_path) and os.path.getsize(log_file_path) > log_config['max_log_size'] > 0:
+            file_handler.doRollover()
+        log_queue = queue.Queue(-1)
+        listener = logging.handlers.QueueListener(log_queue, file_handler)
+        listener.start()
+        _state['listener'] = listener
+        atexit.register(shutdown)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        try:
+            if not os.path.exists(log_file_path):
+                open(log_file_path, 'a').close()
+            os.chmod(log_file_path, 0o0777)
+        except Exception:
+            pass
+    except Exception:
+        logger.addHandler(logging.NullHandler())
+
+    _state['logger'] = logger
+    return logger
+
+
+def get_logger():
+    if _state['configured']:
+        return _state['logger']
+    return configure()
+
+
+def is_enabled_for(level):
+    """Return True if a record of level would be written. Use it to skip
+    building expensive log messages on hot paths."""
+    logger = get_logger()
+    return logger is not None and logger.isEnabledFor(level)
+
+
+def log(level, s, module_name=IBMi_LOGGER_NAME):
+    try:
+        logger = get_logger()
+        if logger is None or not logger.isEnabledFor(level):
+            return
+        hostname, ip = get_host_and_ip()
+        logger.log(level, "%s(%s) - %s: %s", hostname, ip, module_name, s)
+    except Exception:
+        pass
@@ -3,12 +3,23 @@ __metaclass__ = type
 
 
 import datetime
+from collections.abc import Sequence
 import binascii
 import sys
 
 HAS_ITOOLKIT = True
 HAS_IBM_DB = True
 
+# Operations per XMLSERVICE call of itoolkit_run_batch, keeps the output within
+# the 512K buffer of iPLUGR512K
+IBMi_BATCH_MAX_OPERATIONS = 50
+
+# Rows per cursor.fetchmany call of db_iter_result_list
+IBMi_DB_FETCH_BATCH_SIZE = 500
+
+# Columns which are always returned as hex strings
+IBMi_KNOWN_HEX_COLUMNS = ['MESSAGE_KEY', 'ASSOCIATED_MESSAGE_KEY', 'INTERNAL_JOB_ID']
+
 try:
     from itoolkit import iToolKit
     from itoolkit import iSqlFree
@@ -34,6 +45,8 @@ except ImportError:
     HAS_IBM_DB = False
 
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_connection_broker
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_job_log
 
 
 class IBMiLogon(object):
@@ -155,11 +168,89 @@ class IBMiLogon(object):
             return False
 
 
+def broker_connect(db_name, become_user_name=None, become_user_password=None):
+    '''Opens a connection for the connection broker pool, returns (conn, ibmi_logon, job_name)'''
+    if db_name and db_name != ibmi_util.SYSBAS:
+        conn = dbi.connect(database=f'{db_name}')
+    else:
+        conn = dbi.connect()
+    ibmi_logon = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT JOB_NAME FROM TABLE (QSYS2.ACTIVE_JOB_INFO(JOB_NAME_FILTER => '*')) AS X")
+        row = cursor.fetchone()
+        cursor.close()
+        job_name = row[0] if row else "Job name not available. "
+        if become_user_name:
+            ibmi_logon = IBMiLogon(conn, become_user_name, "*NOPWD" if (become_user_password is None) else become_user_password)
+            if not ibmi_logon.switch():
+                raise Exception(f"Failed to become user {become_user_name} to excute the task. Invaild user or password or user is disabled")
+    except Exception:
+        conn.close()
+        raise
+    return conn, ibmi_logon, job_name
+
+
+def _hex_or_str(value):
+    try:
+        return binascii.b2a_hex(value).decode('utf-8').upper()
+    except TypeError:
+        return str(value)
+
+
+def _unchanged(value):
+    return value
+
+
+class DeferredJobLog(Sequence):
+    '''Job log messages of a task up to the time the object was created. The job log is read the
+    first time the messages are used, e.g. when the module returns them, so a module which drops
+    the job log never reads it. AnsibleModule.exit_json turns it into a list'''
+
+    def __init__(self, ibmi_module, until):
+        self.ibmi_module = ibmi_module
+        self.until = until
+        self.messages = None
+
+    def _get_messages(self):
+        if self.messages is None:
+            try:
+                job_log = self.ibmi_module.get_task_job_log()
+            except Exception as inst:
+                ibmi_util.log_info("Failed to read the deferred job log: " + str(inst))
+                job_log = []
+            self.messages = [message for message in job_log
+                             if not isinstance(message.get('MESSAGE_TIMESTAMP'), datetime.datetime) or
+                             message['MESSAGE_TIMESTAMP'] <= self.until]
+        return self.messages
+
+    def __getitem__(self, index):
+        return self._get_messages()[index]
+
+    def __len__(self):
+        return len(self._get_messages())
+
+    def __eq__(self, other):
+        return list(self) == list(other) if isinstance(other, Sequence) else NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return repr(self._get_messages())
+
+
 class IBMiModule(object):
     def __init__(self, db_name=ibmi_util.SYSBAS, become_user_name=None, become_user_password=None):
         self.ibmi_logon = None
         self.conn = None
+        self.brokered = False
         self.startd = datetime.datetime.now()
+        # Job log messages of the task read so far, newest first, and the highest
+        # ORDINAL_POSITION among them. Later reads only fetch the messages after it.
+        self.job_log = []
+        self.job_log_ordinal = None
 
         if not HAS_ITOOLKIT:
             raise ImportError("itoolkit package is required.")
@@ -171,11 +262,20 @@ class IBMiModule(object):
             ssh_client, ssh_connection, user, login = ibmi_util.get_ssh_client_and_user_info()
             ibmi_util.log_info(
                 f"ssh client: {ssh_client}, ssh connection: {ssh_connection}, login name: {user}, user: {login}")
-            if db_name != ibmi_util.SYSBAS:
-                self.conn = dbi.connect(database=f'{db_name}')
+            broker_settings = ibmi_connection_broker.get_broker_settings()
+            if broker_settings['enabled']:
+                self.conn = ibmi_connection_broker.borrow(
+                    db_name, become_user_name, become_user_password, broker_connect, broker_settings)
+                self.brokered = self.conn is not None
+            if self.brokered:
+                # The broker did the profile swap when it opened the pooled connection
+                job_name_info = self.conn.job_name
             else:
-                self.conn = dbi.connect()
-            job_name_info = self.get_current_job_name()
+                if db_name != ibmi_util.SYSBAS:
+                    self.conn = dbi.connect(database=f'{db_name}')
+                else:
+                    self.conn = dbi.connect()
+                job_name_info = self.get_current_job_name()
             ibmi_util.log_info(
                 f"Job of the connection to execute the task: {job_name_info}", "Connection Initialization")
         except Exception as inst:
@@ -194,7 +294,7 @@ class IBMiModule(object):
         if re_raise:
             raise Exception(exp_msg)
 
-        if become_user_name and self.conn:
+        if become_user_name and self.conn and not self.brokered:
             self.ibmi_logon = IBMiLogon(
                 self.conn, become_user_name, "*NOPWD" if (become_user_password is None) else become_user_password)
             become_result = self.ibmi_logon.switch()
@@ -216,6 +316,7 @@ class IBMiModule(object):
             self.ibmi_logon.release_profile_handle()
 
     def close_db_connection(self):
+        '''Closes the connection, or returns it to the pool of the connection broker'''
         if self.conn:
             re_raise = False  # workaround to pass the raise-missing-from pylint issue
             exp_msg = ''
@@ -233,6 +334,19 @@ class IBMiModule(object):
         self.release_ibmi_logon_handler()
         self.close_db_connection()
 
+    def get_task_job_log(self, defer=False):
+        '''Returns the job log messages since the task started, newest first. Only the messages
+        added after the previous call are read from the job log. With defer, a DeferredJobLog is
+        returned and the job log is not read until the messages are used'''
+        if defer:
+            return DeferredJobLog(self, datetime.datetime.now())
+        new_messages = self.get_job_log('*', self.startd, self.job_log_ordinal)
+        new_messages = [message for message in new_messages if 'ORDINAL_POSITION' in message]
+        if new_messages:
+            self.job_log = new_messages + self.job_log
+            self.job_log_ordinal = new_messages[0]['ORDINAL_POSITION']
+        return list(self.job_log)
+
     def itoolkit_get_job_log(self, time):
         return self.get_job_log('*', str(time))
 
@@ -247,13 +361,13 @@ class IBMiModule(object):
                 cast_ccsid = out['DFTCCSID']
         return self.get_job_log_NLS('*', str(cast_ccsid), str(time))
 
-    def itoolkit_run_sql(self, sql, hex_convert_columns=None):
-        return self.db_get_result_list(sql, hex_convert_columns)
+    def itoolkit_run_sql(self, sql, hex_convert_columns=None, max_rows=None, columns=None):
+        return self.db_get_result_list(sql, hex_convert_columns, max_rows, columns)
 
-    def itoolkit_run_sql_once(self, sql, hex_convert_columns=None):
+    def itoolkit_run_sql_once(self, sql, hex_convert_columns=None, defer_job_log=False, max_rows=None, columns=None):
         '''This method equals to itoolkit_run_sql and itoolkit_get_job_log'''
-        rc, out_list, error = self.itoolkit_run_sql(sql, hex_convert_columns)
-        job_log = self.get_job_log('*', self.startd)
+        rc, out_list, error = self.itoolkit_run_sql(sql, hex_convert_columns, max_rows, columns)
+        job_log = self.get_task_job_log(defer_job_log)
         return rc, out_list, error, job_log
 
     def itoolkit_sql_callproc(self, sql):
@@ -276,10 +390,10 @@ class IBMiModule(object):
             err = str(command_output)
         return rc, out, err
 
-    def itoolkit_sql_callproc_once(self, sql):
+    def itoolkit_sql_callproc_once(self, sql, defer_job_log=False):
         '''This method equals to itoolkit_sql_callproc and itoolkit_get_job_log'''
         rc, out_list, error = self.itoolkit_sql_callproc(sql)
-        job_log = self.get_job_log('*', self.startd)
+        job_log = self.get_task_job_log(defer_job_log)
         return rc, out_list, error, job_log
 
     def itoolkit_run_command(self, command):
@@ -302,10 +416,57 @@ class IBMiModule(object):
             err = str(command_output)
         return rc, out, err
 
-    def itoolkit_run_command_once(self, command):
+    def itoolkit_run_batch(self, operations, stop_on_error=False):
+        '''Runs itoolkit operations like iCmd, iPgm and iSqlQuery in one XMLSERVICE call
+        instead of one call per operation, every operation needs its own key.
+        If stop_on_error is True, XMLSERVICE stops at the first failed operation and the
+        operations after it are not run, otherwise a failed operation does not stop the others.
+        Returns a list of (rc, output dict, error) in the order of the operations'''
+        results = []
+        failed = False
+        for start in range(0, len(operations), IBMi_BATCH_MAX_OPERATIONS):
+            chunk = operations[start:start + IBMi_BATCH_MAX_OPERATIONS]
+            if failed:
+                results.extend((ibmi_util.IBMi_COMMAND_RC_NOT_RUN, {},
+                                "Not run since a previous operation failed.") for operation in chunk)
+                continue
+            itool = iToolKit()
+            itransport = DatabaseTransport(self.conn)
+            for operation in chunk:
+                # XMLSERVICE error='on' stops the script at the first error, error='off' goes on with the
+                # next operation, the default error='fast' would stop it too
+                operation.opt['error'] = 'on' if stop_on_error else 'off'
+                itool.add(operation)
+            itool.call(itransport)
+            output = itool.dict_out()
+            for operation in chunk:
+                key = operation.opt['i']
+                if failed:
+                    results.append((ibmi_util.IBMi_COMMAND_RC_NOT_RUN, {},
+                                    "Not run since a previous operation failed."))
+                elif key not in output or 'error' in output[key]:
+                    failed = stop_on_error
+                    results.append((ibmi_util.IBMi_COMMAND_RC_ERROR, output.get(key, {}),
+                                    str(output.get(key, {'error': output}))))
+                else:
+                    results.append((ibmi_util.IBMi_COMMAND_RC_SUCCESS, output[key], ''))
+        if ibmi_util.log_enabled():
+            ibmi_util.log_debug(f"batch of {len(operations)} operations run: " + str(results), sys._getframe().f_code.co_name)
+        return results
+
+    def itoolkit_run_command_batch(self, commands, stop_on_error=False):
+        '''Runs a list of commands like itoolkit_run_command, but in one XMLSERVICE call.
+        Returns a list of (rc, out, err), one for each command'''
+        operations = [iCmd(f'command{i}', command) for i, command in enumerate(commands)]
+        results = []
+        for rc, output, err in self.itoolkit_run_batch(operations, stop_on_error):
+            results.append((rc, str(output) if rc == ibmi_util.IBMi_COMMAND_RC_SUCCESS else '', err))
+        return results
+
+    def itoolkit_run_command_once(self, command, defer_job_log=False):
         '''This method equals to itoolkit_run_command and itoolkit_get_job_log'''
         rc, out, error = self.itoolkit_run_command(command)
-        job_log = self.get_job_log('*', self.startd)
+        job_log = self.get_task_job_log(defer_job_log)
         return rc, out, error, job_log
 
     def itoolkit_run_command5250(self, command):
@@ -318,7 +479,8 @@ class IBMiModule(object):
         itool.add(iCmd5250('command', command))
         itool.call(itransport)
         command_output = itool.dict_out('command')
-        ibmi_util.log_debug("command_output " + str(command_output), sys._getframe().f_code.co_name)
+        if ibmi_util.log_enabled():
+            ibmi_util.log_debug("command_output " + str(command_output), sys._getframe().f_code.co_name)
 
         out = ''
         err = ''
@@ -331,10 +493,10 @@ class IBMiModule(object):
             out = str(command_output['command'])
         return rc, out, err
 
-    def itoolkit_run_command5250_once(self, command):
+    def itoolkit_run_command5250_once(self, command, defer_job_log=False):
         '''This method equals to itoolkit_run_command5250 and itoolkit_get_job_log'''
         rc, out, error = self.itoolkit_run_command5250(command)
-        job_log = self.get_job_log('*', self.startd)
+        job_log = self.get_task_job_log(defer_job_log)
         return rc, out, error, job_log
 
     def itoolkit_run_rtv_command(self, command, args_dict):
@@ -350,7 +512,8 @@ class IBMiModule(object):
         itool.add(iCmd('rtv_command', command + args))
         itool.call(itransport)
         rtv_command = itool.dict_out('rtv_command')
-        ibmi_util.log_debug("rtv_command to run: " + str(rtv_command), sys._getframe().f_code.co_name)
+        if ibmi_util.log_enabled():
+            ibmi_util.log_debug("rtv_command to run: " + str(rtv_command), sys._getframe().f_code.co_name)
         if 'error' in rtv_command:
             rc = ibmi_util.IBMi_COMMAND_RC_ERROR
             out_dict = {}
@@ -363,57 +526,18 @@ class IBMiModule(object):
             error = ''
         return rc, out_dict, error
 
-    def itoolkit_run_rtv_command_once(self, command, args_dict):
+    def itoolkit_run_rtv_command_once(self, command, args_dict, defer_job_log=False):
         '''This method equals to itoolkit_run_rtv_command and itoolkit_get_job_log'''
         rc, out, error = self.itoolkit_run_rtv_command(command, args_dict)
-        job_log = self.get_job_log('*', self.startd)
+        job_log = self.get_task_job_log(defer_job_log)
         return rc, out, error, job_log
 
-    def db_get_result_list(self, sql, hex_convert_columns):
+    def db_get_result_list(self, sql, hex_convert_columns, max_rows=None, columns=None):
         '''returns the result list containing maps with column name as key, column value as value'''
         result_list = []
-        ibmi_util.log_debug("sql to run: " + str(sql))
         try:
-            # Already known hex column names
-            known_hex_convert_columns = ['MESSAGE_KEY', 'ASSOCIATED_MESSAGE_KEY', 'INTERNAL_JOB_ID']
-            if not hex_convert_columns:
-                hex_convert_columns = []
-            hex_convert_columns.extend(known_hex_convert_columns)
-            cur = self.conn.cursor()
-            cur.execute(sql)
-            field_map = self.db_get_fields_from_cursor(cur)
-
-            for row in cur:
-                row_map = {}
-                for (k, v) in field_map.items():
-                    col_num = v[0]
-                    # wy: convert the db data type to python data type
-                    # do not do changes to those types we cannot find a python type to convert
-                    col_type = v[1]
-                    # if not row[col_num]:
-                    if row[col_num] is None:
-                        row_map[str(k)] = ''
-                    elif col_type in [dbi.STRING, dbi.TEXT, dbi.XML, dbi.BINARY]:
-                        try:
-                            # Chang Le: convert the string which actually store a hex, like MESSAGE_KEY
-                            if str(k) in hex_convert_columns:
-                                row_map[str(k)] = binascii.b2a_hex(row[col_num]).decode('utf-8').upper()
-                            else:
-                                row_map[str(k)] = str(row[col_num])
-                        except TypeError:
-                            row_map[str(k)] = str(row[col_num])
-                    elif col_type in [dbi.NUMBER]:
-                        row_map[str(k)] = int(row[col_num])
-                    # elif col_type in [dbi.BIGINT]:
-                    #     row_map[str(k)] = long(row[col_num])
-                    elif col_type in [dbi.FLOAT, dbi.DECIMAL]:
-                        row_map[str(k)] = float(row[col_num])
-                    elif col_type in [dbi.DATE, dbi.TIME, dbi.DATETIME]:
-                        row_map[str(k)] = str(row[col_num])
-                    else:
-                        row_map[str(k)] = row[col_num]
+            for row_map in self.db_iter_result_list(sql, hex_convert_columns, max_rows, columns):
                 result_list.append(row_map)
-            cur.close()
             rc = ibmi_util.IBMi_COMMAND_RC_SUCCESS
             error = None
         except Exception as inst:
@@ -421,6 +545,66 @@ class IBMiModule(object):
             error = str(inst)
         return rc, result_list, error
 
+    def db_iter_result_list(self, sql, hex_convert_columns=None, max_rows=None, columns=None,
+                            batch_size=IBMi_DB_FETCH_BATCH_SIZE, parameters=None):
+        '''generator of the maps db_get_result_list returns. Rows are fetched batch_size at a time,
+        at most max_rows rows are returned and columns limits the keys of the maps to those columns.
+        parameters are the values of the parameter markers of sql'''
+        ibmi_util.log_debug("sql to run: " + str(sql))
+        cur = self.conn.cursor()
+        try:
+            if parameters:
+                cur.execute(sql, parameters)
+            else:
+                cur.execute(sql)
+            converters = self.db_get_column_converters(cur, hex_convert_columns, columns)
+            row_count = 0
+            while max_rows is None or row_count < max_rows:
+                fetch_size = batch_size if max_rows is None else min(batch_size, max_rows - row_count)
+                rows = cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    # wy: convert the db data type to python data type
+                    row_map = {}
+                    for (name, col_num, converter) in converters:
+                        value = row[col_num]
+                        row_map[name] = '' if value is None else converter(value)
+                    yield row_map
+                row_count = row_count + len(rows)
+        finally:
+            cur.close()
+
+    def db_get_column_converters(self, cursor, hex_convert_columns=None, columns=None):
+        '''returns a list of (column name, column number, converter) from the cursor description,
+        the converter turns a not null value of the column to the python value to return'''
+        hex_columns = set(IBMi_KNOWN_HEX_COLUMNS)
+        if hex_convert_columns:
+            hex_columns.update(hex_convert_columns)
+        wanted_columns = None
+        if columns:
+            wanted_columns = set(str(column).upper() for column in columns)
+        converters = []
+        for (k, v) in self.db_get_fields_from_cursor(cursor).items():
+            name = str(k)
+            if wanted_columns is not None and name.upper() not in wanted_columns:
+                continue
+            # do not do changes to those types we cannot find a python type to convert
+            col_type = v[1]
+            if col_type in [dbi.STRING, dbi.TEXT, dbi.XML, dbi.BINARY]:
+                # Chang Le: convert the string which actually store a hex, like MESSAGE_KEY
+                converter = _hex_or_str if name in hex_columns else str
+            elif col_type in [dbi.NUMBER]:
+                converter = int
+            elif col_type in [dbi.FLOAT, dbi.DECIMAL]:
+                converter = float
+            elif col_type in [dbi.DATE, dbi.TIME, dbi.DATETIME]:
+                converter = str
+            else:
+                converter = _unchanged
+            converters.append((name, v[0], converter))
+        return converters
+
     def db_get_fields_from_cursor(self, cursor):
         results = {}
         column = 0
@@ -458,53 +642,43 @@ class IBMiModule(object):
 
         return out, err
 
-    def get_job_log(self, job_name, time=None):
-        ibmi_util.log_info("get_job_log: job_name is " + job_name + ", time is " + str(time))
-        if time:
-            sql = "SELECT ORDINAL_POSITION, MESSAGE_ID, MESSAGE_TYPE, MESSAGE_SUBTYPE, SEVERITY, " + \
-                  "MESSAGE_TIMESTAMP, FROM_LIBRARY, FROM_PROGRAM, FROM_MODULE, FROM_PROCEDURE, FROM_INSTRUCTION, " + \
-                  "TO_LIBRARY, TO_PROGRAM, TO_MODULE, TO_PROCEDURE, TO_INSTRUCTION, FROM_USER, MESSAGE_FILE, " + \
-                  "MESSAGE_LIBRARY, MESSAGE_TEXT, MESSAGE_SECOND_LEVEL_TEXT " + \
-                  "FROM TABLE(QSYS2.JOBLOG_INFO('" + job_name + "')) A WHERE MESSAGE_TIMESTAMP >= '" + str(time) + "' " + \
-                  "ORDER BY ORDINAL_POSITION DESC"
-        else:
-            sql = "SELECT ORDINAL_POSITION, MESSAGE_ID, MESSAGE_TYPE, MESSAGE_SUBTYPE, SEVERITY, " + \
-                  "MESSAGE_TIMESTAMP, FROM_LIBRARY, FROM_PROGRAM, FROM_MODULE, FROM_PROCEDURE, FROM_INSTRUCTION, " + \
-                  "TO_LIBRARY, TO_PROGRAM, TO_MODULE, TO_PROCEDURE, TO_INSTRUCTION, FROM_USER, MESSAGE_FILE, " + \
-                  "MESSAGE_LIBRARY, MESSAGE_TEXT, MESSAGE_SECOND_LEVEL_TEXT " + \
-                  "FROM TABLE(QSYS2.JOBLOG_INFO('" + job_name + \
-                "')) A ORDER BY ORDINAL_POSITION DESC"
-        out_result_set, err = self.ibm_dbi_sql_query(sql)
-
+    def get_job_log(self, job_name, time=None, since_ordinal=None, columns=None, end_time=None,
+                    min_severity=None, message_ids=None, message_types=None, limit=None):
+        '''Returns the messages of the job log of job_name, newest first, as maps of the columns of
+        QSYS2.JOBLOG_INFO, all the columns of ibmi_job_log.JOB_LOG_COLUMNS if columns is not given.
+        The filters are applied by the query, see ibmi_job_log.select_statement. If the query returns
+        no message, the list holds {"FATAL": "Job not found."} as before'''
+        ibmi_util.log_info("get_job_log: job_name is " + job_name + ", time is " + str(time) +
+                           ", since_ordinal is " + str(since_ordinal))
+        sql, parameters = ibmi_job_log.select_statement(
+            job_name, columns=columns, start_time=time, end_time=end_time, since_ordinal=since_ordinal,
+            min_severity=min_severity, message_ids=message_ids, message_types=message_types, limit=limit)
+        ibmi_util.log_debug("sql to run: " + str(sql))
         out = []
-        if (not out_result_set) and (not err):
-            err = {"FATAL": "Job not found."}
-            out.append(err)
-        else:
-            for result in out_result_set:
-                result_map = {"ORDINAL_POSITION": result[0],
-                              "MESSAGE_ID": result[1],
-                              "MESSAGE_TYPE": result[2],
-                              "MESSAGE_SUBTYPE": result[3],
-                              "SEVERITY": result[4],
-                              "MESSAGE_TIMESTAMP": result[5],
-                              "FROM_LIBRARY": result[6],
-                              "FROM_PROGRAM": result[7],
-                              "FROM_MODULE": result[8],
-                              "FROM_PROCEDURE": result[9],
-                              "FROM_INSTRUCTION": result[10],
-                              "TO_LIBRARY": result[11],
-                              "TO_PROGRAM": result[12],
-                              "TO_MODULE": result[13],
-                              "TO_PROCEDURE": result[14],
-                              "TO_INSTRUCTION": result[15],
-                              "FROM_USER": result[16],
-                              "MESSAGE_FILE": result[17],
-                              "MESSAGE_LIBRARY": result[18],
-                              "MESSAGE_TEXT": result[19],
-                              "MESSAGE_SECOND_LEVEL_TEXT": result[20],
-                              }
-                out.append(result_map)
+        err = ''
+        try:
+            cursor = self.conn.cursor()
+            try:
+                if parameters:
+                    cursor.execute(sql, parameters)
+                else:
+                    cursor.execute(sql)
+                names = [d[0] for d in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(IBMi_DB_FETCH_BATCH_SIZE)
+                    if not rows:
+                        break
+                    out.extend(dict(zip(names, row)) for row in rows)
+            finally:
+                cursor.close()
+        except Exception as inst:
+            err = str(inst)
+            ibmi_util.log_debug("sql run into exception " + err)
+        if (not out) and (not err):
+            out.append({"FATAL": "Job not found."})
+        elif columns and ibmi_job_log.JOB_LOG_ORDINAL_COLUMN not in columns:
+            for message in out:
+                del message[ibmi_job_log.JOB_LOG_ORDINAL_COLUMN]
         return out
 
     def get_job_log_NLS(self, job_name, cast_ccsid, time=None):
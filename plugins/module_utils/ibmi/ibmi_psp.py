@@ -0,0 +1,371 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Fetcher and parsers of the PSP (Preventive Service Planning) pages of the PTF
+# groups and PTFs. PSPFetcher gets the pages on a pool of worker threads, the
+# requests to a host are spaced by a rate limiter instead of fixed sleeps, and
+# the pages are kept in an on-disk cache: a page younger than the cache TTL is
+# served from the disk, an older one is revalidated with its ETag and
+# Last-Modified headers so an unchanged page is not downloaded again. Several
+# hosts delegating to the same node share the cache.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils import urls
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+from ansible.module_utils.six.moves.urllib.parse import urlparse
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+
+PSP_BASE_URL = "https://www.ibm.com/support/pages"
+ALL_GROUP_PAGE = PSP_BASE_URL + "/ibm-i-group-ptfs-level"
+CUM_PAGE_PREFIX = PSP_BASE_URL + "/uid/nas4"
+PTF_PAGE_PREFIX = PSP_BASE_URL + "/ptf/"
+HTTP_AGENT = "ansible/ibm.power_ibmi"
+
+IBMi_PSP_MAX_WORKERS = 4
+IBMi_PSP_REQUESTS_PER_SECOND = 4.0
+IBMi_PSP_CACHE_DIR = '/etc/ibmi_ansible/fix_management/psp_cache'
+IBMi_PSP_CACHE_TTL = 3600
+
+# url: https://www.ibm.com/support/pages/ibm-i-group-ptfs-level
+GROUP_LINK_PATTERN = re.compile(
+    r'>(?P<rel>R\d{3})<.+?'
+    r'(?P<url>https:\/\/\S+?)\".+?>'
+    r'(?P<grp>[A-Z]{2}\d{5}):.+?'
+    r'(?P<dsc>\w.+?)<.+?'
+    r'(?P<lvl>\d{1,5})<.+?>'
+    r'(?P<d>\d{2}\/\d{2}\/\d{4})<'
+)
+# url: https://www.ibm.com/support/pages/uid/nas4SF99738
+GROUP_PTF_PATTERN = re.compile(
+    r'(?P<url>https://www.ibm.com/support/pages/ptf/\S+?)\".+?'
+    r'(?P<ptf>[A-Z]{2}\d{5})<.+?'
+    r'(?P<date>\d{2}\/\d{2}\/\d{2}).+?'
+    r'(?P<apar>[A-Z]{2}\d{5}).+?'
+    r'(?P<product>\d{4}\w{3})'
+)
+PACKAGE_ID_PATTERN = re.compile(r'PACKAGE ID:.+?(?P<packid>[A-Z]\d{7})')
+# url: https://www.ibm.com/support/pages/uid/nas4C0128730
+CUM_PTF_PATTERN = re.compile(
+    r'(?P<url>https?:\/\/\S+)>'
+    r'(?P<ptf>[A-Z]{2}\d{5})<.+'
+    r'(?P<lvl>\d{5}).+'
+    r'(?P<product>\d{4}\w{3}).+'
+    r'(?P<rel>V\dR\dM\d)'
+)
+# url: https://www.ibm.com/support/pages/ptf/SI71691
+REQUISITE_PATTERN = re.compile(r'<tt>(?P<req>(CO|PRE|DIST)).+?(?P<prod>\d{4}\w{3}).+?(?P<ptf>(SI|MF)\d{5}).+?</tt><br>')
+PTF_ID_PATTERN = re.compile(r'(SI|MF)\d{5}')
+
+
+class RateLimiter(object):
+    '''Spaces the requests to each host by at least 1 / requests_per_second seconds'''
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0
+        self.next_time = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.time()
+            start = max(now, self.next_time.get(host, now))
+            self.next_time[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class PageCache(object):
+    '''Pages on disk, a file of the body and a file of the url, ETag, Last-Modified and fetch
+    time per page. The files are replaced atomically, so tasks can share the directory'''
+
+    def __init__(self, cache_dir, ttl):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + '.html'), os.path.join(self.cache_dir, key + '.json')
+
+    def _write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def load(self, url):
+        '''Returns the meta dict and the body of the page, None and None if it is not cached'''
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'r', encoding='utf-8') as f:
+                body = f.read()
+        except (IOError, OSError, ValueError):
+            return None, None
+        if meta.get('url') != url:
+            return None, None
+        return meta, body
+
+    def is_fresh(self, meta):
+        return time.time() - meta.get('fetched_at', 0) < self.ttl
+
+    def store(self, url, body, etag=None, last_modified=None):
+        body_path, meta_path = self._paths(url)
+        self._write(body_path, body.encode('utf-8'))
+        self.touch(url, dict(url=url, etag=etag, last_modified=last_modified))
+
+    def touch(self, url, meta):
+        meta = dict(meta, fetched_at=time.time())
+        self._write(self._paths(url)[1], json.dumps(meta).encode('utf-8'))
+
+
+class PSPFetcher(object):
+    '''Gets PSP pages on max_workers threads with at most requests_per_second requests per host.
+    With cache_dir, the pages are cached on disk for cache_ttl seconds and revalidated after.
+    base_url replaces the PSP_BASE_URL prefix of the urls, e.g. for a mirror of the pages'''
+
+    def __init__(self, validate_certs=True, timeout=10, max_workers=IBMi_PSP_MAX_WORKERS,
+                 requests_per_second=IBMi_PSP_REQUESTS_PER_SECOND, cache_dir=None, cache_ttl=IBMi_PSP_CACHE_TTL,
+                 base_url=None):
+        self.validate_certs = validate_certs
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.base_url = base_url.rstrip('/') if base_url else PSP_BASE_URL
+        self.cache = None
+        if cache_dir:
+            try:
+                if not os.path.isdir(cache_dir):
+                    ibmi_util.ensure_dir(cache_dir)
+            except OSError as e:
+                # another task may have created it meanwhile
+                if not os.path.isdir(cache_dir):
+                    ibmi_util.log_info(f"PSP page cache {cache_dir} is not used: {e}", 'ibmi_psp')
+            if os.path.isdir(cache_dir):
+                self.cache = PageCache(cache_dir, cache_ttl)
+        self.stats = dict(fetched=0, cached=0, revalidated=0, errors=0)
+        self.stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def _open(self, url, headers):
+        self.rate_limiter.wait(urlparse(url).netloc)
+        return urls.open_url(url, headers=headers, validate_certs=self.validate_certs, timeout=self.timeout,
+                             http_agent=HTTP_AGENT)
+
+    def get(self, url):
+        '''Returns the text of the page, raises the error of the request if it failed'''
+        if url.startswith(PSP_BASE_URL):
+            url = self.base_url + url[len(PSP_BASE_URL):]
+        meta, body = self.cache.load(url) if self.cache else (None, None)
+        if meta and self.cache.is_fresh(meta):
+            self._count('cached')
+            return body
+        headers = {}
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            response = self._open(url, headers)
+        except HTTPError as e:
+            if e.code == 304 and meta:
+                try:
+                    self.cache.touch(url, meta)
+                except (IOError, OSError) as e:
+                    ibmi_util.log_info(f"Failed to cache {url}: {e}", 'ibmi_psp')
+                self._count('revalidated')
+                return body
+            self._count('errors')
+            raise
+        except Exception:
+            self._count('errors')
+            raise
+        text = response.read().decode("utf-8")
+        self._count('fetched')
+        if self.cache:
+            try:
+                self.cache.store(url, text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            except (IOError, OSError) as e:
+                ibmi_util.log_info(f"Failed to cache {url}: {e}", 'ibmi_psp')
+        return text
+
+    def map(self, func, items):
+        '''Returns [func(item) for item in items], called on the worker threads'''
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+
+def parse_group_page(text, groups):
+    '''Returns the groups of the all groups page, all of them if groups has *ALL'''
+    groups = set(x.upper() for x in groups)
+    list_all = '*ALL' in groups
+    group_list = []
+    for line in text.splitlines():
+        for ptf_line in GROUP_LINK_PATTERN.finditer(line):
+            if list_all or ptf_line.group('grp') in groups:
+                group_list.append(dict(
+                    ptf_group_number=ptf_line.group('grp'),
+                    ptf_group_level=int(ptf_line.group('lvl')),
+                    release=ptf_line.group('rel'),
+                    release_date=ptf_line.group('d'),
+                    url=ptf_line.group('url'),
+                    description=ptf_line.group('dsc'),
+                ))
+    return group_list
+
+
+def parse_group_ptf_page(text):
+    '''Returns the PTFs of a group page and None, or None and the package id if the group is a
+    cumulative package, whose PTFs are on the page of the package'''
+    ptf_list = []
+    for line in text.splitlines():
+        cum_pack_id = PACKAGE_ID_PATTERN.search(line)
+        if cum_pack_id:
+            return None, cum_pack_id.group('packid')
+        for ptf_line in GROUP_PTF_PATTERN.finditer(line):
+            ptf_list.append(dict(
+                ptf_id=ptf_line.group('ptf'),
+                product=ptf_line.group('product'),
+                apar=ptf_line.group('apar'),
+                date=ptf_line.group('date'),
+            ))
+    return ptf_list, None
+
+
+def parse_cum_ptf_page(text):
+    ptf_list = []
+    for line in text.splitlines():
+        for ptf_line in CUM_PTF_PATTERN.finditer(line):
+            ptf_list.append(dict(
+                ptf_id=ptf_line.group('ptf'),
+                product=ptf_line.group('product'),
+                level_added=ptf_line.group('lvl'),
+                release=ptf_line.group('rel'),
+            ))
+    return ptf_list
+
+
+def parse_requisites(text):
+    '''Returns a list of (ptf_id, req_type) of the requisites on a PTF page, in page order'''
+    requisites = []
+    for line in text.splitlines():
+        for ptf_line in REQUISITE_PATTERN.finditer(line):
+            requisites.append((ptf_line.group('ptf'), ptf_line.group('req')))
+    return requisites
+
+
+def get_group_ptf_list(fetcher, url):
+    try:
+        ptf_list, pack_id = parse_group_ptf_page(fetcher.get(url))
+        if pack_id is None:
+            return ptf_list
+        url = CUM_PAGE_PREFIX + pack_id
+        return parse_cum_ptf_page(fetcher.get(url))
+    except Exception as e:
+        return [dict(url=url, error=str(e))]
+
+
+def get_group_info(fetcher, groups):
+    '''Returns the info and the PTF list of the groups, the group pages are fetched concurrently'''
+    try:
+        text = fetcher.get(ALL_GROUP_PAGE)
+    except Exception as e:
+        return [dict(url=ALL_GROUP_PAGE, error=str(e))]
+    group_list = parse_group_page(text, groups)
+    for group, ptf_list in zip(group_list, fetcher.map(lambda g: get_group_ptf_list(fetcher, g['url']), group_list)):
+        group['ptf_list'] = ptf_list
+    return group_list
+
+
+def get_requisites(fetcher, ptf):
+    '''Returns the list of (ptf_id, req_type) of the PTF, or a dict of the url and error'''
+    url = PTF_PAGE_PREFIX + ptf
+    try:
+        return parse_requisites(fetcher.get(url))
+    except Exception as e:
+        return dict(url=url, error=str(e))
+
+
+def fetch_requisites(fetcher, ptfs, expanded_requisites, store=None):
+    '''Returns a dict of PTF to the result of get_requisites() for the PTFs and, with
+    expanded_requisites, all the PTFs they require. A level of requisites is fetched at a time.
+    The requisites of a PTF in store, a RequisiteStore of ibmi_ptf_graph, are not fetched and
+    the ones fetched are saved to it'''
+    pages = {}
+    frontier = sorted(set(ptfs))
+    while frontier:
+        known = store.load(frontier) if store else {}
+        pages.update(known)
+        to_fetch = [ptf for ptf in frontier if ptf not in known]
+        fetched = {}
+        for ptf, page in zip(to_fetch, fetcher.map(lambda p: get_requisites(fetcher, p), to_fetch)):
+            pages[ptf] = page
+            if isinstance(page, list):
+                fetched[ptf] = page
+        if store and fetched:
+            store.save(fetched)
+        if not expanded_requisites:
+            break
+        found = set()
+        for ptf in frontier:
+            if isinstance(pages[ptf], list):
+                found.update(req for req, req_type in pages[ptf])
+        frontier = sorted(found.difference(pages))
+    return pages
+
+
+def requisite_list(ptf, pages, expanded_requisites):
+    '''Returns the requisites of the PTF from the pages of fetch_requisites(), each PTF once, in
+    the order of a depth first walk of the pages'''
+    page = pages[ptf]
+    if isinstance(page, dict):
+        return [page]
+    reqs = []
+    seen = set()
+    stack = [iter(page)]
+    while stack:
+        try:
+            req, req_type = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+        if req in seen:
+            continue
+        seen.add(req)
+        reqs.append(dict(ptf_id=req, req_type=req_type))
+        if expanded_requisites:
+            req_page = pages.get(req)
+            if isinstance(req_page, dict):
+                reqs.append(req_page)
+            elif req_page:
+                stack.append(iter(req_page))
+    return reqs
+
+
+def get_ptf_info(fetcher, ptfs, expanded_requisites, store=None):
+    '''Returns the list of the PTFs and their requisites, and the pages of fetch_requisites()'''
+    ptfs = [ptf for ptf in set(x.upper() for x in ptfs) if PTF_ID_PATTERN.match(ptf)]
+    pages = fetch_requisites(fetcher, ptfs, expanded_requisites, store)
+    return [dict(ptf_id=ptf, req_list=requisite_list(ptf, pages, expanded_requisites)) for ptf in ptfs], pages
@@ -0,0 +1,152 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Requisite graph of PTFs. ibmi_psp.fetch_requisites() expands the requisites
+# breadth first from the PSP pages, a level of PTFs at a time. RequisiteStore
+# keeps the requisites of each PTF in a table of the fix repo database, so later
+# runs resolve them without the network until they are older than a TTL, then
+# they are fetched again in case the PSP page changed. apply_order() sorts the graph
+# topologically, the requisites of a PTF before the PTF, and reports the PTFs of
+# requisite cycles, which are kept next to each other.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+
+REQUISITE_CACHE_TABLE = 'ptf_requisite_cache'
+# Created if missing instead of by a migration, the table lives in the databases of
+# other modules, which track their own schema versions
+REQUISITE_CACHE_SCHEMA = [
+    f'CREATE TABLE IF NOT EXISTS {REQUISITE_CACHE_TABLE} (ptf_id CHAR(10) PRIMARY KEY, requisites TEXT, '
+    'add_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP)',
+]
+# SQLite limits the number of bound parameters of a statement
+IBMi_SQL_BATCH_SIZE = 500
+# Seconds the requisites of a PTF are used before they are fetched again
+IBMi_REQUISITE_TTL = 7 * 24 * 3600
+
+
+class RequisiteStore(object):
+    '''The requisites of PTFs in the fix repo database, a list of (ptf_id, req_type) per PTF.
+    Requisites added more than ttl seconds ago are not loaded'''
+
+    def __init__(self, conn, ttl=IBMi_REQUISITE_TTL):
+        self.conn = conn
+        self.ttl = ttl
+        # the number of PTFs found by load()
+        self.hits = 0
+        for statement in REQUISITE_CACHE_SCHEMA:
+            conn.execute(statement)
+
+    def load(self, ptfs):
+        found = {}
+        ptfs = list(ptfs)
+        for i in range(0, len(ptfs), IBMi_SQL_BATCH_SIZE):
+            batch = ptfs[i:i + IBMi_SQL_BATCH_SIZE]
+            placeholders = ', '.join('?' for ptf in batch)
+            # add_time is CURRENT_TIMESTAMP, in the format of datetime()
+            cursor = self.conn.execute(
+                f'SELECT ptf_id, requisites FROM {REQUISITE_CACHE_TABLE} WHERE ptf_id IN ({placeholders}) '
+                "AND add_time > datetime('now', ?)", batch + [f'-{int(self.ttl)} seconds'])
+            for ptf, requisites in cursor:
+                found[ptf] = [tuple(req) for req in json.loads(requisites)]
+        self.hits += len(found)
+        return found
+
+    def save(self, requisites):
+        with self.conn:
+            self.conn.executemany(
+                f'INSERT OR REPLACE INTO {REQUISITE_CACHE_TABLE} (ptf_id, requisites) VALUES(?, ?)',
+                [(ptf, json.dumps(reqs)) for ptf, reqs in requisites.items()])
+
+
+def strongly_connected(graph):
+    '''Returns the strongly connected components of graph, a dict of node to its successors, each
+    component after the components it reaches (Tarjan's algorithm, without recursion)'''
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for root in sorted(graph):
+        if root in index:
+            continue
+        work = [(root, iter(graph.get(root, ())))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            advanced = False
+            for succ in successors:
+                if succ not in index:
+                    index[succ] = lowlink[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(graph.get(succ, ()))))
+                    advanced = True
+                    break
+                if succ in on_stack:
+                    lowlink[node] = min(lowlink[node], index[succ])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(sorted(component))
+    return components
+
+
+def apply_order(pages):
+    '''Returns the PTFs of the graph in an order to apply them, the requisites of a PTF before the
+    PTF, and the requisite cycles, lists of PTFs which require each other. The PTFs of a cycle are
+    next to each other in the order'''
+    graph = {}
+    for ptf, page in pages.items():
+        graph[ptf] = sorted(set(req for req, req_type in page)) if isinstance(page, list) else []
+        for req in graph[ptf]:
+            graph.setdefault(req, [])
+    order = []
+    cycles = []
+    # Tarjan's algorithm emits a component after all the components it requires
+    for component in strongly_connected(graph):
+        order.extend(component)
+        if len(component) > 1 or component[0] in graph[component[0]]:
+            cycles.append(component)
+    return order, cycles
+
+
+def graph_info(pages, fetcher, store=None):
+    '''Returns the graph of pages as a dict of PTF to its requisites, with the apply order, the
+    cycles, the PTFs whose page failed and the counts of where the requisites came from'''
+    order, cycles = apply_order(pages)
+    graph = {}
+    for ptf, page in pages.items():
+        if isinstance(page, list):
+            seen = set()
+            graph[ptf] = []
+            for req, req_type in page:
+                if req not in seen:
+                    seen.add(req)
+                    graph[ptf].append(dict(ptf_id=req, req_type=req_type))
+    return dict(
+        graph=graph,
+        apply_order=order,
+        cycles=cycles,
+        errors=[dict(page, ptf_id=ptf) for ptf, page in pages.items() if isinstance(page, dict)],
+        pages_fetched=fetcher.stats['fetched'],
+        pages_from_cache=fetcher.stats['cached'] + fetcher.stats['revalidated'],
+        ptfs_from_database=store.hits if store else 0,
+    )
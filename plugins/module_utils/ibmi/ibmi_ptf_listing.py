@@ -0,0 +1,172 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# Parsers of the text files shipped with PTF images: the ilst*.txt order
+# listings of the images downloaded by Fix Central and the .TXT cover letters
+# of the PTF groups. The files are read line by line in one pass, the patterns
+# are compiled once and a line is only searched with the patterns whose
+# keyword it contains, the order, date and package fields stop being searched
+# once they are found.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import re
+
+PTF_PATTERN = re.compile(r'[A-Z]{2}\d{5}')
+GROUP_PATTERN = re.compile(r'(?P<group>[A-Z]{2}\d{5})\s+Level\s+(?P<level>\d+)')
+# a listing is of a PTF group when a line starts with a group level, in any case
+GROUP_TYPE_PATTERN = re.compile(r'(?P<group>[A-Z]{2}\d{5})\s+Level\s+(?P<level>\d+)', re.IGNORECASE)
+ORDER_PATTERN = re.compile(r'Order#:\s+(?P<order>\w{6,10})')
+DATE_PATTERN = re.compile(r'Date:\s+(?P<date>\d{4}/\d{1,2}/\d{1,2})')
+ORDERED_PTF_PATTERN = re.compile(r'(?P<ptf>[A-Z]{2}\d{5})\s+ORDERED\s+<<< Shipped >>>\s+(?P<product>\S{7})\s+(?P<vrm>V\d+R\d+M\d+)')
+GROUP_VRM_PATTERN = re.compile(r'(?P<group>[A-Z]{2}\d{5}).+<<< Shipped >>>\s+SEL Lst\s+(?P<vrm>V\d+R\d+M\d+)')
+SHIPPED_PTF_PATTERN = re.compile(r'(?P<ptf>[A-Z]{2}\d{5}).+<<< Shipped >>>\s+(?P<product>\S{7})\s+(?P<vrm>V\d+R\d+M\d+)')
+VRM_PATTERN = re.compile(r'VERSION\s+(?P<v>\d+)\s+RELEASE\s+(?P<r>\d+)\.(?P<m>\d+)')
+CUM_ID_PATTERN = re.compile(r'PACKAGE ID:\s+(?P<cum_id>\w+)')
+
+CUM_PACKAGE_TITLE = 'IBM i CUMULATIVE PTF PACKAGE'
+SHIPPED_KEYWORD = '<<< Shipped >>>'
+
+
+def iter_lines(file_path):
+    '''Yields the stripped non empty lines of the file'''
+    with open(file_path, 'r', encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def vrm_of(match):
+    return 'V' + match.group('v') + 'R' + match.group('r') + 'M' + match.group('m')
+
+
+def parse_order_listing(lines):
+    '''Parses the lines of an ilst*.txt order listing. Returns a dict of the image_type (single_ptf,
+    group or cum), order_id, download_date, cum_id, cum_vrm, ordered_ptf and shipped_ptf. The
+    ordered_ptf are the ordered groups with their level and release if the listing has groups'''
+    image_type = 'single_ptf'
+    order_str = None
+    date_str = None
+    cum_id = None
+    cum_vrm = None
+    in_group = False
+    ordered_group = []
+    group_set = set()
+    group_vrm = {}
+    ordered_ptf = []
+    shipped_ptf = []
+
+    for line in lines:
+        if image_type == 'single_ptf' and GROUP_TYPE_PATTERN.match(line):
+            image_type = 'group'
+        if line == CUM_PACKAGE_TITLE:
+            image_type = 'cum'
+        if date_str is None and 'Date:' in line:
+            m = DATE_PATTERN.search(line)
+            if m:
+                date_str = m.group('date')
+        if order_str is None and 'Order#:' in line:
+            m = ORDER_PATTERN.search(line)
+            if m:
+                order_str = m.group('order')
+        group_line = 'Level' in line and GROUP_PATTERN.search(line)
+        if group_line:
+            # the lines after a group level list the PTFs of the group
+            in_group = True
+            if group_line.group('group') not in group_set:
+                group_set.add(group_line.group('group'))
+                ordered_group.append(dict(
+                    group=group_line.group('group'),
+                    level=int(group_line.group('level')),
+                    release=None,
+                ))
+        elif in_group:
+            m = PTF_PATTERN.search(line)
+            if m and ordered_group:
+                shipped_ptf.append(m.group())
+        if cum_id is None and 'PACKAGE ID:' in line:
+            m = CUM_ID_PATTERN.search(line)
+            if m:
+                cum_id = m.group('cum_id')
+        if cum_vrm is None and 'VERSION' in line:
+            m = VRM_PATTERN.search(line)
+            if m:
+                cum_vrm = vrm_of(m)
+        if SHIPPED_KEYWORD in line:
+            if 'SEL Lst' in line:
+                m = GROUP_VRM_PATTERN.search(line)
+                if m:
+                    group_vrm[m.group('group')] = m.group('vrm')
+            if 'ORDERED' in line:
+                m = ORDERED_PTF_PATTERN.search(line)
+                if m:
+                    ordered_ptf.append(dict(
+                        ptf=m.group('ptf'),
+                        product=m.group('product'),
+                        vrm=m.group('vrm'),
+                    ))
+            m = SHIPPED_PTF_PATTERN.search(line)
+            if m:
+                shipped_ptf.append(m.group('ptf'))
+
+    for group_info in ordered_group:
+        group_info['release'] = group_vrm.get(group_info['group'])
+        # the release of a cum package is in its group name, e.g. SF99730 for V7R3M0
+        if group_info['release'] is None and len(group_info['group']) == 7:
+            gn = group_info['group']
+            group_info['release'] = 'V' + gn[4] + 'R' + gn[5] + 'M' + gn[6]
+    if ordered_group:
+        ordered_ptf = ordered_group
+    return dict(
+        image_type=image_type,
+        order_id=order_str,
+        download_date=date_str,
+        cum_id=cum_id,
+        cum_vrm=cum_vrm,
+        ordered_ptf=ordered_ptf,
+        shipped_ptf=shipped_ptf,
+    )
+
+
+def parse_group_cover_letter(lines):
+    '''Parses the lines of the .TXT cover letter of a PTF group. Returns a dict of the group, its
+    level, the release and the list of PTFs of the group, the lines after the PTF list are not read'''
+    group_name = None
+    group_level = -1
+    vrm = None
+    in_group = False
+    ptf_list = []
+
+    for line in lines:
+        if vrm is None and 'VERSION' in line:
+            m = VRM_PATTERN.search(line)
+            if m:
+                vrm = vrm_of(m)
+        if group_name is None:
+            m = 'Level' in line and GROUP_PATTERN.search(line)
+            if m:
+                group_name = m.group('group')
+                group_level = m.group('level')
+                in_group = True
+                continue
+        if in_group:
+            m = PTF_PATTERN.search(line)
+            if not m:
+                break
+            ptf_list.append(m.group())
+
+    return dict(
+        group=group_name,
+        level=group_level,
+        vrm=vrm,
+        ptf_list=ptf_list,
+    )
+
+
+def read_order_listing(file_path):
+    return parse_order_listing(iter_lines(file_path))
+
+
+def read_group_cover_letter(file_path):
+    return parse_group_cover_letter(iter_lines(file_path))
@@ -0,0 +1,213 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# SFTP transfers from the current IBM i node to a remote node. One SSH
+# transport is authenticated per task, put_files() opens several SFTP channels
+# on it and each channel takes the largest file left, so a large save file does
+# not start last and the channels keep the link busy. The local files are
+# streamed to the channel in large chunks, save files are read straight from
+# their /QSYS.LIB path and only copied to a staging file if that read fails.
+# remote_checksums() hashes a list of remote files with one command.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import re
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+HAS_PARAMIKO = True
+try:
+    import paramiko
+except ImportError:
+    HAS_PARAMIKO = False
+
+IBMi_SFTP_PORT = 22
+IBMi_SFTP_MAX_CHANNELS = 4
+# Bytes read from a local file at a time, reads of /QSYS.LIB objects are costly
+IBMi_SFTP_CHUNK_SIZE = 1024 * 1024
+
+# Reads the paths from stdin and prints a line per path, the digest or an empty line if the
+# path cannot be read. IFS= and -r keep the blanks and backslashes of the paths. Only uses Bourne
+# shell syntax, the default shell of the user may be bsh
+IBMi_REMOTE_SHA256_COMMAND = 'while IFS= read -r f; do openssl dgst -sha256 < "$f" 2>/dev/null || echo; done'
+SHA256_HEX_PATTERN = re.compile(r'^[0-9a-fA-F]{64}$')
+
+
+def connect(remote_host, remote_user, private_key, port=IBMi_SFTP_PORT):
+    '''Returns an authenticated paramiko Transport to the remote host, private_key is the path of
+    an RSA private key file'''
+    p_key = paramiko.RSAKey.from_private_key_file(private_key)
+    transport = paramiko.Transport((remote_host, port))
+    try:
+        transport.connect(username=remote_user, pkey=p_key)
+    except Exception:
+        transport.close()
+        raise
+    return transport
+
+
+def exec_command(transport, command, stdin=None):
+    '''Runs the command on a session channel of the transport, returns its stdout'''
+    channel = transport.open_session()
+    try:
+        channel.exec_command(command)
+        if stdin is not None:
+            channel.sendall(stdin.encode('utf-8'))
+            channel.shutdown_write()
+        return channel.makefile('rb').read().decode('utf-8')
+    finally:
+        channel.close()
+
+
+def remote_checksums(transport, paths):
+    '''Returns the sha256 hex digest of each remote path, None for a path which cannot be read.
+    The files are hashed by one command on the remote host'''
+    if not paths:
+        return []
+    lines = exec_command(transport, IBMi_REMOTE_SHA256_COMMAND, stdin=''.join(path + '\n' for path in paths)).splitlines()
+    checksums = []
+    for idx in range(len(paths)):
+        # e.g. (stdin)= 5735b240...
+        digest = lines[idx].strip().rsplit(' ', 1)[-1] if idx < len(lines) else ''
+        checksums.append(digest.lower() if SHA256_HEX_PATTERN.match(digest) else None)
+    return checksums
+
+
+class RemoteHome(object):
+    '''Expands ~ in remote paths, the remote HOME is only asked for once'''
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.home = None
+
+    def expand(self, path):
+        if not path.startswith('~'):
+            return path
+        if self.home is None:
+            home = exec_command(self.transport, 'echo $HOME').strip()
+            if not home:
+                raise OSError("Get the dest 'HOME' path failed. ")
+            self.home = home
+        return os.path.join(self.home, os.path.relpath(path, '~/'))
+
+
+class LocalReadError(Exception):
+    '''The local file of a transfer cannot be read'''
+
+
+def put_stream(sftp, src, dest, chunk_size=IBMi_SFTP_CHUNK_SIZE):
+    '''Writes the local file src to the remote file dest, chunk_size bytes at a time, and checks the
+    size of dest. Returns the bytes written. A failure to read src raises LocalReadError'''
+    try:
+        fl = open(src, 'rb', buffering=0)
+    except (IOError, OSError) as e:
+        raise LocalReadError(e)
+    size = 0
+    with fl:
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        with sftp.open(dest, 'wb') as fr:
+            fr.set_pipelined(True)
+            while True:
+                try:
+                    n = fl.readinto(buffer)
+                except (IOError, OSError) as e:
+                    raise LocalReadError(e)
+                if not n:
+                    break
+                fr.write(bytes(view[:n]))
+                size += n
+    remote_size = sftp.stat(dest).st_size
+    if remote_size != size:
+        raise IOError(f"size mismatch in put!  {remote_size} != {size}")
+    return size
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def put_files(transport, transfers, max_channels=IBMi_SFTP_MAX_CHANNELS, stage=None):
+    '''transfers is a list of (local path, remote path). The files are put by max_channels SFTP
+    channels of the transport, largest first. When a local file cannot be read and stage is given,
+    stage(local path) returns the path of a copy of the file, which is put and removed instead, or
+    None to fail the transfer.
+    Returns a list with a dict per transfer, in the same order, of the bytes, seconds and
+    bytes_per_second of the put, or of the error raised, and a dict of the number of files and
+    bytes staged and the peak bytes of the staged copies at the same time'''
+    results = [None] * len(transfers)
+    staging = dict(files=0, bytes=0, peak_bytes=0)
+    staged_now = [0]
+    staging_lock = threading.Lock()
+    sizes = [_file_size(src) for src, dest in transfers]
+    pending = queue.Queue()
+    for idx in sorted(range(len(transfers)), key=lambda i: sizes[i], reverse=True):
+        pending.put(idx)
+    channel_errors = []
+
+    def put_staged(sftp, staged, dest):
+        size = _file_size(staged)
+        with staging_lock:
+            staging['files'] += 1
+            staging['bytes'] += size
+            staged_now[0] += size
+            staging['peak_bytes'] = max(staging['peak_bytes'], staged_now[0])
+        try:
+            return put_stream(sftp, staged, dest)
+        finally:
+            try:
+                os.remove(staged)
+            except OSError:
+                pass
+            with staging_lock:
+                staged_now[0] -= size
+
+    def worker():
+        try:
+            sftp = paramiko.SFTPClient.from_transport(transport)
+        except Exception as e:
+            channel_errors.append(e)
+            return
+        try:
+            while True:
+                try:
+                    idx = pending.get_nowait()
+                except queue.Empty:
+                    return
+                src, dest = transfers[idx]
+                start = time.time()
+                try:
+                    try:
+                        size = put_stream(sftp, src, dest)
+                    except LocalReadError as e:
+                        staged = stage(src) if stage is not None else None
+                        if staged is None:
+                            raise e.args[0]
+                        size = put_staged(sftp, staged, dest)
+                except Exception as e:
+                    results[idx] = dict(error=e)
+                    continue
+                seconds = time.time() - start
+                results[idx] = dict(
+                    bytes=size,
+                    seconds=round(seconds, 3),
+                    bytes_per_second=int(size / seconds) if seconds > 0 else size,
+                )
+        finally:
+            sftp.close()
+
+    workers = max(1, min(max_channels, len(transfers)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i in range(workers):
+            executor.submit(worker)
+    # the files left when no channel could be opened
+    for idx, res in enumerate(results):
+        if res is None:
+            results[idx] = dict(error=channel_errors[0] if channel_errors else OSError('The file was not transferred'))
+    return results, staging
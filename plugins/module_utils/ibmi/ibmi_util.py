@@ -3,13 +3,11 @@ __metaclass__ = type
 
 
 import os
-import json
 import datetime
-import tempfile
 import logging
-import logging.config
 import zipfile
-import socket
+
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_logging
 
 # Constants
 IBMi_COMMAND_RC_SUCCESS = 0
@@ -23,6 +21,7 @@ IBMi_NO_ROW_FOUND_ERROR = 261
 IBMi_SUBSYSTEM_NOT_ACTIVE = 262
 IBMi_END_ALL_SUBSYSTEM_NOT_ALLOWED = 263
 IBMi_PTF_NOT_FOUND = 264
+IBMi_COMMAND_RC_NOT_RUN = 265
 
 IBMi_SQL_RC_ERROR = 301
 
@@ -32,12 +31,13 @@ IBMi_COMMAND_RC_UNEXPECTED = 999
 
 SYSBAS = '*SYSBAS'
 
-IBMi_DEFAULT_CONFIG_DIR = '/etc/ansible'
-IBMi_ANSIBLE_CONFIG_FILE = 'ibmi_ansible.cfg'
-IBMi_DEFAULT_LOG_DIR = '/var/log'
-IBMi_DEFAULT_LOG_FILE = 'ibmi_ansible_modules.log'
-IBMi_DEFAULT_LOG_LEVEL_STR = 'INFO'
-IBMi_DEFAULT_MAX_LOG_SIZE = 5 * 1024 * 1024
+IBMi_DEFAULT_CONFIG_DIR = ibmi_logging.IBMi_DEFAULT_CONFIG_DIR
+IBMi_ANSIBLE_CONFIG_FILE = ibmi_logging.IBMi_ANSIBLE_CONFIG_FILE
+IBMi_DEFAULT_LOG_DIR = ibmi_logging.IBMi_DEFAULT_LOG_DIR
+IBMi_DEFAULT_LOG_FILE = ibmi_logging.IBMi_DEFAULT_LOG_FILE
+IBMi_DEFAULT_LOG_LEVEL_STR = ibmi_logging.IBMi_DEFAULT_LOG_LEVEL_STR
+IBMi_DEFAULT_MAX_LOG_SIZE = ibmi_logging.IBMi_DEFAULT_MAX_LOG_SIZE
+IBMi_DEFAULT_MAX_LOG_BACKUPS = ibmi_logging.IBMi_DEFAULT_MAX_LOG_BACKUPS
 
 
 def fmtTo10(str):
@@ -60,61 +60,38 @@ def get_ssh_client_and_user_info():
 
 
 def get_host_and_ip():
-    hostname = 'UNKNOWN_HOST'
-    ip = 'UNKNOWN_IP'
-    try:
-        hostname = socket.gethostname()
-        ip = socket.gethostbyname(hostname)
-    except Exception:
-        pass
-    return hostname, ip
+    return ibmi_logging.get_host_and_ip()
+
+
+def log_enabled(level=logging.DEBUG):
+    """Return True if messages of level are written to the log, so callers can
+    skip building an expensive message."""
+    return ibmi_logging.is_enabled_for(level)
 
 
 def log_debug(s, module_name="ibmi_util"):
-    hostname, ip = get_host_and_ip()
-    try:
-        get_logger("ibmi_util").debug("%s(%s) - %s: %s", hostname, ip, module_name, s)
-    except Exception:
-        pass
+    ibmi_logging.log(logging.DEBUG, s, module_name)
 
 
 def log_info(s, module_name="ibmi_util"):
-    hostname, ip = get_host_and_ip()
-    try:
-        get_logger("ibmi_util").info("%s(%s) - %s: %s", hostname, ip, module_name, s)
-    except Exception:
-        pass
+    ibmi_logging.log(logging.INFO, s, module_name)
 
 
 def log_error(s, module_name="ibmi_util"):
-    hostname, ip = get_host_and_ip()
-    try:
-        get_logger("ibmi_util").error("%s(%s) - %s: %s", hostname, ip, module_name, s)
-    except Exception:
-        pass
+    ibmi_logging.log(logging.ERROR, s, module_name)
 
 
 def log_warning(s, module_name="ibmi_util"):
-    hostname, ip = get_host_and_ip()
-    try:
-        get_logger("ibmi_util").warning("%s(%s) - %s: %s", hostname, ip, module_name, s)
-    except Exception:
-        pass
+    ibmi_logging.log(logging.WARNING, s, module_name)
 
 
 def log_critical(s, module_name="ibmi_util"):
-    hostname, ip = get_host_and_ip()
-    try:
-        get_logger("ibmi_util").critical("%s(%s) - %s: %s", hostname, ip, module_name, s)
-    except Exception:
-        pass
+    ibmi_logging.log(logging.CRITICAL, s, module_name)
 
 
 def get_logger(module_name, log_level=logging.INFO):
-    ibmi_logging, no_log = setup_logging(log_level)
-    if no_log:
-        return
-    return ibmi_logging.getLogger(module_name)
+    ibmi_logging.configure(log_level)
+    return ibmi_logging.get_logger()
 
 
 def ensure_dir(path, mode=0o0755):
@@ -143,58 +120,7 @@ def archive_log(log_path, log_file, max_log_size):
 
 
 def setup_logging(detault_log_level=logging.INFO):
-    """Default logging configuration in /etc/ansible/ibmi_ansible.cfg"""
-    """
-    {
-        "log_config":
-        {
-            "log_level": "INFO",
-            "log_dir": "/var/log",
-            "log_file": "ibmi_ansible_modules.log",
-            "no_log": false,
-            "max_log_size_mb": 5
-        }
-    }
-    """
-    default_log_config_path = IBMi_DEFAULT_CONFIG_DIR
-    log_path = IBMi_DEFAULT_LOG_DIR
-    try:
-        ensure_dir(log_path, mode=0o0777)
-    except Exception:
-        log_path = tempfile.gettempdir()
-
-    log_file = IBMi_DEFAULT_LOG_FILE
-    log_file_path = os.path.join(log_path, log_file)
-    log_level_str = IBMi_DEFAULT_LOG_LEVEL_STR
-    no_log = False
-    max_log_size = IBMi_DEFAULT_MAX_LOG_SIZE
-    """Setup logging configuration"""
-    try:
-        log_config_path = os.getenv('HOME', default_log_config_path)
-        log_config_file_path = os.path.join(log_config_path, IBMi_ANSIBLE_CONFIG_FILE)
-        # Try again to read from default log config path
-        if not os.path.exists(log_config_file_path):
-            log_config_file_path = os.path.join(default_log_config_path, IBMi_ANSIBLE_CONFIG_FILE)
-        with open(log_config_file_path, 'r', encoding='utf-8') as load_f:
-            log_dict = json.load(load_f)
-        no_log = log_dict['log_config']['no_log']
-        log_path = log_dict['log_config']['log_dir']
-        log_file = log_dict['log_config']['log_file']
-        log_level_str = log_dict['log_config']['log_level']
-        max_log_size = log_dict['log_config']['max_log_size_mb']
-        max_log_size = max_log_size * 1024 * 1024
-        ensure_dir(log_path, mode=0o0777)
-        log_file_path = os.path.join(log_path, log_file)
-        log_level = logging.getLevelName(log_level_str)
-        archive_log(log_path, log_file, max_log_size)
-    except Exception:
-        pass
-
-    logging.basicConfig(filename=log_file_path, filemode="a", level=log_level,
-                        format='%(asctime)s - %(levelname)s - %(message)s')
-    try:
-        os.chmod(log_file_path, 0o0777)
-    except Exception:
-        pass
-
-    return logging, no_log
+    """Logging is configured once per process by ibmi_logging.configure,
+    see ibmi_logging.read_log_config for the ibmi_ansible.cfg format."""
+    ibmi_logging.configure(detault_log_level)
+    return logging, ibmi_logging.get_logger() is None
@@ -217,7 +217,7 @@ def main():
         except Exception as inst:
             message = f'Exception occurred: {inst}'
             module.fail_json(rc=999, msg=message)
-        rc, out, err, job_log = ibmi_module.itoolkit_run_command_once(command)
+        rc, out, err, job_log = ibmi_module.itoolkit_run_command_once(command, defer_job_log=True)
         job_name_info = ibmi_module.get_current_job_name()
 
     endd = datetime.datetime.now()
@@ -50,6 +50,14 @@ options:
       - Only works when force is C(True).
     type: bool
     default: False
+  compression:
+    description:
+      - Compress the save file to cut the bytes sent over the network.
+      - C(gzip) compresses the save file by gzip on local and decompresses it on the remote IBM i. gzip must be installed on
+        the IBM i, e.g. by yum.
+    type: str
+    default: 'none'
+    choices: ['none', 'gzip']
 
 notes:
     - ansible.cfg needs to specify interpreter_python=/QOpenSys/pkgs/bin/python3 under[defaults] section
@@ -66,6 +74,12 @@ EXAMPLES = r'''
     lib_name: 'testlib'
     force: True
     backup: True
+
+- name: Copy test.file on local to a remote IBM i, compressed by gzip during the transfer.
+  ibm.power_ibmi.ibmi_copy:
+    src: '/backup/test.file'
+    lib_name: 'testlib'
+    compression: 'gzip'
 '''
 
 RETURN = r'''
@@ -102,6 +116,19 @@ dest:
     returned: always
     type: str
     sample: '/QSYS.LIB/TESTLIB.LIB/TEST.FILE'
+compression_summary:
+    description:
+      - The bytes of the save file and of its gzip compressed data, their ratio, the seconds of the compression, transfer and
+        decompression, and the seconds saved compared to transferring the uncompressed save file at the same throughput.
+    returned: when compression is C(gzip)
+    type: dict
+    sample: {
+        "compressed_bytes": 301522,
+        "estimated_seconds_saved": 1.042,
+        "ratio": 5.92,
+        "seconds": 0.212,
+        "uncompressed_bytes": 1785856
+    }
 rc:
     description: The action return code. 0 means success.
     returned: always
@@ -481,7 +481,7 @@ def main():
         sql = sql + f"and PTF_PRODUCT_RELEASE_LEVEL = '{release}' "
     ibmi_util.log_debug(f"SQL to run: {sql}", module._name)
 
-    rc, out, err, job_log = ibmi_module.itoolkit_run_sql_once(sql)
+    rc, out, err, job_log = ibmi_module.itoolkit_run_sql_once(sql, defer_job_log=True)
 
     result.update({'job_log': job_log})
 
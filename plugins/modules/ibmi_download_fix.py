@@ -96,6 +96,8 @@ options:
      description:
        - The max time that the module waits for the SNDPTFORD command complete.
        - The unit can be 's', 'm', 'h', 'd' and 'w'.
+       - The status of the job is checked one second after it is submitted, the interval doubles after each check up
+         to 10 seconds.
      type: str
      default: '15m'
   wait:
@@ -155,6 +157,19 @@ delta:
     returned: always
     type: str
     sample: '0:00:00.307534'
+wait_summary:
+    description:
+      - How the module waited for the SNDPTFORD job, the number of status checks, the seconds waited, the latency, the
+        longest seconds the job could have ended before it was seen, and whether the time_out was reached.
+    returned: When the module has waited for the job
+    type: dict
+    sample: {
+        "latency": 7.912,
+        "messages": 0,
+        "polls": 9,
+        "seconds": 58.411,
+        "timed_out": false
+    }
 stdout:
     description: The command standard output.
     returned: always
@@ -275,13 +290,16 @@ job_log:
 
 import datetime
 import re
-import time
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import db2i_tools
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_module as imodule
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_job_wait
 __ibmi_module_version__ = "2.0.1"
 
+# The longest interval between two checks of the SNDPTFORD job
+IBMi_SNDPTFORD_CHECK_INTERVAL = 10
+
 HAS_ITOOLKIT = True
 
 try:
@@ -355,11 +373,6 @@ def convert_wait_time_to_seconds(input_wait_time):
     return wait_time
 
 
-def wait_for_certain_time(input_wait_time):
-    wait_time = convert_wait_time_to_seconds(input_wait_time)
-    time.sleep(wait_time)
-
-
 def main():
     module = AnsibleModule(
         argument_spec=dict(
@@ -443,41 +456,29 @@ def main():
     message_description = ''
     rc, out, error = ibmi_module.itoolkit_run_command(cl_sbmjob)
 
-    current_job_log = ibmi_module.itoolkit_get_job_log(startd)
-    for i in current_job_log:
-        if i["MESSAGE_ID"] == "CPC1221":
-            message_description = i["MESSAGE_TEXT"]
-            break
-
-    if rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS:
+    if rc == ibmi_util.IBMi_COMMAND_RC_SUCCESS:
+        job_submitted = ibmi_job_wait.submitted_job(ibmi_module, startd)
+    if rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS or not job_submitted:
+        current_job_log = ibmi_module.itoolkit_get_job_log(startd)
+        for i in current_job_log:
+            if i["MESSAGE_ID"] == "CPC1221":
+                message_description = i["MESSAGE_TEXT"]
+                break
         return_error(module, conn, message_description, out, 'Submit job failed.', current_job_log, ibmi_util.IBMi_COMMAND_RC_ERROR, job_submitted_split, wait,
                      delivery_format, result)
 
-    submitted_job = re.search(r'\d{6}/[A-Za-z0-9#_]{1,10}/[A-Za-z0-9#_]{1,10}', message_description)
-    job_submitted = submitted_job.group()
     job_submitted_split = job_submitted.split("/")
-    sql_get_job_info = "SELECT V_JOB_STATUS as \"job_status\", " \
-                       "V_ACTIVE_JOB_STATUS as \"active_job_status\"" \
-                       " FROM TABLE(QSYS2.GET_JOB_INFO('" + job_submitted + "')) A"
     try:
         time_out_in_seconds = convert_wait_time_to_seconds(time_out)
+        time_out_in_seconds = max(time_out_in_seconds - (datetime.datetime.now() - startd).total_seconds(), 0)
+        waiter = ibmi_job_wait.JobWaiter(ibmi_module, time_out_in_seconds, IBMi_SNDPTFORD_CHECK_INTERVAL)
         if wait or delivery_format == '*IMAGE':
-            rc, out, error = ibmi_module.itoolkit_run_sql(sql_get_job_info)
-            if isinstance(out, list) and len(out) == 1:
-                returned_job_status = out[0]['job_status'].strip()
-
-            while returned_job_status != '*UNKNOWN' and returned_job_status != '*OUTQ':
-                wait_for_certain_time('1s')
-                current_time = datetime.datetime.now()
-                running_time = (current_time - startd).seconds
-                if running_time > time_out_in_seconds:
-                    time_up = True
-                    break
-                rc, out, error = ibmi_module.itoolkit_run_sql(sql_get_job_info)
-                returned_job_status = ''
-                if isinstance(out, list) and len(out) == 1:
-                    returned_job_status = out[0]['job_status'].strip()
-                ibmi_util.log_debug("job_status: " + returned_job_status, module._name)
+            rc, rows, error = waiter.wait([job_submitted], ['*UNKNOWN', '*OUTQ'])
+            out = [rows[job_submitted]] if job_submitted in rows else []
+            returned_job_status = waiter.status(rows.get(job_submitted))
+            ibmi_util.log_debug("job_status: " + returned_job_status, module._name)
+            time_up = waiter.timed_out
+            result['wait_summary'] = waiter.summary()
 
         if rc == ibmi_util.IBMi_COMMAND_RC_SUCCESS:
             # system with non-English primary langage
@@ -493,6 +494,8 @@ def main():
 
         if delivery_format == '*SAVF':
             j = 0
+            # the job log is read again until the order is sent, in the time left of time_out
+            backoff = ibmi_job_wait.Backoff(time_out_in_seconds - waiter.seconds, IBMi_SNDPTFORD_CHECK_INTERVAL)
             while order_id == 0:
                 for i in range(len(job_log) - 1, -1, -1):
                     if job_log[i]['MESSAGE_ID'] == 'CPF8C07' or job_log[i]['MESSAGE_ID'] == 'CPI8C02' or job_log[i]['MESSAGE_ID'] == 'CPF8C88':
@@ -521,6 +524,9 @@ def main():
                     elif job_log[i]['MESSAGE_ID'] == 'CPF8C32':
                         return_error(module, conn, '', '', 'PTF order cannot be processed. See joblog', job_log,
                                      ibmi_util.IBMi_COMMAND_RC_ERROR, job_submitted_split, wait, delivery_format, result)
+                if order_id == 0 and not backoff.sleep():
+                    return_error(module, conn, error, '', 'Time up when waiting for SNDPTFORD complete.', job_log, ibmi_util.IBMi_COMMAND_RC_ERROR,
+                                 job_submitted_split, wait, delivery_format, result)
                 # job_log = db2i_tools.get_job_log(conn, job_submitted, startd)
                 job_log = db2i_tools.get_job_log_NLS(ibmi_module, conn, job_submitted, startd)
         elif delivery_format == '*IMAGE':
@@ -19,6 +19,7 @@ short_description: Checking whether the fix downloading complete
 version_added: '1.2.0'
 description:
      - The C(ibmi_download_fix_status) module check the downloading fix's status.
+     - The CPZ8C15 completion messages of QSYS/QSERVICE are read once for all the orders in C(order_list).
 options:
   order_list:
     description:
@@ -26,6 +27,13 @@ options:
     type: list
     elements: str
     required: yes
+  cache_file:
+    description:
+      - The file on the IBM i node which keeps the orders found in the CPZ8C15 messages of QSERVICE and the time of the
+        last message read, so that the next check only reads the newer messages.
+      - Set to an empty string to read all the messages on each check.
+    type: str
+    default: '/etc/ibmi_ansible/fix_management/download_fix_status.json'
   become_user:
     description:
       - The name of the user profile that the IBM i task will run under.
@@ -84,10 +92,18 @@ rc:
     returned: always
     type: int
     sample: 0
+messages_read:
+    description: The number of CPZ8C15 messages read from QSERVICE, only the messages after the last check if C(cache_file) is used.
+    returned: always
+    type: int
+    sample: 3
 '''
 
 
+import json
+import os
 import re
+import tempfile
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_module as imodule
@@ -95,11 +111,88 @@ __ibmi_module_version__ = "2.0.1"
 
 HAS_ITOOLKIT = True
 
+IBMi_ORDER_CACHE_FILE = '/etc/ibmi_ansible/fix_management/download_fix_status.json'
+
+
+class OrderIndex(object):
+    '''The orders found in the CPZ8C15 messages of QSERVICE, a dict of order id to its complete time
+    and file path, and the timestamp of the last message read'''
+
+    def __init__(self, cache_file=''):
+        self.cache_file = cache_file
+        self.orders = {}
+        self.last_timestamp = ''
+        self.messages = 0
+
+    def load(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if cached.get('version') == __ibmi_module_version__:
+            self.orders = dict((order_id, order) for order_id, order in cached.get('orders', {}).items()
+                               if order_id.isdigit())
+            self.last_timestamp = cached.get('last_timestamp', '')
+
+    def store(self):
+        if not self.cache_file or not self.messages:
+            return
+        cache_dir = os.path.dirname(self.cache_file)
+        if cache_dir and not os.path.isdir(cache_dir):
+            ibmi_util.ensure_dir(cache_dir)
+        data = json.dumps(dict(version=__ibmi_module_version__, last_timestamp=self.last_timestamp, orders=self.orders))
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir or None, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_file)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def add(self, message_timestamp, text):
+        '''Indexes the orders in the second level text of a CPZ8C15 message'''
+        self.messages += 1
+        self.last_timestamp = max(self.last_timestamp, message_timestamp)
+        # extract the file path. e.g. /QIBM/UserData/OS/Service/ECS/PTF/1234567890
+        re_list = re.findall(r"/[0-9a-zA-Z]+", text)
+        file_path = ''.join(re_list)
+        # only the order number is indexed, not the directories of the path
+        for id_temp in re_list:
+            if id_temp[1:].isdigit():
+                order = self.orders.setdefault(id_temp[1:], {'complete_time': message_timestamp.strip()[:-7]})
+                order['file_path'] = file_path
+
+    def read(self, ibmi_module):
+        '''Reads the CPZ8C15 messages of QSERVICE since the last message read'''
+        sql = "SELECT MESSAGE_TIMESTAMP, MESSAGE_SECOND_LEVEL_TEXT FROM QSYS2.MESSAGE_QUEUE_INFO" \
+              " WHERE MESSAGE_QUEUE_LIBRARY='QSYS' AND MESSAGE_QUEUE_NAME='QSERVICE' AND MESSAGE_ID='CPZ8C15' AND" \
+              " MESSAGE_TYPE='COMPLETION'"
+        parameters = None
+        # messages of the same timestamp as the last one may be new, adding a message twice changes nothing
+        if self.last_timestamp:
+            sql = sql + " AND MESSAGE_TIMESTAMP >= ?"
+            parameters = [self.last_timestamp]
+        sql = sql + " ORDER BY MESSAGE_TIMESTAMP"
+        for row in ibmi_module.db_iter_result_list(sql, parameters=parameters):
+            self.add(row['MESSAGE_TIMESTAMP'], row['MESSAGE_SECOND_LEVEL_TEXT'])
+
+    def status(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None:
+            return {'order_id': order_id, 'download_status': 'UNKNOWN', 'complete_time': 'UNKNOWN', 'file_path': 'UNKNOWN'}
+        return {'order_id': order_id, 'download_status': 'DOWNLOADED', 'complete_time': order['complete_time'],
+                'file_path': order['file_path']}
+
 
 def main():
     module = AnsibleModule(
         argument_spec=dict(
             order_list=dict(type='list', elements='str', required=True),
+            cache_file=dict(type='str', default=IBMi_ORDER_CACHE_FILE),
             become_user=dict(type='str'),
             become_user_password=dict(type='str', no_log=True),
         ),
@@ -109,6 +202,7 @@ def main():
     ibmi_util.log_info("version: " + __ibmi_module_version__, module._name)
 
     order_list = module.params['order_list']
+    cache_file = module.params['cache_file'].strip()
     become_user = module.params['become_user']
     become_user_password = module.params['become_user_password']
 
@@ -119,13 +213,7 @@ def main():
         stderr=''
     )
     error = ''
-    status = []
-    complete_time = ''
-    file_path = ''
-    download_status = ''
-    sql_query_message_info = "SELECT MESSAGE_TIMESTAMP, MESSAGE_SECOND_LEVEL_TEXT FROM QSYS2.MESSAGE_QUEUE_INFO" \
-        " WHERE MESSAGE_QUEUE_LIBRARY='QSYS' AND MESSAGE_QUEUE_NAME='QSERVICE' AND MESSAGE_ID='CPZ8C15' AND" \
-        " MESSAGE_TYPE='COMPLETION' AND MESSAGE_SECOND_LEVEL_TEXT LIKE '%{order_id}%'"
+    rc = ibmi_util.IBMi_COMMAND_RC_SUCCESS
 
     try:
         ibmi_module = imodule.IBMiModule(become_user_name=become_user, become_user_password=become_user_password)
@@ -134,30 +222,22 @@ def main():
         module.fail_json(rc=999, msg=message)
 
     try:
-        for order_id in order_list:
-            download_status = 'UNKNOWN'
-            complete_time = 'UNKNOWN'
-            file_path = 'UNKNOWN'
-            # query the messages of this order in QSERVICE
-            rc, out, error = ibmi_module.itoolkit_run_sql(sql_query_message_info.format(order_id=order_id))
-            if rc != 0:
-                result.update({'status': status, 'rc': rc, 'stdout': '', 'stderr': error})
-                module.exit_json(**result)
-
-            if isinstance(out, list) and len(out) > 0:
-                for item in out:
-                    # extract the file path. e.g. /QIBM/UserData/OS/Service/ECS/PTF/1234567890
-                    re_list = re.findall(r"/[0-9a-zA-Z]+", item['MESSAGE_SECOND_LEVEL_TEXT'])
-                    for id_temp in re_list:
-                        if id_temp[1:] == order_id:
-                            # message exists. set the download_status to 'DOWNLOADED'
-                            download_status = 'DOWNLOADED'
-                            complete_time = out[0]['MESSAGE_TIMESTAMP'].strip()[:-7]
-                            file_path = ''.join(re_list)
-
-            status.append({'order_id': order_id, 'download_status': download_status, 'complete_time': complete_time, 'file_path': file_path})
-
-        result.update({'status': status, 'rc': rc, 'stdout': '', 'stderr': error})
+        index = OrderIndex(cache_file)
+        index.load()
+        # the messages of all the orders in QSERVICE are read once
+        try:
+            index.read(ibmi_module)
+        except Exception as inst:
+            result.update({'rc': ibmi_util.IBMi_SQL_RC_ERROR, 'stderr': str(inst), 'messages_read': index.messages})
+            module.exit_json(**result)
+        try:
+            index.store()
+        except (IOError, OSError) as inst:
+            # the statuses are returned though the index is not cached
+            ibmi_util.log_info(f"Failed to cache the orders in {cache_file}: {inst}", module._name)
+
+        status = [index.status(order_id) for order_id in order_list]
+        result.update({'status': status, 'rc': rc, 'stdout': '', 'stderr': error, 'messages_read': index.messages})
         module.exit_json(**result)
 
     except Exception as e_db_connect:
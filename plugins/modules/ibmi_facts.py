@@ -15,12 +15,30 @@ short_description: Gathering ibmi facts
 version_added: '1.3.0'
 description:
   - Gathering the target ibmi system facts.
+  - The facts are queried at the same time over several database connections, the job log is not read.
 options:
   filter:
     description:
       - If supplied, only return facts that match this shell-style (fnmatch) wildcard.
     type: str
     default: '*'
+  max_connections:
+    description:
+      - The maximum number of database connections the facts are queried over at the same time.
+    type: int
+    default: 4
+  cache_ttl:
+    description:
+      - Seconds a fact is cached on the IBM i node, by the name of the fact, e.g. C({"group_ptf_info": 86400}).
+      - A cached fact younger than its seconds is returned without a query. The facts not listed are not cached.
+      - C(version_release) is cached with C(system_info).
+    type: dict
+    default: {}
+  cache_dir:
+    description:
+      - The directory of the cached facts.
+    type: str
+    default: '/etc/ibmi_ansible/facts_cache'
 
 author:
 - Chang Le(@changlexc)
@@ -34,9 +52,36 @@ EXAMPLES = r'''
   assert:
     that:
       - system_name == 'DB2MB1PA'
+
+- name: Return ibmi_facts, the slow-changing facts are cached for a day
+  ibm.power_ibmi.ibmi_facts:
+    cache_ttl:
+      group_ptf_info: 86400
+      system_catalogs: 86400
 '''
 
 RETURN = r'''
+facts_timing:
+  description:
+    - The seconds of each fact and whether it was queried or returned from the cache, with the age of the cached fact and the
+      error of a failed query, the seconds of all the facts and the number of connections opened.
+  returned: when not in check mode
+  type: dict
+  sample: {
+        "connections": 4,
+        "seconds": 1.204,
+        "sections": {
+            "group_ptf_info": {
+                "age": 1342,
+                "seconds": 0.001,
+                "source": "cache"
+            },
+            "system_status": {
+                "seconds": 1.106,
+                "source": "query"
+            }
+        }
+    }
 ansible_facts:
   description: ibmi specific facts to add to ansible_facts.
   returned: always
@@ -312,14 +357,207 @@ ansible_facts:
 '''
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_module as imodule
+from concurrent.futures import ThreadPoolExecutor
 import fnmatch
+import tempfile
+import threading
+import queue
+import json
+import time
+import os
 
 __ibmi_module_version__ = "2.0.1"
 
+IBMi_FACTS_MAX_CONNECTIONS = 4
+IBMi_FACTS_CACHE_DIR = '/etc/ibmi_ansible/facts_cache'
+
+ENV_SYS_INFO_SQL = "SELECT * FROM SYSIBMADM.ENV_SYS_INFO;"
+
+
+class ConnectionPool(object):
+    '''IBMiModule objects, each with its own connection, opened when a collector needs one and no
+    other is free, up to size'''
+
+    def __init__(self, size):
+        self.size = size
+        self.opened = []
+        self.free = queue.Queue()
+        self.lock = threading.Lock()
+
+    def get(self):
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.opened) < self.size:
+                ibmi_module = imodule.IBMiModule()
+                self.opened.append(ibmi_module)
+                return ibmi_module
+        return self.free.get()
+
+    def put(self, ibmi_module):
+        self.free.put(ibmi_module)
+
+    def close(self):
+        for ibmi_module in self.opened:
+            try:
+                ibmi_module.itoolkit_close_connection()
+            except Exception as inst:
+                ibmi_util.log_info(f"Failed to close the connection: {inst}", 'ibmi_facts')
+
+
+class FactCache(object):
+    '''A JSON file per fact, used for the ttl seconds of the fact. The files are replaced
+    atomically, so tasks can share the directory'''
+
+    def __init__(self, cache_dir, ttl):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name + '.json')
+
+    def load(self, name):
+        '''Returns the value of the fact and its age in seconds, or (None, None) if the fact is not
+        cached or older than its ttl'''
+        if not self.ttl.get(name):
+            return None, None
+        try:
+            with open(self._path(name), 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None, None
+        age = time.time() - cached.get('collected_at', 0)
+        if cached.get('version') != __ibmi_module_version__ or not 0 <= age < self.ttl[name]:
+            return None, None
+        return cached['value'], age
+
+    def store(self, name, value):
+        if not self.ttl.get(name):
+            return
+        if not os.path.isdir(self.cache_dir):
+            ibmi_util.ensure_dir(self.cache_dir)
+        data = json.dumps(dict(version=__ibmi_module_version__, collected_at=time.time(), value=value))
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(name))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+class FactQueryError(Exception):
+    '''The query of a fact failed'''
+
+
+def run_sql(ibmi_module, sql):
+    rc, out, error = ibmi_module.itoolkit_run_sql(sql)
+    if rc:
+        raise FactQueryError(f"{sql} failed: {error}")
+    return out
+
+
+def get_env_sys_info(ibmi_module):
+    return run_sql(ibmi_module, ENV_SYS_INFO_SQL)[0]
+
+
+def get_version_release(env_sys_info):
+    return float(env_sys_info['OS_VERSION']) + float(env_sys_info['OS_RELEASE']) / 10.0
+
+
+def get_system_values(ibmi_module):
+    sql = "SELECT SYSTEM_VALUE_NAME,CURRENT_NUMERIC_VALUE,CURRENT_CHARACTER_VALUE FROM QSYS2.SYSTEM_VALUE_INFO;"
+    system_values = {}
+    for item in run_sql(ibmi_module, sql):
+        system_values[item["SYSTEM_VALUE_NAME"]] = item["CURRENT_CHARACTER_VALUE"] if item["CURRENT_CHARACTER_VALUE"] else item["CURRENT_NUMERIC_VALUE"]
+    return system_values
+
+
+def get_dns_info(ibmi_module):
+    sql = "SELECT CAST(data as VARCHAR(100)) FROM QUSRSYS.QATOCTCPIP WHERE KEYWORD='RMTNAMESV'"
+    return run_sql(ibmi_module, sql)[0]['00001'].split()
+
+
+def get_system_name(ibmi_module):
+    rc, out, error = ibmi_module.itoolkit_run_rtv_command('RTVNETA', {'SYSNAME': 'char'})
+    return out['SYSNAME']
+
+
+# The collector of each fact and the value of the fact if its query fails, None to fail the
+# task. The collectors are independent of each other and run at the same time
+FACT_COLLECTORS = [
+    ('system_info', get_env_sys_info, None),
+    ('system_values', get_system_values, {}),
+    ('system_catalogs', lambda ibmi_module: run_sql(ibmi_module, "SELECT * FROM QSYS2.SYSCATALOGS;"), []),
+    ('system_status', lambda ibmi_module: run_sql(ibmi_module, "SELECT * FROM QSYS2.SYSTEM_STATUS_INFO;")[0], None),
+    ('tcpip_info', lambda ibmi_module: run_sql(ibmi_module, "SELECT * FROM QSYS2.NETSTAT_INTERFACE_INFO;"), []),
+    ('group_ptf_info', lambda ibmi_module: run_sql(ibmi_module, "SELECT * FROM QSYS2.GROUP_PTF_INFO;"), []),
+    ('dns_info', get_dns_info, None),
+    ('route_info', lambda ibmi_module: run_sql(ibmi_module, "SELECT * FROM QSYS2.NETSTAT_ROUTE_INFO;"), []),
+    ('system_name', get_system_name, None),
+]
+
+
+def collect_facts(names, pool, cache):
+    '''Collects the facts of names on the connections of pool, a fact found in cache is not
+    queried. Returns the facts and a dict of the seconds and source of each fact'''
+    facts = {}
+    timing = {}
+    to_query = []
+    for name, collector, default in FACT_COLLECTORS:
+        if name not in names:
+            continue
+        start = time.time()
+        value, age = cache.load(name)
+        if age is None:
+            to_query.append((name, collector, default))
+        else:
+            facts[name] = value
+            timing[name] = dict(seconds=round(time.time() - start, 3), source='cache', age=int(age))
+
+    def run(collector, default):
+        ibmi_module = pool.get()
+        try:
+            start = time.time()
+            try:
+                value, error = collector(ibmi_module), None
+            except FactQueryError as inst:
+                if default is None:
+                    raise
+                value, error = default, str(inst)
+            return value, error, round(time.time() - start, 3)
+        finally:
+            pool.put(ibmi_module)
+
+    if to_query:
+        with ThreadPoolExecutor(max_workers=min(pool.size, len(to_query))) as executor:
+            futures = [(name, executor.submit(run, collector, default)) for name, collector, default in to_query]
+            for name, future in futures:
+                facts[name], error, seconds = future.result()
+                timing[name] = dict(seconds=seconds, source='query')
+                if error:
+                    timing[name]['error'] = error
+                else:
+                    try:
+                        cache.store(name, facts[name])
+                    except (IOError, OSError) as e:
+                        # the fact is returned though it is not cached
+                        ibmi_util.log_info(f"Failed to cache {name}: {e}", 'ibmi_facts')
+    return facts, timing
+
 
 def run_module():
-    module_args = dict(filter=dict(type='str', default='*'))
+    module_args = dict(
+        filter=dict(type='str', default='*'),
+        max_connections=dict(type='int', default=IBMi_FACTS_MAX_CONNECTIONS),
+        cache_dir=dict(type='str', default=IBMi_FACTS_CACHE_DIR),
+        cache_ttl=dict(type='dict', default={}),
+    )
     # Fact *_facts modules MUST return in the ansible_facts field of the result dictionary so other modules can access them.
     # MUST support check_mode.
     # MUST NOT make any changes to the system.
@@ -336,6 +574,15 @@ def run_module():
     )
 
     filter = module.params['filter']
+    max_connections = module.params['max_connections']
+    if max_connections < 1:
+        module.fail_json(rc=ibmi_util.IBMi_PARAM_NOT_VALID, msg="Value of max_connections must be greater than 0.")
+    cache_ttl = {}
+    for (name, ttl) in module.params['cache_ttl'].items():
+        try:
+            cache_ttl[name] = int(ttl)
+        except (TypeError, ValueError):
+            module.fail_json(rc=ibmi_util.IBMi_PARAM_NOT_VALID, msg=f"Value of cache_ttl {name} must be a number of seconds.")
 
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
@@ -344,58 +591,33 @@ def run_module():
         module.exit_json(**result)
 
     virtual_facts = {}
+    pool = ConnectionPool(max_connections)
     try:
-        ibmi_module = imodule.IBMiModule()
+        startd = time.time()
+        names = set(name for name, collector, default in FACT_COLLECTORS if fnmatch.fnmatch(name, filter))
+        # version_release comes from the same ENV_SYS_INFO row as system_info
+        release_only = fnmatch.fnmatch('version_release', filter) and 'system_info' not in names
         if fnmatch.fnmatch('version_release', filter):
-            system_release_info, err = ibmi_module.get_ibmi_release()
-            virtual_facts['version_release'] = system_release_info['version_release']
-
-        if fnmatch.fnmatch('system_info', filter):
-            rc, out, error, job_log = ibmi_module.itoolkit_run_sql_once("SELECT * FROM SYSIBMADM.ENV_SYS_INFO;")
-            virtual_facts['system_info'] = out[0]
-
-        if fnmatch.fnmatch('system_values', filter):
-            sql = "SELECT SYSTEM_VALUE_NAME,CURRENT_NUMERIC_VALUE,CURRENT_CHARACTER_VALUE FROM QSYS2.SYSTEM_VALUE_INFO;"
-            rc, out, error, job_log = ibmi_module.itoolkit_run_sql_once(sql)
-            system_values = {}
-            for item in out:
-                system_values[item["SYSTEM_VALUE_NAME"]] = item["CURRENT_CHARACTER_VALUE"] if item["CURRENT_CHARACTER_VALUE"] else item["CURRENT_NUMERIC_VALUE"]
-            virtual_facts["system_values"] = system_values
-
-        if fnmatch.fnmatch('system_catalogs', filter):
-            rc, out, error, job_log = ibmi_module.itoolkit_run_sql_once("SELECT * FROM QSYS2.SYSCATALOGS;")
-            virtual_facts['system_catalogs'] = out
-
-        if fnmatch.fnmatch('system_status', filter):
-            rc, out, error, job_log = ibmi_module.itoolkit_run_sql_once("SELECT * FROM QSYS2.SYSTEM_STATUS_INFO;")
-            virtual_facts['system_status'] = out[0]
-
-        if fnmatch.fnmatch('tcpip_info', filter):
-            rc, out, error, job_log = ibmi_module.itoolkit_run_sql_once("SELECT * FROM QSYS2.NETSTAT_INTERFACE_INFO;")
-            virtual_facts['tcpip_info'] = out
-
-        if fnmatch.fnmatch('group_ptf_info', filter):
-            rc, out, error, job_log = ibmi_module.itoolkit_run_sql_once("SELECT * FROM QSYS2.GROUP_PTF_INFO;")
-            virtual_facts['group_ptf_info'] = out
-
-        if fnmatch.fnmatch('dns_info', filter):
-            rc, out, error, job_log = ibmi_module.itoolkit_run_sql_once("SELECT CAST(data as VARCHAR(100)) FROM QUSRSYS.QATOCTCPIP WHERE KEYWORD='RMTNAMESV'")
-            virtual_facts['dns_info'] = out[0]['00001'].split()
-
-        if fnmatch.fnmatch('route_info', filter):
-            rc, out, error, job_log = ibmi_module.itoolkit_run_sql_once("SELECT * FROM QSYS2.NETSTAT_ROUTE_INFO;")
-            virtual_facts['route_info'] = out
-
-        if fnmatch.fnmatch('system_name', filter):
-            rc, out, error, job_log = ibmi_module.itoolkit_run_rtv_command_once('RTVNETA', {'SYSNAME': 'char'})
-            virtual_facts['system_name'] = out['SYSNAME']
+            names.add('system_info')
+        facts, timing = collect_facts(names, pool, FactCache(module.params['cache_dir'], cache_ttl))
+        if fnmatch.fnmatch('version_release', filter):
+            virtual_facts['version_release'] = get_version_release(facts['system_info'])
+            if release_only:
+                del facts['system_info']
+        for name, collector, default in FACT_COLLECTORS:
+            if name in facts:
+                virtual_facts[name] = facts[name]
 
         virtual_facts['facts_module_version'] = __ibmi_module_version__
 
         result['ansible_facts'] = virtual_facts
+        result['facts_timing'] = dict(sections=timing, seconds=round(time.time() - startd, 3),
+                                      connections=len(pool.opened))
 
+        pool.close()
         module.exit_json(**result)
     except Exception as inst:
+        pool.close()
         virtual_facts = {}
         result['ansible_facts'] = virtual_facts
         message = f'Exception occurred: {inst}'
@@ -53,6 +53,53 @@ options:
     type: int
     default: 10
     required: false
+  max_workers:
+    description:
+      - The number of pages fetched at the same time.
+    type: int
+    default: 4
+    required: false
+  requests_per_second:
+    description:
+      - The maximum number of requests per second to a web server, 0 means no limit.
+    type: float
+    default: 4.0
+    required: false
+  cache_dir:
+    description:
+      - The directory of the on-disk cache of the PSP pages, shared by the tasks running on the same node.
+      - Set to an empty string to disable the cache.
+    type: str
+    default: '/etc/ibmi_ansible/fix_management/psp_cache'
+    required: false
+  cache_ttl:
+    description:
+      - Seconds a cached page is used without asking the web server. An older page is revalidated with its ETag and
+        Last-Modified headers and only downloaded again if it changed.
+    type: int
+    default: 3600
+    required: false
+  psp_base_url:
+    description:
+      - The base URL of the PSP pages, e.g. of a mirror of the pages.
+    type: str
+    default: 'https://www.ibm.com/support/pages'
+    required: false
+  database:
+    description:
+      - The fix repo database file, e.g. '/etc/ibmi_ansible/fix_management/repo.sqlite3'.
+      - The requisites of each PTF are kept in the database, the PTFs found in it are not fetched again.
+      - The requisites are only fetched from the PSP pages if not specified.
+    type: str
+    required: false
+  requisite_ttl:
+    description:
+      - Seconds the requisites of a PTF kept in C(database) are used, older requisites are fetched again from the
+        PSP pages and replaced.
+      - Set to 0 to fetch the requisites of all the PTFs again.
+    type: int
+    default: 604800
+    required: false
 
 notes:
    - Ansible hosts file need to specify ansible_python_interpreter=/QOpenSys/pkgs/bin/python3.
@@ -74,6 +121,14 @@ EXAMPLES = r'''
     groups:
       - "SF12345"
     validate_certs: False
+
+- name: Get the apply order of PTFs and all their requisites, the requisites are kept in the fix repo database
+  ibm.power_ibmi.ibmi_fix_check:
+    ptfs:
+      - "SI71691"
+      - "SI72000"
+    expanded_requisites: true
+    database: "/etc/ibmi_ansible/fix_management/repo.sqlite3"
 '''
 
 RETURN = r'''
@@ -120,179 +175,54 @@ ptf_info:
             ]
         }
     ]
+fetch_summary:
+    description:
+      - The number of pages downloaded, served from the cache, revalidated unchanged with the web server and failed.
+    type: dict
+    returned: always
+    sample: {
+        "cached": 12,
+        "errors": 0,
+        "fetched": 3,
+        "revalidated": 1
+    }
+requisite_graph:
+    description:
+      - The requisite graph of the PTFs, the requisites of each PTF, the order to apply the PTFs, the requisites of a PTF
+        before the PTF, and the cycles of PTFs which require each other, the PTFs of a cycle are next to each other in
+        the order.
+      - The PTFs whose page failed, the number of pages fetched, served from the cache and of the PTFs found in the database.
+    type: dict
+    returned: When ptfs and expanded_requisites are specified.
+    sample: {
+        "apply_order": ["SI70101", "SI70555", "SI70931", "SI71691", "SI72000"],
+        "cycles": [["SI70555", "SI70931", "SI71691"]],
+        "errors": [],
+        "graph": {
+            "SI70101": [],
+            "SI72000": [
+                {
+                    "ptf_id": "SI70101",
+                    "req_type": "PRE"
+                }
+            ]
+        },
+        "pages_fetched": 3,
+        "pages_from_cache": 0,
+        "ptfs_from_database": 2
+    }
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
-from ansible.module_utils import urls
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_psp
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_ptf_graph
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_fix_repo_db
 import datetime
-import time
-import re
 
 
 __ibmi_module_version__ = "2.0.1"
 
-PSP_URL = "https://www.ibm.com/support/pages/sites/default/files/inline-files/xmldoc.xml"
-ALL_GROUP_PAGE = "https://www.ibm.com/support/pages/ibm-i-group-ptfs-level"
-HTTP_AGENT = "ansible/ibm.power_ibmi"
-
-
-# url: https://www.ibm.com/support/pages/ibm-i-group-ptfs-level
-# group: 'SF99738'
-def get_group_info_from_web(groups, certs, timeout):
-    pattern_link = re.compile(
-        r'>(?P<rel>R\d{3})<.+?'
-        r'(?P<url>https:\/\/\S+?)\".+?>'
-        r'(?P<grp>[A-Z]{2}\d{5}):.+?'
-        r'(?P<dsc>\w.+?)<.+?'
-        r'(?P<lvl>\d{1,5})<.+?>'
-        r'(?P<d>\d{2}\/\d{2}\/\d{4})<'
-    )
-    response = ''
-    try:
-        response = urls.open_url(ALL_GROUP_PAGE, validate_certs=certs, timeout=timeout, http_agent=HTTP_AGENT)
-    except Exception as e:
-        return [dict(
-                url=ALL_GROUP_PAGE,
-                error=str(e),
-                )]
-    r = response.read().decode("utf-8")
-    lines = r.splitlines()
-    group_list = []
-    groups = list(set([x.upper() for x in groups]))
-    list_all = False
-    if '*ALL' in groups:
-        list_all = True
-    for line in lines:
-        for ptf_line in re.finditer(pattern_link, line):
-            if list_all or ptf_line.group('grp') in groups:
-                group_list.append(dict(
-                    ptf_group_number=ptf_line.group('grp'),
-                    ptf_group_level=int(ptf_line.group('lvl')),
-                    release=ptf_line.group('rel'),
-                    release_date=ptf_line.group('d'),
-                    url=ptf_line.group('url'),
-                    description=ptf_line.group('dsc'),
-                    ptf_list=get_ptf_list_from_web(
-                        ptf_line.group('url'), certs, timeout),
-                ))
-    return group_list
-
-
-# url: https://www.ibm.com/support/pages/uid/nas4SF99738
-def get_ptf_list_from_web(url, certs, timeout):
-    pattern_link = re.compile(
-        r'(?P<url>https://www.ibm.com/support/pages/ptf/\S+?)\".+?'
-        r'(?P<ptf>[A-Z]{2}\d{5})<.+?'
-        r'(?P<date>\d{2}\/\d{2}\/\d{2}).+?'
-        r'(?P<apar>[A-Z]{2}\d{5}).+?'
-        r'(?P<product>\d{4}\w{3})'
-    )
-    pattern_packid = r'PACKAGE ID:.+?(?P<packid>[A-Z]\d{7})'
-    response = ''
-    try:
-        response = urls.open_url(url, validate_certs=certs, timeout=timeout, http_agent=HTTP_AGENT)
-    except Exception as e:
-        return [dict(
-                url=url,
-                error=str(e),
-                )]
-    r = response.read().decode("utf-8")
-    lines = r.splitlines()
-    ptf_list = []
-    for line in lines:
-        # if it is a cum package
-        cum_pack_id = re.search(pattern_packid, line)
-        if cum_pack_id:
-            return get_cum_ptf_list_from_web(cum_pack_id.group('packid'), certs, timeout)
-        # common ptf groups
-        for ptf_line in re.finditer(pattern_link, line):
-            ptf_list.append(dict(
-                ptf_id=ptf_line.group('ptf'),
-                product=ptf_line.group('product'),
-                apar=ptf_line.group('apar'),
-                date=ptf_line.group('date'),
-            ))
-    return ptf_list
-
-
-# url: https://www.ibm.com/support/pages/uid/nas4C0128730
-def get_cum_ptf_list_from_web(pack_id, certs, timeout):
-    pattern_link = re.compile(
-        r'(?P<url>https?:\/\/\S+)>'
-        r'(?P<ptf>[A-Z]{2}\d{5})<.+'
-        r'(?P<lvl>\d{5}).+'
-        r'(?P<product>\d{4}\w{3}).+'
-        r'(?P<rel>V\dR\dM\d)'
-    )
-    response = ''
-    url = 'https://www.ibm.com/support/pages/uid/nas4' + pack_id
-    try:
-        response = urls.open_url(url, validate_certs=certs, timeout=timeout, http_agent=HTTP_AGENT)
-    except Exception as e:
-        return [dict(
-                url=url,
-                error=str(e),
-                )]
-    r = response.read().decode("utf-8")
-    lines = r.splitlines()
-    ptf_list = []
-    for line in lines:
-        for ptf_line in re.finditer(pattern_link, line):
-            ptf_list.append(dict(
-                ptf_id=ptf_line.group('ptf'),
-                product=ptf_line.group('product'),
-                level_added=ptf_line.group('lvl'),
-                release=ptf_line.group('rel'),
-            ))
-    return ptf_list
-
-
-def get_ptf_info_from_web(ptfs, expanded_requisites, certs, timeout):
-    # rel_pattern = r'<td>Release\.+.+>(?P<rel>V\dR\dM\d)<\/td>'
-    # product_pattern = r'<td>Licensed Program\.+.+>(?P<rel>\d{4}\w{3})<\/td>'
-    ptf_list = []
-    ptfs = list(set([x.upper() for x in ptfs]))
-    for ptf in ptfs:
-        if re.match(r'(SI|MF)\d{5}', ptf):
-            req_list = get_ptf_req_from_web(ptf, [], expanded_requisites, certs, timeout)
-            ptf_list.append(dict(
-                ptf_id=ptf,
-                req_list=req_list
-            ))
-    return ptf_list
-
-
-# url: https://www.ibm.com/support/pages/ptf/SI71691
-# ptfs: 'SI71691'
-def get_ptf_req_from_web(ptf, reqs, expanded_requisites, certs, timeout):
-    pattern_link = re.compile(r'<tt>(?P<req>(CO|PRE|DIST)).+?(?P<prod>\d{4}\w{3}).+?(?P<ptf>(SI|MF)\d{5}).+?</tt><br>')
-    response = ''
-    url = 'https://www.ibm.com/support/pages/ptf/' + ptf
-    time.sleep(1)
-    try:
-        response = urls.open_url(url, validate_certs=certs, timeout=timeout, http_agent=HTTP_AGENT)
-    except Exception as e:
-        return [dict(url=url, error=str(e))]
-    r = response.read().decode("utf-8")
-    lines = r.splitlines()
-    for line in lines:
-        for ptf_line in re.finditer(pattern_link, line):
-            duplicated = False
-            ptf_id = ptf_line.group('ptf')
-            for req in reqs:
-                if req.get('ptf_id') == ptf_id:
-                    duplicated = True
-                    break
-            if not duplicated:
-                reqs.append(dict(
-                    ptf_id=ptf_id,
-                    req_type=ptf_line.group('req')
-                ))
-                if expanded_requisites is True:
-                    reqs = get_ptf_req_from_web(ptf_id, reqs, expanded_requisites, certs, timeout)
-    return reqs
-
 
 def main():
     module = AnsibleModule(
@@ -301,7 +231,14 @@ def main():
             ptfs=dict(type='list', elements='str'),
             expanded_requisites=dict(type='bool', default=False),
             validate_certs=dict(type='bool', default=True),
-            timeout=dict(type='int', default=10)
+            timeout=dict(type='int', default=10),
+            max_workers=dict(type='int', default=ibmi_psp.IBMi_PSP_MAX_WORKERS),
+            requests_per_second=dict(type='float', default=ibmi_psp.IBMi_PSP_REQUESTS_PER_SECOND),
+            cache_dir=dict(type='str', default=ibmi_psp.IBMi_PSP_CACHE_DIR),
+            cache_ttl=dict(type='int', default=ibmi_psp.IBMi_PSP_CACHE_TTL),
+            psp_base_url=dict(type='str', default=ibmi_psp.PSP_BASE_URL),
+            database=dict(type='str'),
+            requisite_ttl=dict(type='int', default=ibmi_ptf_graph.IBMi_REQUISITE_TTL),
         ),
         supports_check_mode=True,
     )
@@ -320,14 +257,42 @@ def main():
     certs = module.params['validate_certs']
     timeout = module.params['timeout']
 
+    fetcher = ibmi_psp.PSPFetcher(
+        validate_certs=certs,
+        timeout=timeout,
+        max_workers=module.params['max_workers'],
+        requests_per_second=module.params['requests_per_second'],
+        cache_dir=module.params['cache_dir'],
+        cache_ttl=module.params['cache_ttl'],
+        base_url=module.params['psp_base_url'],
+    )
+
+    conn = None
+    store = None
+    database = module.params['database']
+    if database and ptf_list:
+        try:
+            conn = ibmi_fix_repo_db.connect(database.strip())
+            store = ibmi_ptf_graph.RequisiteStore(conn, module.params['requisite_ttl'])
+        except Exception as e:
+            if conn:
+                conn.close()
+            module.fail_json(rc=ibmi_util.IBMi_COMMAND_RC_ERROR, msg=f"Failed to open the database {database}: {e}")
+
     startd = datetime.datetime.now()
-    if group_list and len(group_list) > 0:
-        psp_groups = get_group_info_from_web(group_list, certs, timeout)
-        result.update({'group_info': psp_groups})
-        result.update({'count': len(psp_groups)})
-    if ptf_list and len(ptf_list) > 0:
-        psp_ptfs = get_ptf_info_from_web(ptf_list, expanded_requisites, certs, timeout)
-        result.update({'ptf_info': psp_ptfs})
+    try:
+        if group_list and len(group_list) > 0:
+            psp_groups = ibmi_psp.get_group_info(fetcher, group_list)
+            result.update({'group_info': psp_groups})
+            result.update({'count': len(psp_groups)})
+        if ptf_list and len(ptf_list) > 0:
+            psp_ptfs, pages = ibmi_psp.get_ptf_info(fetcher, ptf_list, expanded_requisites, store)
+            result.update({'ptf_info': psp_ptfs})
+            if expanded_requisites:
+                result.update({'requisite_graph': ibmi_ptf_graph.graph_info(pages, fetcher, store)})
+    finally:
+        if conn:
+            conn.close()
 
     endd = datetime.datetime.now()
     delta = endd - startd
@@ -337,7 +302,8 @@ def main():
     result.update({'expanded_requisites': expanded_requisites})
     result.update({'certs': certs})
     result.update({'timeout': timeout})
-    result.update({'http_agent': HTTP_AGENT})
+    result.update({'http_agent': ibmi_psp.HTTP_AGENT})
+    result.update({'fetch_summary': fetcher.stats})
 
     module.exit_json(**result)
 
@@ -42,6 +42,38 @@ options:
     type: int
     default: 10
     required: false
+  max_workers:
+    description:
+      - The number of pages fetched at the same time.
+    type: int
+    default: 4
+    required: false
+  requests_per_second:
+    description:
+      - The maximum number of requests per second to a web server, 0 means no limit.
+    type: float
+    default: 4.0
+    required: false
+  cache_dir:
+    description:
+      - The directory of the on-disk cache of the PSP pages, shared by the tasks running on the same node.
+      - Set to an empty string to disable the cache.
+    type: str
+    default: '/etc/ibmi_ansible/fix_management/psp_cache'
+    required: false
+  cache_ttl:
+    description:
+      - Seconds a cached page is used without asking the web server. An older page is revalidated with its ETag and
+        Last-Modified headers and only downloaded again if it changed.
+    type: int
+    default: 3600
+    required: false
+  psp_base_url:
+    description:
+      - The base URL of the PSP pages, e.g. of a mirror of the pages.
+    type: str
+    default: 'https://www.ibm.com/support/pages'
+    required: false
 
 notes:
    - Ansible hosts file need to specify ansible_python_interpreter=/QOpenSys/pkgs/bin/python3.
@@ -94,139 +126,39 @@ group_info:
             "RELEASE_DATE": "09/28/2015"
         }
     ]
+fetch_summary:
+    description:
+      - The number of pages downloaded, served from the cache, revalidated unchanged with the web server and failed.
+    type: dict
+    returned: always
+    sample: {
+        "cached": 12,
+        "errors": 0,
+        "fetched": 3,
+        "revalidated": 1
+    }
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
-from ansible.module_utils import urls
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_psp
 import datetime
-import re
 
 
 __ibmi_module_version__ = "2.0.1"
 
-PSP_URL = "https://www.ibm.com/support/pages/sites/default/files/inline-files/xmldoc.xml"
-ALL_GROUP_PAGE = "https://www.ibm.com/support/pages/ibm-i-group-ptfs-level"
-HTTP_AGENT = "ansible/ibm.power_ibmi"
-
-
-# url: https://www.ibm.com/support/pages/ibm-i-group-ptfs-level
-# group: 'SF99738'
-def get_group_info_from_web(groups, validate_certs, timeout):
-    pattern_link = re.compile(
-        r'>(?P<rel>R\d{3})<.+?'
-        r'(?P<url>https:\/\/\S+?)\".+?>'
-        r'(?P<grp>[A-Z]{2}\d{5}):.+?'
-        r'(?P<dsc>\w.+?)<.+?'
-        r'(?P<lvl>\d{1,5})<.+?>'
-        r'(?P<d>\d{2}\/\d{2}\/\d{4})<'
-    )
-    response = ''
-    try:
-        response = urls.open_url(ALL_GROUP_PAGE, validate_certs=validate_certs, timeout=timeout, http_agent=HTTP_AGENT)
-    except Exception as e:
-        return [dict(
-                url=ALL_GROUP_PAGE,
-                error=str(e),
-                )]
-    r = response.read().decode("utf-8")
-    lines = r.splitlines()
-    group_list = []
-    groups = list(set([x.upper() for x in groups]))
-    list_all = False
-    if '*ALL' in groups:
-        list_all = True
-    for line in lines:
-        for ptf_line in re.finditer(pattern_link, line):
-            if list_all or ptf_line.group('grp') in groups:
-                group_list.append(dict(
-                    ptf_group_number=ptf_line.group('grp'),
-                    ptf_group_level=int(ptf_line.group('lvl')),
-                    release=ptf_line.group('rel'),
-                    release_date=ptf_line.group('d'),
-                    url=ptf_line.group('url'),
-                    description=ptf_line.group('dsc'),
-                    ptf_list=get_ptf_list_from_web(
-                        ptf_line.group('url'), validate_certs, timeout),
-                ))
-    return group_list
-
-
-# url: https://www.ibm.com/support/pages/uid/nas4SF99738
-def get_ptf_list_from_web(url, validate_certs, timeout):
-    pattern_link = re.compile(
-        r'(?P<url>https://www.ibm.com/support/pages/ptf/\S+?)\".+?'
-        r'(?P<ptf>[A-Z]{2}\d{5})<.+?'
-        r'(?P<date>\d{2}\/\d{2}\/\d{2}).+?'
-        r'(?P<apar>[A-Z]{2}\d{5}).+?'
-        r'(?P<product>\d{4}\w{3})'
-    )
-    pattern_packid = r'PACKAGE ID:.+?(?P<packid>[A-Z]\d{7})'
-    response = ''
-    try:
-        response = urls.open_url(url, validate_certs=validate_certs, timeout=timeout, http_agent=HTTP_AGENT)
-    except Exception as e:
-        return [dict(
-                url=url,
-                error=str(e),
-                )]
-    r = response.read().decode("utf-8")
-    lines = r.splitlines()
-    ptf_list = []
-    for line in lines:
-        # if it is a cum package
-        cum_pack_id = re.search(pattern_packid, line)
-        if cum_pack_id:
-            return get_cum_ptf_list_from_web(cum_pack_id.group('packid'), validate_certs, timeout)
-        # common ptf groups
-        for ptf_line in re.finditer(pattern_link, line):
-            ptf_list.append(dict(
-                ptf_id=ptf_line.group('ptf'),
-                product=ptf_line.group('product'),
-                apar=ptf_line.group('apar'),
-                date=ptf_line.group('date'),
-            ))
-    return ptf_list
-
-
-# url: https://www.ibm.com/support/pages/uid/nas4C0128730
-def get_cum_ptf_list_from_web(pack_id, validate_certs, timeout):
-    pattern_link = re.compile(
-        r'(?P<url>https?:\/\/\S+)>'
-        r'(?P<ptf>[A-Z]{2}\d{5})<.+'
-        r'(?P<lvl>\d{5}).+'
-        r'(?P<product>\d{4}\w{3}).+'
-        r'(?P<rel>V\dR\dM\d)'
-    )
-    response = ''
-    url = 'https://www.ibm.com/support/pages/uid/nas4' + pack_id
-    try:
-        response = urls.open_url(url, validate_certs=validate_certs, timeout=timeout, http_agent=HTTP_AGENT)
-    except Exception as e:
-        return [dict(
-                url=url,
-                error=str(e),
-                )]
-    r = response.read().decode("utf-8")
-    lines = r.splitlines()
-    ptf_list = []
-    for line in lines:
-        for ptf_line in re.finditer(pattern_link, line):
-            ptf_list.append(dict(
-                ptf_id=ptf_line.group('ptf'),
-                product=ptf_line.group('product'),
-                level_added=ptf_line.group('lvl'),
-                release=ptf_line.group('rel'),
-            ))
-    return ptf_list
-
 
 def main():
     module = AnsibleModule(
         argument_spec=dict(
             groups=dict(type='list', elements='str', default=['*ALL']),
             validate_certs=dict(type='bool', default=True),
-            timeout=dict(type='int', default=10)
+            timeout=dict(type='int', default=10),
+            max_workers=dict(type='int', default=ibmi_psp.IBMi_PSP_MAX_WORKERS),
+            requests_per_second=dict(type='float', default=ibmi_psp.IBMi_PSP_REQUESTS_PER_SECOND),
+            cache_dir=dict(type='str', default=ibmi_psp.IBMi_PSP_CACHE_DIR),
+            cache_ttl=dict(type='int', default=ibmi_psp.IBMi_PSP_CACHE_TTL),
+            psp_base_url=dict(type='str', default=ibmi_psp.PSP_BASE_URL),
         ),
         supports_check_mode=True,
     )
@@ -242,8 +174,18 @@ def main():
     validate_certs = module.params['validate_certs']
     timeout = module.params['timeout']
 
+    fetcher = ibmi_psp.PSPFetcher(
+        validate_certs=validate_certs,
+        timeout=timeout,
+        max_workers=module.params['max_workers'],
+        requests_per_second=module.params['requests_per_second'],
+        cache_dir=module.params['cache_dir'],
+        cache_ttl=module.params['cache_ttl'],
+        base_url=module.params['psp_base_url'],
+    )
+
     startd = datetime.datetime.now()
-    psp_groups = get_group_info_from_web(groups_num, validate_certs, timeout)
+    psp_groups = ibmi_psp.get_group_info(fetcher, groups_num)
     result.update({'group_info': psp_groups})
     result.update({'count': len(psp_groups)})
 
@@ -254,7 +196,8 @@ def main():
     result.update({'elapsed_time': str(delta)})
     result.update({'validate_certs': validate_certs})
     result.update({'timeout': timeout})
-    result.update({'http_agent': HTTP_AGENT})
+    result.update({'http_agent': ibmi_psp.HTTP_AGENT})
+    result.update({'fetch_summary': fetcher.stats})
 
     module.exit_json(**result)
 
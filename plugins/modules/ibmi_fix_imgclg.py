@@ -256,10 +256,8 @@ def wait_for_certain_time(input_wait_time):
 
 
 def run_a_list_of_commands(ibmi_module, cmd_key_list, cmd_map):
-
-    for item in cmd_key_list:
-        cur_cmd = cmd_map[item]
-        itoolkit_run_command(ibmi_module, cur_cmd)
+    # One XMLSERVICE call for the whole list, a failed command does not stop the others
+    return ibmi_module.itoolkit_run_command_batch([cmd_map[item] for item in cmd_key_list])
 
 
 def install_by_image_catalog(ibmi_module, module, product_id_list, virtual_image_list, dir_target,
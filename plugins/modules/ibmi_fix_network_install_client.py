@@ -282,9 +282,8 @@ def itoolkit_run_command(ibmi_module, command):
 
 
 def run_a_list_of_commands(ibmi_module, cmd_key_list, cmd_map):
-    for item in cmd_key_list:
-        cur_cmd = cmd_map[item]
-        itoolkit_run_command(ibmi_module, cur_cmd)
+    # One XMLSERVICE call for the whole list, a failed command does not stop the others
+    return ibmi_module.itoolkit_run_command_batch([cmd_map[item] for item in cmd_key_list])
 
 
 def _is_ipv4_addr(ip):
@@ -35,6 +35,14 @@ options:
   checksum:
     description:
       - Specified if check the ptf/group image files as well when checking database
+      - The checksums are cached in the database, the cached checksum of a file is used
+        while the size, modification time and inode of the file are unchanged.
+    type: bool
+    default: False
+  force_rehash:
+    description:
+      - Specified if compute the checksums of all the image files again instead of using the cached checksums.
+      - Only applies when C(checksum) is C(true).
     type: bool
     default: False
   database:
@@ -76,6 +84,14 @@ EXAMPLES = r'''
   ibm.power_ibmi.ibmi_fix_repo:
     action: "clear"
     type: 'ptf_group'
+- name: verify the image files of a group, reading every image file again
+  ibm.power_ibmi.ibmi_fix_repo:
+    action: "find"
+    type: 'ptf_group'
+    checksum: true
+    force_rehash: true
+    parameters:
+      - {'ptf_group_number':'SF99738', 'ptf_group_level':'10'}
 '''
 
 RETURN = r'''
@@ -142,8 +158,18 @@ rows:
             "source": "fix_management"
         }
     ]
+checksum_cache:
+    description: The number of image files whose checksum was taken from the cache and the number of image files read to compute it.
+    returned: when checksum is true
+    type: dict
+    sample: {
+        "cached": 12,
+        "rehashed": 1
+    }
 sql:
-    description: The formatted sql statement executed by the task.
+    description:
+      - The formatted sql statement executed by the task.
+      - For action C(find), the distinct statements run for the parameters, separated by semicolons.
     returned: always
     type: str
     sample: "SELECT * FROM ptf_group_image_info WHERE ptf_group_number=:ptf_group_number AND ptf_group_level=:ptf_group_level"
@@ -161,6 +187,8 @@ parameters:
 '''
 
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_fix_repo_db
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_ptf_listing
 from ansible.module_utils.basic import AnsibleModule
 import os
 import sqlite3
@@ -229,6 +257,23 @@ download_status_dict = {
 }
 
 
+# The unique constraint of each table already indexes its leading columns:
+# ptf_id of single_ptf_info, ptf_group_number/ptf_group_level of ptf_group_image_info
+# and order_id of download_status.
+table_indexes = {
+    'single_ptf': [
+        'CREATE INDEX IF NOT EXISTS single_ptf_product_idx ON single_ptf_info (product)',
+        'CREATE INDEX IF NOT EXISTS single_ptf_order_idx ON single_ptf_info (order_id)',
+    ],
+    'ptf_group': [
+        'CREATE INDEX IF NOT EXISTS group_order_idx ON ptf_group_image_info (order_id)',
+    ],
+    'download_status': [
+        'CREATE INDEX IF NOT EXISTS download_status_group_idx ON download_status (ptf_group_number, ptf_group_level)',
+    ],
+}
+
+
 required_params_enable_checksum = {
     'single_ptf': ['file_path', 'ptf_id', 'product'],
     'ptf_group': ['file_path', 'ptf_group_number', 'ptf_group_level', 'release_date'],
@@ -284,45 +329,8 @@ def getpath(dir_path):
 
 # file_path: /QIBM/UserData/OS/Service/ECS/PTF/2021109109/S6582.TXT
 def get_group_name_from_txt(file_path):
-    pattern_ptf = r'[A-Z]{2}\d{5}'
-    pattern_group = r'(?P<group>[A-Z]{2}\d{5})\s+Level\s+(?P<level>\d+)'
-    pattern_vrm = r'VERSION\s+(?P<v>\d+)\s+RELEASE\s+(?P<r>\d+)\.(?P<m>\d+)'
-
-    group_name = None
-    group_level = -1
-    vrm = None
-    idx_in_group = -100
-    ptf_list = []
-    lines = []
-
-    with open(file_path, 'r', encoding="utf-8") as f:
-        lines += filter(None, (line.strip() for line in f))
-
-    for idx, val in enumerate(lines):
-        if vrm is None:
-            vrm_line = re.search(pattern_vrm, val)
-            if vrm_line:
-                vrm = 'V' + vrm_line.group('v') + 'R' + vrm_line.group('r') + 'M' + vrm_line.group('m')
-        if group_name is None:
-            ptf_line = re.search(pattern_group, val)
-            if ptf_line:
-                idx_in_group = idx
-                group_name = ptf_line.group('group')
-                group_level = ptf_line.group('level')
-        if idx == idx_in_group + 1:
-            idx_in_group += 1
-            ptf_line = re.search(pattern_ptf, val)
-            if ptf_line:
-                ptf_list.append(ptf_line.group())
-            else:
-                break
-
-    group_item = dict(
-        group=group_name,
-        level=group_level,
-        vrm=vrm,
-        ptf_list=obj2json(ptf_list)
-    )
+    group_item = ibmi_ptf_listing.read_group_cover_letter(file_path)
+    group_item['ptf_list'] = obj2json(group_item['ptf_list'])
     return group_item
 
 
@@ -370,8 +378,30 @@ def check_param(module, parameters, _type, checksum):
     return success_list, fail_list
 
 
+def get_image_paths(_type, parameters):
+    image_paths = []
+    for parameter in parameters:
+        path = parameter.get('file_path')
+        if not path:
+            continue
+        if _type == 'ptf_group':
+            path_object = getpath(path)
+            if isinstance(path_object, dict):
+                image_paths.extend(path_object.get('images'))
+        elif _type == 'single_ptf':
+            image_paths.append(path)
+    return image_paths
+
+
+def get_checksums(conn, parameters, _type, force_rehash, checksum_stats):
+    checksums, stats = ibmi_fix_repo_db.get_checksums(conn, get_image_paths(_type, parameters), 'sha1', force_rehash)
+    for key, val in stats.items():
+        checksum_stats[key] = checksum_stats.get(key, 0) + val
+    return checksums
+
+
 # append checksum data from files to the parameter list
-def check_sum(module, parameters, _type):
+def check_sum(module, parameters, _type, checksums):
     success_list = []
     fail_list = []
     if _type == 'ptf_group':
@@ -418,7 +448,7 @@ def check_sum(module, parameters, _type):
                     group_item['rc'] = rc
                     fail_list.append(group_item)
                     break
-                checksum = module.sha1(image_path)
+                checksum = checksums.get(image_path)
                 file_name = os.path.basename(image_path)
                 if not checksum:
                     group_item['msg'] = 'Target image file [' + image_path + '] is not readable'
@@ -476,7 +506,7 @@ def check_sum(module, parameters, _type):
                 fail_list.append(ptf_item)
                 continue
             ptf_item['file_name'] = os.path.basename(path)
-            ptf_item['checksum'] = module.sha1(path)
+            ptf_item['checksum'] = checksums.get(path)
             if not ptf_item.get('checksum'):
                 ptf_item['msg'] = 'Target image file [' + path + '] is not readable'
                 if ptf_item.get('db_record'):
@@ -509,6 +539,19 @@ def build_sql_init(_type):
     return sql
 
 
+def build_sql_schema(_type):
+    return [build_sql_init(_type)] + table_indexes.get(_type)
+
+
+# Schema migrations of the repo database, see ibmi_fix_repo_db.migrate.
+# Append new migrations, never change the ones released.
+def build_migrations():
+    return [
+        build_sql_schema('single_ptf') + build_sql_schema('ptf_group') + build_sql_schema('download_status'),
+        ibmi_fix_repo_db.CHECKSUM_CACHE_SCHEMA,
+    ]
+
+
 def build_sql_update(_type, parameters):
     table, table_dict, constraints = select_table_dict(_type)
     names = ''
@@ -545,16 +588,16 @@ def build_sql_delete(_type, parameters):
     return f'DELETE FROM {table} WHERE {where}'
 
 
+def get_find_keys(_type, parameter):
+    table, table_dict, constraints = select_table_dict(_type)
+    return dict((k, v) for k, v in parameter.items() if k in table_dict.keys() and v is not None)
+
+
 def build_sql_find(_type, parameter):
     table, table_dict, constraints = select_table_dict(_type)
-    unique_keys = []
+    unique_keys = list(get_find_keys(_type, parameter).keys())
     where = ''
-    additional_param = ''
-    for param_key, param_val in parameter.items():
-        if param_key in table_dict.keys() and param_val is not None:
-            unique_keys.append(param_key)
-        if param_key == 'additional_param':
-            additional_param = parameter.get(param_key)
+    additional_param = parameter.get('additional_param') or ''
     for unique_key in unique_keys:
         where += unique_key + '=:' + unique_key + ' AND '
     if where.endswith(' AND '):
@@ -564,85 +607,112 @@ def build_sql_find(_type, parameter):
         return f'SELECT * FROM {table} {additional_param}'
 
 
-def dict_factory(cursor, row):
-    d = {}
-    for idx, col in enumerate(cursor.description):
-        d[col[0]] = row[idx]
-    return d
+def build_sql_find_batch(_type, find_keys):
+    table, table_dict, constraints = select_table_dict(_type)
+    on = ' AND '.join(f't.{k} = k.{k}' for k in sorted(find_keys))
+    return f'SELECT t.* FROM temp.{ibmi_fix_repo_db.FIND_KEYS_TABLE} k JOIN {table} t ON {on}'
 
 
-def run_sql(module, database, parameters, action, _type):
-    sql = ''
+def format_found_row(_type, row):
+    row['db_record'] = 'MATCH'
+    if row.get('ptf_list'):
+        row['ptf_list'] = json2obj(row.get('ptf_list'))
+    elif row.get('ptf_group_level'):
+        row['ptf_group_level'] = int(row.get('ptf_group_level'))
+    if _type == 'ptf_group':
+        if row.get('checksum'):
+            row['checksum'] = json2obj(row.get('checksum'))
+        if row.get('file_name'):
+            row['file_name'] = json2obj(row.get('file_name'))
+    return row
+
+
+def find_records(conn, _type, parameters):
+    '''Parameters with only column values are looked up together by ibmi_fix_repo_db.find_rows,
+    the ones with additional_param or without any column value run their own SELECT'''
+    table, table_dict, constraints = select_table_dict(_type)
+    found = [None] * len(parameters)
+    batch_indexes = []
+    batch_keys = []
+    # the distinct statements run, in the order they first ran
+    statements = []
+    for idx, param in enumerate(parameters):
+        find_keys = get_find_keys(_type, param)
+        if find_keys and not param.get('additional_param'):
+            batch_indexes.append(idx)
+            batch_keys.append(find_keys)
+        else:
+            sql = build_sql_find(_type, param)
+            if sql not in statements:
+                statements.append(sql)
+            cursor = conn.execute(sql, param)
+            found[idx] = ibmi_fix_repo_db.rows_to_dicts(cursor, cursor.fetchall())
+    if batch_keys:
+        # find_rows runs one join per set of key columns
+        for find_keys in batch_keys:
+            sql = build_sql_find_batch(_type, find_keys)
+            if sql not in statements:
+                statements.append(sql)
+        for idx, rows in zip(batch_indexes, ibmi_fix_repo_db.find_rows(conn, table, table_dict, batch_keys)):
+            found[idx] = rows
+
     success_list = []
     fail_list = []
-    table, table_dict, constraints = select_table_dict(_type)
+    for param, rows in zip(parameters, found):
+        if len(rows) > 0:
+            for row in rows:
+                success_list.append(format_found_row(_type, row))
+        else:
+            fail_item = param.copy()
+            fail_item['db_record'] = 'RECORD_NOT_FOUND'
+            fail_list.append(fail_item)
+    return success_list, fail_list, '; '.join(statements)
 
-    try:
-        ibmi_util.ensure_dir(os.path.dirname(database))
-    except Exception:
-        module.fail_json(msg='Failed to create path ' + database)
 
+def open_database(module, database):
     try:
-        conn = sqlite3.connect(database)
         # if the database file not exist, it will be created automatically.
+        return ibmi_fix_repo_db.connect(database, build_migrations(), 'ibmi_fix_repo')
+    except OSError:
+        module.fail_json(msg='Failed to create path ' + database)
     except sqlite3.Error as e:
         module.fail_json(msg=e.args[0])
 
-    if (conn is not None):
-        c = conn.cursor()
-        # create the table first if needed.
-        sql = build_sql_init(_type)
-        c.execute(sql)
-
-        if action == 'add' or action == 'update':
-            sql = build_sql_update(_type, parameters)
-        elif action == 'delete':
-            sql = build_sql_delete(_type, parameters)
-        elif action == 'clear':
-            sql = 'DROP TABLE IF EXISTS ' + table
-        elif action != 'find':
-            return -2, 'Unsupported action: ' + action, -1, success_list, fail_list, sql
-        try:
+
+def run_sql(module, conn, parameters, action, _type):
+    sql = ''
+    success_list = []
+    fail_list = []
+    table, table_dict, constraints = select_table_dict(_type)
+
+    if action == 'add' or action == 'update':
+        sql = build_sql_update(_type, parameters)
+    elif action == 'delete':
+        sql = build_sql_delete(_type, parameters)
+    elif action == 'clear':
+        sql = 'DROP TABLE IF EXISTS ' + table
+    elif action != 'find':
+        return -2, 'Unsupported action: ' + action, -1, success_list, fail_list, sql
+    row_changed = -1
+    try:
+        if action == 'find':
+            # reads do not commit
             if isinstance(parameters, list):
-                if action == 'find':  # cannot execute SELECT statements in executemany()
-                    c.row_factory = dict_factory
-                    for param in parameters:
-                        sql = build_sql_find(_type, param)
-                        c.execute(sql, param)
-                        rs = c.fetchall()
-                        if isinstance(rs, list):
-                            if len(rs) > 0:
-                                for row in rs:
-                                    row['db_record'] = 'MATCH'
-                                    if row.get('ptf_list'):
-                                        row['ptf_list'] = json2obj(row.get('ptf_list'))
-                                    elif row.get('ptf_group_level'):
-                                        row['ptf_group_level'] = int(row.get('ptf_group_level'))
-                                    if _type == 'ptf_group':
-                                        if row.get('checksum'):
-                                            row['checksum'] = json2obj(row.get('checksum'))
-                                        if row.get('file_name'):
-                                            row['file_name'] = json2obj(row.get('file_name'))
-                                    success_list.append(row)
-                            else:
-                                fail_item = param.copy()
-                                fail_item['db_record'] = 'RECORD_NOT_FOUND'
-                                fail_list.append(fail_item)
-                        else:
-                            fail_item = param.copy()
-                            fail_item['db_record'] = 'UNKNOWN'
-                            fail_list.append(fail_item)
+                success_list, fail_list, sql = find_records(conn, _type, parameters)
+        else:
+            with conn:
+                if action == 'clear':
+                    # drop the records, the table and its indexes are created again right away
+                    cursor = conn.execute(sql)
+                    for statement in build_sql_schema(_type):
+                        conn.execute(statement)
                 else:
-                    c.executemany(sql, parameters)
-            else:  # clear/init tables (no param)
-                c.execute(sql)
-        except sqlite3.Error as e:
-            module.fail_json(msg=e.args[0] + ' ***SQL:' + sql + ' ***Param:' + str(parameters))
-        finally:
-            conn.commit()
-            conn.close()
+                    cursor = conn.executemany(sql, parameters)
+                row_changed = cursor.rowcount
+    except sqlite3.Error as e:
+        module.fail_json(msg=e.args[0] + ' ***SQL:' + sql + ' ***Param:' + str(parameters))
 
-        return 0, '', c.rowcount, success_list, fail_list, sql
+    return 0, '', row_changed, success_list, fail_list, sql
 
 
 # This is only called on action insert or update and checksum is enabled
@@ -724,6 +794,7 @@ def main():
             database=dict(type='str', default='/etc/ibmi_ansible/fix_management/repo.sqlite3'),
             parameters=dict(type='list', elements='dict'),
             checksum=dict(type='bool', default=False),
+            force_rehash=dict(type='bool', default=False),
         ),
         supports_check_mode=True,
     )
@@ -735,6 +806,7 @@ def main():
     database = module.params['database'].strip()
     parameters = module.params['parameters']
     checksum = module.params['checksum']
+    force_rehash = module.params['force_rehash']
 
     if action == 'delete' or _type == 'download_status':
         checksum = False
@@ -759,25 +831,32 @@ def main():
     list_to_sqlite = []
     sql = ''
 
+    checksum_stats = dict(cached=0, rehashed=0)
+    if checksum is True:
+        result['checksum_cache'] = checksum_stats
+
     startd = datetime.datetime.now()
+    conn = open_database(module, database)
     # for adding/updating records, retrieve file's checksum first when checksum == True.
     if action == 'add' or action == 'update':
         # filter out the invalid parameters without required input parameters
         valid_parameters, invalid_params = check_param(module, parameters, _type, checksum)
         if checksum is True:  # filter out the not existing files
-            valid_parameters, checksum_failed_params = check_sum(module, valid_parameters, _type)
+            checksums = get_checksums(conn, valid_parameters, _type, force_rehash, checksum_stats)
+            valid_parameters, checksum_failed_params = check_sum(module, valid_parameters, _type, checksums)
         if len(valid_parameters) > 0:
             if action == 'add' or _type == 'download_status':  # all the parameter data come from the physical files.
                 list_to_sqlite = valid_parameters
             elif action == 'update' and checksum is True:  # merge physical files data into input parameters.
                 list_to_sqlite, mismatched_params = merge_param_before_upsert(_type, parameters, valid_parameters)
         else:
+            conn.close()
             result['fail_list'] = invalid_params + checksum_failed_params
             module.exit_json(**result)
     else:
         list_to_sqlite = parameters
     if action == 'clear' or len(list_to_sqlite) > 0:
-        rc, msg, row_changed, success_list, fail_list, sql = run_sql(module, database, list_to_sqlite, action, _type)
+        rc, msg, row_changed, success_list, fail_list, sql = run_sql(module, conn, list_to_sqlite, action, _type)
         if rc != 0:
             module.fail_json(msg=msg, **result)
 
@@ -789,7 +868,8 @@ def main():
             if checksum is True:
                 # check_sum returns the checksums of the input list. But it does not compare it.
                 # if all the image files exist, fail_list_not_existing_files is empty.
-                success_list_existing_files, fail_list_not_existing_files = check_sum(module, success_list, _type)
+                checksums = get_checksums(conn, success_list, _type, force_rehash, checksum_stats)
+                success_list_existing_files, fail_list_not_existing_files = check_sum(module, success_list, _type, checksums)
                 # checksum_after_find compares the checksums with the database records.
                 # if all parameters' checksums are matched, fail_list_checksum_mismatched is empty
                 # it also adds the PTF lists of groups to the result.
@@ -808,6 +888,7 @@ def main():
     result['end'] = str(endd)
     result['delta'] = str(delta)
 
+    conn.close()
     module.exit_json(**result)
 
 
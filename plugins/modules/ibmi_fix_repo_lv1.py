@@ -31,6 +31,8 @@ options:
   image_root:
     description:
       - The image_root of the image files.
+      - With action 'refresh', only the image directories added or changed since the last refresh are parsed again,
+        the images no longer found under image_root are removed from the database.
     type: str
   additional_sql:
     description:
@@ -39,6 +41,14 @@ options:
   checksum:
     description:
       - Specified if check the image file's integrity when action is 'find' or 'list'
+      - The checksums are cached in the database, the cached checksum of a file is used
+        while the size, modification time and inode of the file are unchanged.
+    type: bool
+    default: False
+  force_rehash:
+    description:
+      - Specified if compute the checksums of all the image files again instead of using the cached checksums.
+      - Only applies when C(checksum) is C(true).
     type: bool
     default: False
   database:
@@ -87,6 +97,11 @@ EXAMPLES = r'''
 - name: clear the PTF database
   ibm.power_ibmi.ibmi_fix_repo_lv1:
     action: "clear"
+- name: check the integrity of all the image files, reading every image file again
+  ibm.power_ibmi.ibmi_fix_repo_lv1:
+    action: 'list'
+    checksum: true
+    force_rehash: true
 '''
 
 RETURN = r'''
@@ -106,7 +121,7 @@ delta:
     type: str
     sample: '0:00:00.307534'
 row_changed:
-    description: The updated row number after refresh operations.
+    description: The number of images added, changed or removed by the refresh.
     returned: when action is 'refresh'
     type: str
     sample: 1
@@ -137,6 +152,24 @@ success_list:
             ]
         }
     ]
+checksum_cache:
+    description: The number of image files whose checksum was taken from the cache and the number of image files read to compute it.
+    returned: when checksum is true and records are found
+    type: dict
+    sample: {
+        "cached": 12,
+        "rehashed": 1
+    }
+refresh_summary:
+    description: The number of images added, changed, removed and unchanged by the refresh.
+    returned: when action is 'refresh'
+    type: dict
+    sample: {
+        "added": 2,
+        "changed": 1,
+        "removed": 0,
+        "unchanged": 25
+    }
 sql:
     description: The formatted sql statement executed by the task.
     returned: always
@@ -155,17 +188,20 @@ parameters:
 '''
 
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_fix_repo_db
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_ptf_listing
 from ansible.module_utils.basic import AnsibleModule
 import os
 import sqlite3
 import datetime
 import re
 import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 
 __ibmi_module_version__ = "2.0.1"
 
-images = []
 ptf_repo_lv1_table = 'ptf_repo_lv1_info'
 ptf_repo_lv1_dict = {
     'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
@@ -181,7 +217,29 @@ ptf_repo_lv1_dict = {
     'shipped_ptf': 'JSON',
     'shipped_ptf_count': 'INTEGER',
     'add_time': 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP',
+    'fingerprint': 'TEXT',
+}
+# Image directories parsed at the same time on refresh
+IMAGE_PARSE_MAX_WORKERS = 4
+IMAGE_LST_PATTERN = re.compile(r"^ilst\S+.txt$", re.IGNORECASE)
+IMAGE_FILE_PATTERN = re.compile(r"^\S+_\d.bin$", re.IGNORECASE)
+# One row per ordered PTF ('ordered'), ordered group ('group') and shipped PTF ('shipped')
+# of each image, filled on refresh so that find is an indexed lookup.
+ptf_repo_lv1_ptf_table = 'ptf_repo_lv1_ptf'
+ptf_repo_lv1_ptf_dict = {
+    'image_id': 'INTEGER NOT NULL',
+    'kind': 'CHAR(10) NOT NULL',
+    'ptf_id': 'CHAR(10)',
+    'ptf_group': 'CHAR(10)',
+    'ptf_group_level': 'INTEGER',
 }
+ptf_repo_lv1_ptf_indexes = [
+    f'CREATE INDEX IF NOT EXISTS ptf_repo_lv1_ptf_idx ON {ptf_repo_lv1_ptf_table} (ptf_id, kind)',
+    f'CREATE INDEX IF NOT EXISTS ptf_repo_lv1_group_idx ON {ptf_repo_lv1_ptf_table} (ptf_group, ptf_group_level)',
+    f'CREATE INDEX IF NOT EXISTS ptf_repo_lv1_image_idx ON {ptf_repo_lv1_ptf_table} (image_id)',
+]
+# Rows are fetched by id in chunks, below the SQLite limit of host parameters
+SQL_IN_CHUNK_SIZE = 500
 list_image_dict = [
     'order_id',
     'download_date',
@@ -220,166 +278,29 @@ def get_checksum_in_txt(sha256_file):
         return None
 
 
-def get_common_info_from_txt(lines):
-    pattern_order = r'Order#:\s+(?P<order>\w{6,10})'
-    pattern_date = r'Date:\s+(?P<date>\d{4}/\d{1,2}/\d{1,2})'
-
-    pattern_ordered_ptf = r'(?P<ptf>[A-Z]{2}\d{5})\s+ORDERED\s+<<< Shipped >>>\s+(?P<product>\S{7})\s+(?P<vrm>V\d+R\d+M\d+)'
-    pattern_group = r'(?P<group>[A-Z]{2}\d{5})\s+Level\s+(?P<level>\d+)'
-    pattern_vrm = r'(?P<group>[A-Z]{2}\d{5}).+<<< Shipped >>>\s+SEL Lst\s+(?P<vrm>V\d+R\d+M\d+)'
-    pattern_cum_vrm = r'VERSION\s+(?P<v>\d+)\s+RELEASE\s+(?P<r>\d+)\.(?P<m>\d+)'
-    pattern_cumid = r'PACKAGE ID:\s+(?P<cum_id>\w+)'
-    pattern_shipped_ptf = r'(?P<ptf>[A-Z]{2}\d{5}).+<<< Shipped >>>\s+(?P<product>\S{7})\s+(?P<vrm>V\d+R\d+M\d+)'
-    pattern_ptf = r'[A-Z]{2}\d{5}'
-
-    order_str = None
-    date_str = None
-    idx_in_group = -100
-    cum_id = None
-    cum_vrm = None
-    ordered_group = []
-    group_set = set(ordered_group)
-    group_vrm = []
-    ordered_ptf = []
-    shipped_ptf = []
-
-    for idx, val in enumerate(lines):
-        if date_str is None:
-            date_line = re.search(pattern_date, val)
-            if date_line:
-                date_str = date_line.group('date')
-        if order_str is None:
-            order_line = re.search(pattern_order, val)
-            if order_line:
-                order_str = order_line.group('order')
-        # search group_name:
-        ptf_line = re.search(pattern_group, val)
-        if ptf_line:
-            idx_in_group = idx
-            group_level_info = dict(
-                group=ptf_line.group('group'),
-                level=int(ptf_line.group('level')),
-                release=None,
-            )
-            # avoid adding duplicated group item
-            if ptf_line.group('group') not in group_set:
-                group_set.add(ptf_line.group('group'))
-                ordered_group.append(group_level_info)
-        # add children PTFs of current group
-        if idx == idx_in_group + 1:
-            idx_in_group += 1
-            ptf_line = re.search(pattern_ptf, val)
-            if ptf_line and len(ordered_group) > 0:
-                # ordered_group[len(ordered_group) - 1]['shipped_ptf'].append(ptf_line.group())
-                shipped_ptf.append(ptf_line.group())
-        # search vrm:
-        vrm_line = re.search(pattern_vrm, val)
-        if vrm_line:
-            group_vrm_info = dict(
-                group=vrm_line.group('group'),
-                vrm=vrm_line.group('vrm')
-            )
-            group_vrm.append(group_vrm_info)
-        if cum_id is None:
-            cumid_line = re.search(pattern_cumid, val)
-            if cumid_line:
-                cum_id = cumid_line.group('cum_id')
-        if cum_vrm is None:
-            cum_vrm_line = re.search(pattern_cum_vrm, val)
-            if cum_vrm_line:
-                cum_vrm = 'V' + cum_vrm_line.group('v') + 'R' + cum_vrm_line.group('r') + 'M' + cum_vrm_line.group('m')
-        ordered_ptf_line = re.search(pattern_ordered_ptf, val)
-        if ordered_ptf_line:
-            ptf_info = dict(
-                ptf=ordered_ptf_line.group('ptf'),
-                product=ordered_ptf_line.group('product'),
-                vrm=ordered_ptf_line.group('vrm'),
-            )
-            ordered_ptf.append(ptf_info)
-        ptf_line = re.search(pattern_shipped_ptf, val)
-        if ptf_line:
-            shipped_ptf.append(ptf_line.group('ptf'))
-    # Add VRM info to single ptf and group ptf
-    for ordered_group_info in ordered_group:
-        for group_vrm_info in group_vrm:
-            if ordered_group_info['group'] == group_vrm_info['group']:
-                ordered_group_info['release'] = group_vrm_info['vrm']
-    # Add VRM info to cum package based on its group name (e.g. SF99730 for V7R3M0)
-    for ordered_group_info in ordered_group:
-        if ordered_group_info['release'] is None and len(ordered_group_info['group']) == 7:
-            gn = ordered_group_info['group']
-            ordered_group_info['release'] = 'V' + gn[4] + 'R' + gn[5] + 'M' + gn[6]
-    if len(ordered_group) > 0:
-        ordered_ptf = ordered_group
-    return order_str, date_str, cum_id, cum_vrm, ordered_ptf, shipped_ptf
-
-
-def get_group_info_from_txt(lines):
-    order_str, date_str, cum_id, cum_vrm, ordered_ptf, shipped_ptf = get_common_info_from_txt(lines)
-    return order_str, date_str, ordered_ptf, len(ordered_ptf), shipped_ptf, len(shipped_ptf)
-
-
-def get_cum_info_from_txt(lines):
-    order_str, date_str, cum_id, cum_vrm, ordered_ptf, shipped_ptf = get_common_info_from_txt(lines)
-    return order_str, date_str, cum_id, cum_vrm, ordered_ptf, len(ordered_ptf), shipped_ptf, len(shipped_ptf)
-
-
-def get_ptf_info_from_txt(lines):
-    order_str, date_str, cum_id, cum_vrm, ordered_ptf, shipped_ptf = get_common_info_from_txt(lines)
-    return order_str, date_str, ordered_ptf, len(ordered_ptf), shipped_ptf, len(shipped_ptf)
-
-
 def get_info_in_lst(lst_file):
     if not os.path.isfile(lst_file):
         return None
 
-    pattern_group = r'(?P<group>[A-Z]{2}\d{5})\s+Level\s+(?P<level>\d+)'
-    image_type = 'single_ptf'
-    lines = []
-    order_id = ''
-    download_date = ''
-    cum_id = ''
-    cum_vrm = ''
-    ordered_ptf = []
-    ordered_ptf_count = -1
-    shipped_ptf = []
-    shipped_ptf_count = -1
-
-    with open(lst_file, 'r', encoding="utf-8") as f:
-        lines += filter(None, (line.strip() for line in f))
-
-    for idx, val in enumerate(lines):
-        if re.match(pattern_group, val, re.IGNORECASE):
-            image_type = 'group'
-        elif val == 'IBM i CUMULATIVE PTF PACKAGE':
-            image_type = 'cum'
-            break
-    if image_type == 'group':
-        order_id, download_date, ordered_ptf, ordered_ptf_count, shipped_ptf, shipped_ptf_count = get_group_info_from_txt(lines)
-    elif image_type == 'cum':
-        order_id, download_date, cum_id, cum_vrm, ordered_ptf, ordered_ptf_count, shipped_ptf, shipped_ptf_count = get_cum_info_from_txt(lines)
-    else:
-        order_id, download_date, ordered_ptf, ordered_ptf_count, shipped_ptf, shipped_ptf_count = get_ptf_info_from_txt(lines)
-
+    listing = ibmi_ptf_listing.read_order_listing(lst_file)
     image_info = dict(
-        order_id=order_id,
-        image_type=image_type,
-        download_date=download_date,
-        cum_id=cum_id,
-        cum_vrm=cum_vrm,
-        ordered_ptf=ordered_ptf,
-        ordered_ptf_count=ordered_ptf_count,
-        shipped_ptf=shipped_ptf,
-        shipped_ptf_count=shipped_ptf_count,
+        order_id=listing['order_id'],
+        image_type=listing['image_type'],
+        download_date=listing['download_date'],
+        cum_id='',
+        cum_vrm='',
+        ordered_ptf=listing['ordered_ptf'],
+        ordered_ptf_count=len(listing['ordered_ptf']),
+        shipped_ptf=listing['shipped_ptf'],
+        shipped_ptf_count=len(listing['shipped_ptf']),
     )
-
+    if listing['image_type'] == 'cum':
+        image_info['cum_id'] = listing['cum_id']
+        image_info['cum_vrm'] = listing['cum_vrm']
     return image_info
 
 
 def get_image_info(module, image_path):
-    lst_patthern = r"^ilst\S+.txt$"
-    img_patthern = r"^\S+_\d.bin$"
-
     file_list = os.listdir(image_path)
     lst_found = ftp_found = sha_found = img_found = 0
 
@@ -393,7 +314,7 @@ def get_image_info(module, image_path):
         if not os.path.isdir(full_file_path):
             if file_name == "sha256.txt":
                 sha_found += 1
-            if re.match(lst_patthern, file_name, re.IGNORECASE):
+            if IMAGE_LST_PATTERN.match(file_name):
                 lst_found += 1
                 image_info = get_info_in_lst(full_file_path)
                 image_dir['order_id'] = image_info['order_id']
@@ -405,7 +326,7 @@ def get_image_info(module, image_path):
                 image_dir['ordered_ptf_count'] = image_info['ordered_ptf_count']
                 image_dir['shipped_ptf'] = image_info['shipped_ptf']
                 image_dir['shipped_ptf_count'] = image_info['shipped_ptf_count']
-            if re.match(img_patthern, file_name, re.IGNORECASE):
+            if IMAGE_FILE_PATTERN.match(file_name):
                 img_found += 1
                 img_file = dict(
                     file=file_name,
@@ -431,45 +352,120 @@ def get_image_info(module, image_path):
         return None
 
 
-def scan_image_files(module, dir_path):
-    if os.path.isdir(dir_path):
-        image_info = get_image_info(module, dir_path)
-        if image_info:
-            images.append(image_info)
-
-        file_list = os.listdir(dir_path)
-        for file in file_list:
-            cur_path = os.path.join(dir_path, file)
-            if os.path.isdir(cur_path):
-                scan_image_files(module, cur_path)
-
+def scan_image_dirs(image_root):
+    '''Walks image_root and returns a dict of the directories with one ilst*.txt, a sha256.txt and
+    image files, to their fingerprint. The fingerprint covers the names, sizes and modification
+    times of the listing and checksum files and the names of the image files'''
+    image_dirs = {}
+    dir_paths = [image_root]
+    while dir_paths:
+        dir_path = dir_paths.pop()
+        try:
+            with os.scandir(dir_path) as entries:
+                entries = list(entries)
+        except OSError:
+            continue
+        lst_found = sha_found = img_found = 0
+        fingerprint_items = []
+        for entry in entries:
+            if entry.is_dir():
+                dir_paths.append(entry.path)
+                continue
+            if entry.name == "sha256.txt" or IMAGE_LST_PATTERN.match(entry.name):
+                if entry.name == "sha256.txt":
+                    sha_found += 1
+                else:
+                    lst_found += 1
+                st = entry.stat()
+                fingerprint_items.append(f'{entry.name}:{st.st_size}:{st.st_mtime_ns}')
+            elif IMAGE_FILE_PATTERN.match(entry.name):
+                img_found += 1
+                fingerprint_items.append(entry.name)
+        if lst_found == 1 and sha_found == 1 and img_found >= 1:
+            fingerprint_items.sort()
+            image_dirs[dir_path] = hashlib.sha256('\n'.join(fingerprint_items).encode('utf-8')).hexdigest()
+    return image_dirs
+
+
+def refresh_images(module, conn, image_dirs):
+    '''Parses the new and changed image directories in parallel and updates the database in one
+    transaction, the images no longer found are removed. Returns the counts of the added, changed,
+    removed and unchanged images, None if there is no valid image'''
+    existing = {}
+    for image_id, image_path, fingerprint in conn.execute(f'SELECT id, image_path, fingerprint FROM {ptf_repo_lv1_table}'):
+        existing[image_path] = (image_id, fingerprint)
+    to_parse = sorted(path for path, fingerprint in image_dirs.items()
+                      if path not in existing or existing[path][1] != fingerprint)
+    unchanged = len(image_dirs) - len(to_parse)
+    parsed = {}
+    if to_parse:
+        workers = max(1, min(IMAGE_PARSE_MAX_WORKERS, len(to_parse)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parsed = dict(zip(to_parse, executor.map(lambda path: get_image_info(module, path), to_parse)))
+    valid_images = [path for path in to_parse if parsed[path]]
+    if unchanged + len(valid_images) == 0:
+        return None
 
-def checksum_after_find(module, success_list):
+    summary = dict(added=0, changed=0, removed=0, unchanged=unchanged)
+    columns = [k for k in ptf_repo_lv1_dict.keys() if k not in ('id', 'add_time')]
+    sql_insert = build_sql_add([dict((k, None) for k in columns)])
+    sql_update = f'UPDATE {ptf_repo_lv1_table} SET ' + ', '.join(f'{k}=:{k}' for k in columns) + \
+        ', add_time=CURRENT_TIMESTAMP WHERE id=:id'
+    sql_delete_ptf = f'DELETE FROM {ptf_repo_lv1_ptf_table} WHERE image_id=?'
+    with conn:
+        for path in valid_images:
+            image = dict((k, None) for k in columns)
+            image.update(parsed[path])
+            image['fingerprint'] = image_dirs[path]
+            if path in existing:
+                image_id = existing[path][0]
+                image['id'] = image_id
+                conn.execute(sql_update, image)
+                conn.execute(sql_delete_ptf, (image_id,))
+                summary['changed'] += 1
+            else:
+                image_id = conn.execute(sql_insert, image).lastrowid
+                summary['added'] += 1
+            insert_image_ptf_rows(conn, get_image_ptf_rows(image_id, image.get('ordered_ptf'), image.get('shipped_ptf')))
+        removed_ids = [(image_id,) for path, (image_id, fingerprint) in existing.items()
+                       if path not in image_dirs or (path in parsed and not parsed[path])]
+        conn.executemany(f'DELETE FROM {ptf_repo_lv1_table} WHERE id=?', removed_ids)
+        conn.executemany(sql_delete_ptf, removed_ids)
+        summary['removed'] = len(removed_ids)
+    return summary
+
+
+def get_image_rows(success_list):
+    image_rows = []
     if isinstance(success_list, list) and len(success_list) > 0:
         for row in success_list:
-            image_path = image_files = None
             if row.get('query_result'):
                 sublist = row.get('query_result')
                 if isinstance(sublist, list) and len(sublist) > 0:
                     for row in sublist:
                         if isinstance(row, dict) and row.get('image_path') and row.get('image_files'):
-                            image_path = row.get('image_path')
-                            image_files = row.get('image_files')
-                            if os.path.isdir(image_path) and isinstance(image_files, list):
-                                for image_file in image_files:
-                                    full_path = os.path.join(image_path, image_file.get('file'))
-                                    if os.path.isfile(full_path) and image_file.get('expected_chksum'):
-                                        image_file['file_chksum'] = module.sha256(full_path)
-                                        image_file['integrity'] = image_file.get('file_chksum') == image_file.get('expected_chksum')
+                            image_rows.append(row)
             elif isinstance(row, dict) and row.get('image_path') and row.get('image_files'):
-                image_path = row.get('image_path')
-                image_files = row.get('image_files')
-                if os.path.isdir(image_path) and isinstance(image_files, list):
-                    for image_file in image_files:
-                        full_path = os.path.join(image_path, image_file.get('file'))
-                        if os.path.isfile(full_path) and image_file.get('expected_chksum'):
-                            image_file['file_chksum'] = module.sha256(full_path)
-                            image_file['integrity'] = image_file.get('file_chksum') == image_file.get('expected_chksum')
+                image_rows.append(row)
+    return image_rows
+
+
+def checksum_after_find(module, conn, success_list, force_rehash=False):
+    image_files_to_check = []
+    for row in get_image_rows(success_list):
+        image_path = row.get('image_path')
+        image_files = row.get('image_files')
+        if os.path.isdir(image_path) and isinstance(image_files, list):
+            for image_file in image_files:
+                full_path = os.path.join(image_path, image_file.get('file'))
+                if os.path.isfile(full_path) and image_file.get('expected_chksum'):
+                    image_files_to_check.append((image_file, full_path))
+    checksums, stats = ibmi_fix_repo_db.get_checksums(
+        conn, [full_path for image_file, full_path in image_files_to_check], 'sha256', force_rehash)
+    for image_file, full_path in image_files_to_check:
+        image_file['file_chksum'] = checksums.get(full_path)
+        image_file['integrity'] = image_file.get('file_chksum') == image_file.get('expected_chksum')
+    return stats
 
 
 def generate_query_fields(fields):
@@ -492,18 +488,128 @@ def build_sql_init():
     return sql
 
 
+def build_sql_init_ptf():
+    fields = ', '.join(f'{k} {v}' for k, v in ptf_repo_lv1_ptf_dict.items())
+    return f'CREATE TABLE IF NOT EXISTS {ptf_repo_lv1_ptf_table} ({fields})'
+
+
+def get_image_ptf_rows(image_id, ordered_ptf, shipped_ptf):
+    '''Returns the rows of the PTF table of an image, ordered_ptf and shipped_ptf are the JSON
+    strings or the lists stored in the image table'''
+    rows = []
+    for ordered in json.loads(ordered_ptf) if isinstance(ordered_ptf, str) else ordered_ptf or []:
+        if ordered.get('group'):
+            rows.append((image_id, 'group', None, ordered.get('group'), ordered.get('level')))
+        elif ordered.get('ptf'):
+            rows.append((image_id, 'ordered', ordered.get('ptf'), None, None))
+    for shipped in json.loads(shipped_ptf) if isinstance(shipped_ptf, str) else shipped_ptf or []:
+        rows.append((image_id, 'shipped', shipped, None, None))
+    return rows
+
+
+def insert_image_ptf_rows(conn, rows):
+    conn.executemany(f'INSERT INTO {ptf_repo_lv1_ptf_table} VALUES(?, ?, ?, ?, ?)', rows)
+
+
+def fill_ptf_table(conn):
+    '''Fills the PTF table from the images already in the database, replacing its rows'''
+    conn.execute(f'DELETE FROM {ptf_repo_lv1_ptf_table}')
+    cursor = conn.execute(f'SELECT id, ordered_ptf, shipped_ptf FROM {ptf_repo_lv1_table}')
+    for image_id, ordered_ptf, shipped_ptf in cursor.fetchall():
+        insert_image_ptf_rows(conn, get_image_ptf_rows(image_id, ordered_ptf, shipped_ptf))
+
+
+def add_fingerprint_column(conn):
+    '''Adds the fingerprint column to an image table created before it was in ptf_repo_lv1_dict'''
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({ptf_repo_lv1_table})')]
+    if 'fingerprint' not in columns:
+        conn.execute(f'ALTER TABLE {ptf_repo_lv1_table} ADD COLUMN fingerprint TEXT')
+
+
+# Schema migrations of the repo database, see ibmi_fix_repo_db.migrate.
+# Append new migrations, never change the ones released.
+def build_migrations():
+    return [
+        [build_sql_init()] + ibmi_fix_repo_db.CHECKSUM_CACHE_SCHEMA,
+        [build_sql_init_ptf()] + ptf_repo_lv1_ptf_indexes + [fill_ptf_table],
+        [add_fingerprint_column],
+    ]
+
+
+def open_database(module, database):
+    try:
+        # if the database file not exist, it will be created automatically.
+        return ibmi_fix_repo_db.connect(database, build_migrations(), 'ibmi_fix_repo_lv1')
+    except OSError:
+        module.fail_json(msg='Failed to create path ' + database)
+    except sqlite3.Error as e:
+        module.fail_json(msg=e.args[0])
+
+
 def build_sql_list(fields):
     list_param = generate_query_fields(fields)
     return f'SELECT {list_param} FROM {ptf_repo_lv1_table}'
 
 
-def remove_temp_fields(temp_ordered_ptf, temp_shipped_ptf, row):
-    new_row = row.copy()
-    if temp_ordered_ptf:
-        new_row.pop('ordered_ptf')
-    if temp_shipped_ptf:
-        new_row.pop('shipped_ptf')
-    return new_row
+def get_find_keys(param):
+    '''Returns the column values of the PTF table matching a find parameter, None if the
+    parameter has none of shipped_ptf, ptf and group'''
+    if param.get('shipped_ptf'):
+        return dict(kind='shipped', ptf_id=param.get('shipped_ptf'))
+    elif param.get('ptf'):
+        return dict(kind='ordered', ptf_id=param.get('ptf'))
+    elif param.get('group') and param.get('level'):
+        return dict(kind='group', ptf_group=param.get('group'), ptf_group_level=param.get('level'))
+    elif param.get('group'):
+        return dict(kind='group', ptf_group=param.get('group'))
+    return None
+
+
+def decode_row(row):
+    for key in ('image_files', 'ordered_ptf', 'shipped_ptf'):
+        if row.get(key):
+            row[key] = json.loads(row.get(key))
+    return row
+
+
+def find_images(conn, fields, parameters, additional_sql):
+    '''Looks up the images of all the parameters in the indexed PTF table, then reads only the
+    matched images. The images of each parameter keep the order additional_sql gives'''
+    keys_list = []
+    key_indexes = []
+    for idx, param in enumerate(parameters):
+        find_keys = get_find_keys(param)
+        if find_keys:
+            keys_list.append(find_keys)
+            key_indexes.append(idx)
+    image_ids = [set() for param in parameters]
+    found = ibmi_fix_repo_db.find_rows(conn, ptf_repo_lv1_ptf_table, ptf_repo_lv1_ptf_dict, keys_list)
+    for idx, rows in zip(key_indexes, found):
+        image_ids[idx].update(row['image_id'] for row in rows)
+    matched_ids = set().union(*image_ids)
+
+    rows_by_id = {}
+    if matched_ids:
+        query_fields = generate_query_fields(fields)
+        select_fields = f'id AS find_image_id, {query_fields}' if query_fields else 'id AS find_image_id'
+        matched_list = list(matched_ids)
+        for i in range(0, len(matched_list), SQL_IN_CHUNK_SIZE):
+            chunk = matched_list[i:i + SQL_IN_CHUNK_SIZE]
+            placeholders = ', '.join('?' for image_id in chunk)
+            cursor = conn.execute(
+                f'SELECT {select_fields} FROM {ptf_repo_lv1_table} WHERE id IN ({placeholders})', chunk)
+            for row in ibmi_fix_repo_db.rows_to_dicts(cursor, cursor.fetchall()):
+                rows_by_id[row.pop('find_image_id')] = decode_row(row)
+
+    sql = f'SELECT id FROM {ptf_repo_lv1_table} {additional_sql}'
+    ordered_ids = [row[0] for row in conn.execute(sql) if row[0] in rows_by_id]
+    success_list = []
+    for param, ids in zip(parameters, image_ids):
+        success_list.append(dict(
+            query_item=param,
+            query_result=[rows_by_id[image_id].copy() for image_id in ordered_ids if image_id in ids],
+        ))
+    return success_list, sql
 
 
 def build_sql_add(parameters):
@@ -525,104 +631,44 @@ def dict_factory(cursor, row):
     return d
 
 
-def run_sql(module, database, fields, parameters, additional_sql, action):
+def run_sql(module, conn, fields, parameters, additional_sql, action):
     sql = ''
     success_list = []
     fail_list = []
-    temp_ordered_ptf = False
-    temp_shipped_ptf = False
+    row_changed = -1
 
     if additional_sql is None:
         additional_sql = ''
 
-    if action == 'find':
-        if 'ordered_ptf' not in fields:
-            fields.append('ordered_ptf')
-            temp_ordered_ptf = True
-        if 'shipped_ptf' not in fields:
-            fields.append('shipped_ptf')
-            temp_shipped_ptf = True
-
-    try:
-        ibmi_util.ensure_dir(os.path.dirname(database))
-    except Exception:
-        module.fail_json(msg='Failed to create path ' + database)
-
-    try:
-        conn = sqlite3.connect(database)
-        # if the database file not exist, it will be created automatically.
-    except sqlite3.Error as e:
-        module.fail_json(msg=e.args[0])
-
     if (conn is not None):
         c = conn.cursor()
-        # create the table first if needed.
-        sql = build_sql_init()
-        try:
-            c.execute(sql)
-        except sqlite3.Error as e:
-            module.fail_json(msg=e.args[0] + ' ***SQL:' + sql)
 
-        if action == 'refresh':
-            sql = 'DELETE FROM ' + ptf_repo_lv1_table
-            c.execute(sql)
-            sql = build_sql_add(parameters)
-        elif action == 'list' or action == 'find':
+        if action == 'list' or action == 'find':
             sql = build_sql_list(fields) + ' ' + additional_sql
         elif action == 'clear':
             sql = 'DROP TABLE IF EXISTS ' + ptf_repo_lv1_table
         else:
             return -2, 'Unsupported action: ' + action, -1, success_list, fail_list, sql
         try:
-            if action == 'list' or action == 'find':
+            if action == 'find':
+                if isinstance(parameters, list):
+                    success_list, sql = find_images(conn, fields, parameters, additional_sql)
+            elif action == 'list':
                 c.row_factory = dict_factory
                 c.execute(sql)
-                rs = c.fetchall()
-                if isinstance(rs, list) and len(rs) > 0:
-                    for row in rs:
-                        if row.get('image_files'):
-                            row['image_files'] = json.loads(row.get('image_files'))
-                        if row.get('ordered_ptf'):
-                            row['ordered_ptf'] = json.loads(row.get('ordered_ptf'))
-                        if row.get('shipped_ptf'):
-                            row['shipped_ptf'] = json.loads(row.get('shipped_ptf'))
-                        if action == 'list':
-                            success_list.append(row)
-                if action == 'find' and isinstance(parameters, list):
-                    for param in parameters:
-                        rs_copy = []
-                        result = dict(
-                            query_item=param,
-                        )
-                        for row in rs:
-                            if param.get('shipped_ptf') and row.get('shipped_ptf') and param.get('shipped_ptf') in row.get('shipped_ptf'):
-                                rs_copy.append(remove_temp_fields(temp_ordered_ptf, temp_shipped_ptf, row))
-                            elif param.get('ptf'):
-                                for ordered_ptf in row.get('ordered_ptf'):
-                                    if ordered_ptf.get('ptf') and param.get('ptf') == ordered_ptf.get('ptf'):
-                                        rs_copy.append(remove_temp_fields(temp_ordered_ptf, temp_shipped_ptf, row))
-                            elif param.get('group') and param.get('level'):
-                                for ordered_ptf in row.get('ordered_ptf'):
-                                    if ordered_ptf.get('group') and param.get('group') == ordered_ptf.get('group'):
-                                        if ordered_ptf.get('level') and param.get('level') == ordered_ptf.get('level'):
-                                            rs_copy.append(remove_temp_fields(temp_ordered_ptf, temp_shipped_ptf, row))
-                            elif param.get('group'):
-                                for ordered_ptf in row.get('ordered_ptf'):
-                                    if ordered_ptf.get('group') and param.get('group') == ordered_ptf.get('group'):
-                                        rs_copy.append(remove_temp_fields(temp_ordered_ptf, temp_shipped_ptf, row))
-                        result['query_result'] = rs_copy
-                        success_list.append(result)
-            elif isinstance(parameters, list):  # update/delete
-                c.executemany(sql, parameters)
-            else:  # clear/init tables (no param)
+                for row in c.fetchall():
+                    success_list.append(decode_row(row))
+            else:  # clear tables (no param)
                 c.execute(sql)
+                c.execute('DELETE FROM ' + ptf_repo_lv1_ptf_table)
+                # the table is created again right away, the schema migrations only run once
+                conn.execute(build_sql_init())
         except sqlite3.Error as e:
             module.fail_json(msg=e.args[0] + ' ***SQL:' + sql + ' ***Param:' + str(parameters))
         finally:
             conn.commit()
-            conn.close()
 
-        return 0, '', c.rowcount, success_list, fail_list, sql
+        return 0, '', row_changed, success_list, fail_list, sql
 
 
 def main():
@@ -631,6 +677,7 @@ def main():
             action=dict(type='str', required=True),
             image_root=dict(type='str'),
             checksum=dict(type='bool', default=False),
+            force_rehash=dict(type='bool', default=False),
             database=dict(type='str', default='/etc/ibmi_ansible/fix_management/repo_lv1.sqlite3'),
             additional_sql=dict(type='str'),
             parameters=dict(type='list', elements='dict'),
@@ -648,6 +695,7 @@ def main():
     parameters = module.params['parameters']
     fields = module.params['fields']
     checksum = module.params['checksum']
+    force_rehash = module.params['force_rehash']
 
     result = dict(
         action=action,
@@ -677,10 +725,22 @@ def main():
     startd = datetime.datetime.now()
 
     if action == 'refresh':
-        scan_image_files(module, image_root)
-        if len(images) == 0:
+        image_dirs = scan_image_dirs(image_root)
+        if len(image_dirs) == 0:
             module.fail_json(msg="No valid image found in image_root", **result)
-        list_to_sqlite = images
+        conn = open_database(module, database)
+        try:
+            refresh_summary = refresh_images(module, conn, image_dirs)
+        except sqlite3.Error as e:
+            conn.close()
+            module.fail_json(msg=e.args[0], **result)
+        conn.close()
+        if refresh_summary is None:
+            module.fail_json(msg="No valid image found in image_root", **result)
+        result['refresh_summary'] = refresh_summary
+        result['row_changed'] = refresh_summary['added'] + refresh_summary['changed'] + refresh_summary['removed']
+        result['success_list'] = []
+        list_to_sqlite = []
     else:
         list_to_sqlite = parameters
 
@@ -693,17 +753,20 @@ def main():
         if 'image_files' not in fields:
             fields.append('image_files')
 
-    if action in ('refresh', 'list', 'clear', 'find') or len(list_to_sqlite) > 0:
-        rc, msg, row_changed, success_list, fail_list, sql = run_sql(module, database, fields, list_to_sqlite, additional_sql, action)
+    if action in ('list', 'clear', 'find') or len(list_to_sqlite) > 0:
+        conn = open_database(module, database)
+        rc, msg, row_changed, success_list, fail_list, sql = run_sql(module, conn, fields, list_to_sqlite, additional_sql, action)
         if rc != 0:
+            conn.close()
             module.fail_json(msg=msg, **result)
         result['sql'] = sql
         if isinstance(row_changed, int):
             result['row_changed'] = row_changed
         if len(success_list) > 0:  # only for action = 'find'
             if checksum is True:
-                checksum_after_find(module, success_list)
+                result['checksum_cache'] = checksum_after_find(module, conn, success_list, force_rehash)
             result['success_list'] = success_list
+        conn.close()
         result['success_list'] = success_list
     if len(fail_list) > 0 or len(invalid_params) > 0 or len(checksum_failed_params) > 0 or len(fail_list_after_run_sql) > 0 or len(mismatched_params) > 0:
         result['fail_list'] = fail_list + invalid_params + checksum_failed_params + fail_list_after_run_sql + mismatched_params
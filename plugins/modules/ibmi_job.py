@@ -308,7 +308,7 @@ def main():
 
     sql_to_run = sql_job_columns + sql_from + sql_where
 
-    rc, out, err_msg, job_log = ibmi_module.itoolkit_run_sql_once(sql_to_run)
+    rc, out, err_msg, job_log = ibmi_module.itoolkit_run_sql_once(sql_to_run, defer_job_log=True)
     rt_job_log = []
     if joblog or (rc != IBMi_COMMAND_RC_SUCCESS):
         rt_job_log = job_log
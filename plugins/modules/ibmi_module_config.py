@@ -25,9 +25,10 @@ options:
     description:
       - The section to be configured.
       - When set to C(dump), the current configuration will be displayed
+      - When set to C(connection_broker), the connection broker settings are configured.
     type: str
     required: yes
-    choices: ['log_config', 'dump']
+    choices: ['log_config', 'connection_broker', 'dump']
   config_dir:
     description:
       - The configuration file directory.
@@ -68,6 +69,41 @@ options:
       - The maximum size of the modules log file, if the log file is larger that this value, an archive(zip) will be occurred.
     type: int
     default: 5
+  max_log_backups:
+    description:
+      - The maximum number of archived(zip) log files to keep, the oldest archives are removed first.
+      - When set to 0, all the archived log files are kept.
+    type: int
+    default: 0
+  broker_enabled:
+    description:
+      - If set to C(true), the modules borrow their database connection from a connection broker on the managed node
+        instead of connecting and disconnecting in every task.
+      - The broker is a process which is started by the first module that needs it. It keeps a pool of connections
+        by database and C(become_user), and ends itself when it has been idle for C(broker_idle_timeout) seconds.
+      - Since the jobs of the connections are reused, job attributes changed by a task, like the library list or
+        the objects in QTEMP, are seen by the later tasks which use the same connection.
+      - Only used when C(section) is C(connection_broker).
+    type: bool
+    default: True
+  broker_max_size:
+    description:
+      - The maximum number of connections the connection broker keeps open.
+      - Only used when C(section) is C(connection_broker).
+    type: int
+    default: 8
+  broker_idle_timeout:
+    description:
+      - The number of seconds an idle connection is kept in the connection broker pool.
+      - Only used when C(section) is C(connection_broker).
+    type: int
+    default: 300
+  broker_health_check_interval:
+    description:
+      - A pooled connection which has not been used for this number of seconds is checked before it is lent again.
+      - Only used when C(section) is C(connection_broker).
+    type: int
+    default: 60
 
 seealso:
 - module: ibmi_cl_command
@@ -82,6 +118,13 @@ EXAMPLES = r'''
     section: log_config
     config_dir: home
     log_level: debug
+
+- name: Enable the connection broker for the current user
+  ibm.power_ibmi.ibmi_module_config:
+    section: connection_broker
+    config_dir: home
+    broker_enabled: true
+    broker_max_size: 4
 '''
 
 RETURN = r'''
@@ -109,14 +152,22 @@ settings:
             "log_dir": "/var/log",
             "log_file": "ibmi_ansible_modules.log",
             "log_level": "DEBUG",
+            "max_log_backups": 0,
             "max_log_size_mb": 5,
             "no_log": false
         },
+        "connection_broker": {
+            "enabled": false,
+            "health_check_interval": 60,
+            "idle_timeout": 300,
+            "max_size": 8
+        },
         "time": "2020-06-28 22:01:57.881370"
     }
 '''
 
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_connection_broker
 from ansible.module_utils.basic import AnsibleModule
 import datetime
 import json
@@ -130,7 +181,7 @@ def main():
     module = AnsibleModule(
         argument_spec=dict(
             section=dict(type='str', required=True,
-                         choices=['log_config', 'dump']),
+                         choices=['log_config', 'connection_broker', 'dump']),
             config_dir=dict(type='str', default='home',
                             choices=['etc', 'home']),
             log_level=dict(type='str', default='info', choices=[
@@ -139,6 +190,11 @@ def main():
             log_file=dict(type='str', default='ibmi_ansible_modules.log'),
             log_dir=dict(type='str', default='/var/log'),
             max_log_size_mb=dict(type='int', default=5),
+            max_log_backups=dict(type='int', default=0),
+            broker_enabled=dict(type='bool', default=True),
+            broker_max_size=dict(type='int', default=8),
+            broker_idle_timeout=dict(type='int', default=300),
+            broker_health_check_interval=dict(type='int', default=60),
         ),
         supports_check_mode=True,
     )
@@ -152,6 +208,11 @@ def main():
     log_file = module.params['log_file']
     log_dir = module.params['log_dir']
     max_log_size_mb = module.params['max_log_size_mb']
+    max_log_backups = module.params['max_log_backups']
+    broker_enabled = module.params['broker_enabled']
+    broker_max_size = module.params['broker_max_size']
+    broker_idle_timeout = module.params['broker_idle_timeout']
+    broker_health_check_interval = module.params['broker_health_check_interval']
 
     # When this module supports another section, update the default settings dict
     default_settings = dict(
@@ -161,7 +222,13 @@ def main():
             log_dir=ibmi_util.IBMi_DEFAULT_LOG_DIR,
             log_file=ibmi_util.IBMi_DEFAULT_LOG_FILE,
             log_level=ibmi_util.IBMi_DEFAULT_LOG_LEVEL_STR,
-            max_log_size_mb=int(ibmi_util.IBMi_DEFAULT_MAX_LOG_SIZE / float(1024 * 1024)))
+            max_log_size_mb=int(ibmi_util.IBMi_DEFAULT_MAX_LOG_SIZE / float(1024 * 1024)),
+            max_log_backups=ibmi_util.IBMi_DEFAULT_MAX_LOG_BACKUPS),
+        connection_broker=dict(
+            enabled=False,
+            max_size=ibmi_connection_broker.BROKER_DEFAULT_MAX_SIZE,
+            idle_timeout=ibmi_connection_broker.BROKER_DEFAULT_IDLE_TIMEOUT,
+            health_check_interval=ibmi_connection_broker.BROKER_DEFAULT_HEALTH_CHECK_INTERVAL)
     )
 
     if section == 'dump':
@@ -197,21 +264,22 @@ def main():
                 msg=f"Error occurred when dump IBMi Ansible module settings: {str(e)}"
             )
 
-    try:
-        mode = 0o0755
-        ibmi_util.ensure_dir(log_dir, mode)
-    except Exception as e:
-        module.fail_json(
-            rc=255,
-            version=__ibmi_module_version__,
-            msg=f"Error occurred when create IBMi Ansible log directory: {log_dir}, {str(e)}"
-        )
-    if not os.access(log_dir, os.W_OK):
-        module.fail_json(
-            rc=255,
-            version=__ibmi_module_version__,
-            msg=f"Current user write permission denied for IBMi Ansible log directory: {log_dir}"
-        )
+    if section == 'log_config':
+        try:
+            mode = 0o0755
+            ibmi_util.ensure_dir(log_dir, mode)
+        except Exception as e:
+            module.fail_json(
+                rc=255,
+                version=__ibmi_module_version__,
+                msg=f"Error occurred when create IBMi Ansible log directory: {log_dir}, {str(e)}"
+            )
+        if not os.access(log_dir, os.W_OK):
+            module.fail_json(
+                rc=255,
+                version=__ibmi_module_version__,
+                msg=f"Current user write permission denied for IBMi Ansible log directory: {log_dir}"
+            )
 
     if config_dir == 'home':
         log_config_dir = os.getenv('HOME', ibmi_util.IBMi_DEFAULT_CONFIG_DIR)
@@ -233,17 +301,33 @@ def main():
             version=__ibmi_module_version__,
             msg=f"Current user write permission denied for IBMi Ansible configuration directory: {log_config_dir}"
         )
+    log_config_file_path = os.path.join(
+        log_config_dir, ibmi_util.IBMi_ANSIBLE_CONFIG_FILE)
     config_dict = default_settings
+    # Keep the settings of the other sections
+    try:
+        if os.path.exists(log_config_file_path):
+            with open(log_config_file_path, 'r', encoding='utf-8') as load_f:
+                config_dict.update(json.load(load_f))
+    except Exception as e:
+        ibmi_util.log_info(f"Ignore the invalid configuration file {log_config_file_path}: {str(e)}", module._name)
     config_dict['time'] = str(datetime.datetime.now())
-    config_dict[section]['no_log'] = no_log
-    config_dict[section]['log_dir'] = log_dir
-    config_dict[section]['log_file'] = log_file
-    config_dict[section]['log_level'] = log_level.upper()
-    config_dict[section]['max_log_size_mb'] = max_log_size_mb
+    if section == 'log_config':
+        config_dict[section] = dict(
+            no_log=no_log,
+            log_dir=log_dir,
+            log_file=log_file,
+            log_level=log_level.upper(),
+            max_log_size_mb=max_log_size_mb,
+            max_log_backups=max_log_backups)
+    else:
+        config_dict[section] = dict(
+            enabled=broker_enabled,
+            max_size=broker_max_size,
+            idle_timeout=broker_idle_timeout,
+            health_check_interval=broker_health_check_interval)
 
     try:
-        log_config_file_path = os.path.join(
-            log_config_dir, ibmi_util.IBMi_ANSIBLE_CONFIG_FILE)
         with open(log_config_file_path, 'w', encoding='utf-8') as dump_f:
             json.dump(config_dict, dump_f)
             mode = 0o0644
@@ -78,6 +78,42 @@ options:
         It takes time to return result if this option is turned on.
     default: false
     type: bool
+  columns:
+    description:
+      - The columns of the returned objects, only these columns are retrieved from the system.
+      - The valid columns are C(OBJNAME), C(OBJTYPE), C(OBJOWNER), C(OBJDEFINER), C(OBJCREATED), C(TEXT), C(OBJLIB),
+        C(IASP_NUMBER), C(LAST_USED_TIMESTAMP), C(LAST_RESET_TIMESTAMP), C(OBJSIZE), C(OBJATTRIBUTE) and C(OBJLONGSCHEMA).
+      - All the columns are returned if not specified.
+    type: list
+    elements: str
+    required: false
+  page_size:
+    description:
+      - The max number of objects returned, ordered by library, object name and object type.
+        If more objects are found, C(resume_token) is returned to get the next page.
+      - All the objects are returned if set to 0.
+    type: int
+    default: 0
+    required: false
+  resume_token:
+    description:
+      - The C(resume_token) returned by the previous page, the objects after the last object of that page are returned.
+      - It is only valid with the same options selecting the objects.
+    type: str
+    required: false
+  output_file:
+    description:
+      - The file on the IBM i node the objects are written to instead of returning them in C(object_list).
+      - The file is replaced when all the objects have been written.
+    type: str
+    required: false
+  output_format:
+    description:
+      - The format of C(output_file), one JSON object per line or CSV with a header line.
+    type: str
+    default: "json_lines"
+    choices: ["json_lines", "csv"]
+    required: false
   joblog:
     description:
       - The job log of the job executing the task will be returned even rc is zero if it is set to true.
@@ -131,6 +167,25 @@ EXAMPLES = r'''
     object_name: 'OBJABC'
     become_user: 'USER1'
     become_user_password: 'yourpassword'
+
+- name: Write the name, type and size of the first 50000 objects of the user libraries to a CSV file
+  ibm.power_ibmi.ibmi_object_find:
+    lib_name: '*ALLUSR'
+    columns: ['OBJLIB', 'OBJNAME', 'OBJTYPE', 'OBJSIZE']
+    page_size: 50000
+    output_file: '/tmp/objects_1.csv'
+    output_format: 'csv'
+  register: objects_page
+
+- name: Write the next 50000 objects
+  ibm.power_ibmi.ibmi_object_find:
+    lib_name: '*ALLUSR'
+    columns: ['OBJLIB', 'OBJNAME', 'OBJTYPE', 'OBJSIZE']
+    page_size: 50000
+    resume_token: "{{ objects_page.resume_token }}"
+    output_file: '/tmp/objects_2.csv'
+    output_format: 'csv'
+  when: objects_page.resume_token != ''
 '''
 
 RETURN = r'''
@@ -183,6 +238,21 @@ object_list:
             "OBJATTRIBUTE": "SAVF"
         }
     ]
+object_count:
+    description: The number of objects returned in object_list or written to output_file
+    returned: when rc as 0(success)
+    type: int
+    sample: 2
+resume_token:
+    description: The token to get the next page of objects, empty if there is no more object
+    returned: when page_size is not 0
+    type: str
+    sample: 'eyJxdWVyeSI6ICI1ZjQzYjE2YzBlNmRmMDI2IiwgImtleSI6IFsiVEVTVExJQiIsICJSSU5HMSIsICIqRklMRSJdfQ=='
+output_file:
+    description: The file the objects were written to
+    returned: when output_file is specified
+    type: str
+    sample: '/tmp/objects_1.csv'
 stdout:
     description: The task execution standard output
     returned: When rc as non-zero(failure)
@@ -242,11 +312,18 @@ job_log:
 HAS_ITOOLKIT = True
 HAS_IBM_DB = True
 
+import base64
+import csv
 import datetime
+import hashlib
+import json
+import os
 import re
+import tempfile
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import db2i_tools
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_module as imodule
 
 __ibmi_module_version__ = "2.0.1"
@@ -258,6 +335,11 @@ IBMi_COMMAND_RC_ITOOLKIT_NO_KEY_JOBLOG = 256
 IBMi_COMMAND_RC_ITOOLKIT_NO_KEY_ERROR = 257
 IBMi_COMMAND_RC_UNEXPECTED_ROW_COUNT = 258
 IBMi_COMMAND_RC_INVALID_EXPECTED_ROW_COUNT = 259
+IBMi_OBJECT_COLUMNS = ['OBJNAME', 'OBJTYPE', 'OBJOWNER', 'OBJDEFINER', 'OBJCREATED', 'TEXT', 'OBJLIB', 'IASP_NUMBER',
+                       'LAST_USED_TIMESTAMP', 'LAST_RESET_TIMESTAMP', 'OBJSIZE', 'OBJATTRIBUTE', 'OBJLONGSCHEMA']
+# the columns the pages are ordered by, unique for the objects of a query
+IBMi_KEYSET_COLUMNS = ['OBJLONGSCHEMA', 'OBJNAME', 'OBJTYPE']
+IBMi_OUTPUT_FORMATS = ['json_lines', 'csv']
 
 
 def age_where_stmt(input_age, input_age_stamp):
@@ -317,6 +399,102 @@ def handle_db_exception(db_err):
     return err
 
 
+def column_expression(column, lib_name_label):
+    if column == 'OBJLIB':
+        return lib_name_label + " AS OBJLIB"
+    if column == 'OBJSIZE':
+        return "BIGINT(X.OBJSIZE) AS OBJSIZE"
+    return "X." + column
+
+
+def query_digest(params):
+    '''A digest of the options selecting the objects, a resume token is only valid for the same options'''
+    names = ['age', 'age_stamp', 'object_type_list', 'lib_name', 'object_name', 'size', 'iasp_name', 'use_regex']
+    text = json.dumps([params[name] for name in names])
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def encode_resume_token(digest, row):
+    data = json.dumps(dict(query=digest, key=[row[column] for column in IBMi_KEYSET_COLUMNS]))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+def decode_resume_token(digest, token):
+    '''Returns the key of the last object of the previous page, None if the token is not valid for the query'''
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get('query') != digest or \
+            not isinstance(data.get('key'), list) or len(data['key']) != len(IBMi_KEYSET_COLUMNS):
+        return None
+    return data['key']
+
+
+def keyset_where_stmt(key):
+    '''The objects after key in the order of IBMi_KEYSET_COLUMNS, and the values of its parameter markers'''
+    last = len(IBMi_KEYSET_COLUMNS) - 1
+    conditions = "A." + IBMi_KEYSET_COLUMNS[last] + " > ?"
+    parameters = [key[last]]
+    for index in range(last - 1, -1, -1):
+        column = IBMi_KEYSET_COLUMNS[index]
+        conditions = "A." + column + " > ? OR (A." + column + " = ? AND (" + conditions + "))"
+        parameters = [key[index], key[index]] + parameters
+    return " AND (" + conditions + ")", parameters
+
+
+def take_page(rows, page_size, columns, emit):
+    '''Passes the columns of up to page_size rows to emit, returns the number of rows, the last
+    row and whether there are more rows'''
+    count = 0
+    last_row = None
+    for row in rows:
+        if page_size and count == page_size:
+            return count, last_row, True
+        emit(dict((column, row[column]) for column in columns))
+        last_row = row
+        count = count + 1
+    return count, last_row, False
+
+
+class ObjectWriter(object):
+    '''Writes the objects to a JSON Lines or CSV file, replaced atomically when complete'''
+
+    def __init__(self, path, output_format, columns):
+        self.path = path
+        self.output_format = output_format
+        self.columns = columns
+        self.tmp_path = None
+        self.file = None
+        self.writer = None
+
+    def __enter__(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            ibmi_util.ensure_dir(directory)
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp')
+        self.file = os.fdopen(fd, 'w', encoding='utf-8', newline='')
+        if self.output_format == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=self.columns, lineterminator='\n')
+            self.writer.writeheader()
+        return self
+
+    def write(self, row):
+        if self.writer:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row, default=str) + '\n')
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        if exc_type is None:
+            os.chmod(self.tmp_path, 0o644)
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+        return False
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
@@ -328,6 +506,11 @@ def main():
             size=dict(default=None, type='str'),
             iasp_name=dict(type='str', default='*SYSBAS'),
             use_regex=dict(default=False, type='bool'),
+            columns=dict(type='list', elements='str'),
+            page_size=dict(type='int', default=0),
+            resume_token=dict(type='str', no_log=False),
+            output_file=dict(type='str'),
+            output_format=dict(type='str', default='json_lines', choices=IBMi_OUTPUT_FORMATS),
             joblog=dict(type='bool', default=False),
             become_user=dict(type='str'),
             become_user_password=dict(type='str', no_log=True),
@@ -343,10 +526,32 @@ def main():
     input_lib = module.params['lib_name']
     input_obj_name = module.params['object_name']
     input_use_regex = module.params['use_regex']
+    columns = module.params['columns']
+    page_size = module.params['page_size']
+    resume_token = module.params['resume_token']
+    output_file = module.params['output_file']
+    output_format = module.params['output_format']
     joblog = module.params['joblog']
     become_user = module.params['become_user']
     become_user_password = module.params['become_user_password']
 
+    if columns:
+        columns = [column.strip().upper() for column in columns]
+        invalid_columns = [column for column in columns if column not in IBMi_OBJECT_COLUMNS]
+        if invalid_columns:
+            module.fail_json(rc=ibmi_util.IBMi_PARAM_NOT_VALID, msg="Value specified for columns is not valid: " +
+                             ", ".join(invalid_columns) + ". Valid values are " + ", ".join(IBMi_OBJECT_COLUMNS))
+    else:
+        columns = list(IBMi_OBJECT_COLUMNS)
+    if page_size < 0:
+        module.fail_json(rc=ibmi_util.IBMi_PARAM_NOT_VALID, msg="Value specified for page_size is not valid: " + str(page_size))
+    digest = query_digest(module.params)
+    resume_key = None
+    if resume_token:
+        resume_key = decode_resume_token(digest, resume_token)
+        if resume_key is None:
+            module.fail_json(rc=ibmi_util.IBMi_PARAM_NOT_VALID, msg="Value specified for resume_token is not valid for this query")
+
     startd = datetime.datetime.now()
 
     try:
@@ -379,33 +584,68 @@ def main():
     release_info, err = db2i_tools.get_ibmi_release(db_conn)
 
     if release_info["version_release"] < 7.4:
-        lib_name_label = "(SELECT SYSTEM_SCHEMA_NAME FROM QSYS2.SYSSCHEMAS WHERE SCHEMA_NAME = OBJLONGSCHEMA)"
+        lib_name_label = "S.SYSTEM_SCHEMA_NAME"
+        lib_join = " LEFT JOIN QSYS2.SYSSCHEMAS S ON S.SCHEMA_NAME = X.OBJLONGSCHEMA "
     else:
-        lib_name_label = "OBJLIB"
+        lib_name_label = "X.OBJLIB"
+        lib_join = ""
+
+    # only the columns returned, the columns of the where stmts and of the order of the pages are selected
+    selected_columns = list(columns)
+    needed_columns = ['OBJNAME']
+    if input_age is not None:
+        needed_columns.append('OBJCREATED')
+    if input_size is not None:
+        needed_columns.append('OBJSIZE')
+    if page_size or resume_key:
+        needed_columns.extend(IBMi_KEYSET_COLUMNS)
+    for column in needed_columns:
+        if column not in selected_columns:
+            selected_columns.append(column)
+    select_list = ", ".join(column_expression(column, lib_name_label) for column in selected_columns)
 
     if input_use_regex:
-        obj_stats_expression = " SELECT OBJNAME, OBJTYPE, OBJOWNER, OBJDEFINER, OBJCREATED," \
-                               " TEXT, " + lib_name_label + " AS OBJLIB, IASP_NUMBER, LAST_USED_TIMESTAMP, " \
-                               " LAST_RESET_TIMESTAMP," \
-                               " BIGINT(OBJSIZE) AS OBJSIZE, OBJATTRIBUTE, OBJLONGSCHEMA " \
+        obj_stats_expression = " SELECT " + select_list + \
                                " FROM TABLE (QSYS2.OBJECT_STATISTICS('" + input_lib + "','" + \
-                               input_object_type + "','*ALL')) X "
+                               input_object_type + "','*ALL')) X " + lib_join
         sql_where_stmt_regex = " AND REGEXP_LIKE(A.OBJNAME, '" + input_obj_name + "') "
     else:
-        obj_stats_expression = " SELECT OBJNAME, OBJTYPE, OBJOWNER, OBJDEFINER, OBJCREATED," \
-                               " TEXT, " + lib_name_label + " AS OBJLIB, IASP_NUMBER, LAST_USED_TIMESTAMP, " \
-                               " LAST_RESET_TIMESTAMP," \
-                               " BIGINT(OBJSIZE) AS OBJSIZE, OBJATTRIBUTE, OBJLONGSCHEMA " \
+        obj_stats_expression = " SELECT " + select_list + \
                                " FROM TABLE (QSYS2.OBJECT_STATISTICS('" + input_lib + "','" + \
-                               input_object_type + "','" + input_obj_name + "')) X "
+                               input_object_type + "','" + input_obj_name + "')) X " + lib_join
         sql_where_stmt_regex = ""
 
+    sql_where_stmt_keyset = ""
+    parameters = None
+    if resume_key:
+        sql_where_stmt_keyset, parameters = keyset_where_stmt(resume_key)
+
     sql = "select * from (" + obj_stats_expression + ") A WHERE 1 = 1 " + \
           sql_where_stmt_age + \
           sql_where_stmt_size + \
-          sql_where_stmt_regex
-
-    rc, out_result_set, err = ibmi_module.itoolkit_run_sql(sql)
+          sql_where_stmt_regex + \
+          sql_where_stmt_keyset
+    if page_size:
+        sql = sql + " ORDER BY " + ", ".join("A." + column for column in IBMi_KEYSET_COLUMNS)
+
+    # the objects are streamed to output_file or object_list
+    out_result_set = []
+    next_token = ''
+    try:
+        # a page is one row longer to know whether there is a next page
+        rows = ibmi_module.db_iter_result_list(sql, max_rows=page_size + 1 if page_size else None, parameters=parameters)
+        if output_file:
+            with ObjectWriter(output_file, output_format, columns) as writer:
+                object_count, last_row, more = take_page(rows, page_size, columns, writer.write)
+        else:
+            object_count, last_row, more = take_page(rows, page_size, columns, out_result_set.append)
+        if more:
+            next_token = encode_resume_token(digest, last_row)
+        rc = IBMi_COMMAND_RC_SUCCESS
+        err = None
+    except Exception as inst:
+        rc = ibmi_util.IBMi_SQL_RC_ERROR
+        err = str(inst)
 
     if joblog or (rc != IBMi_COMMAND_RC_SUCCESS):
         job_log = ibmi_module.itoolkit_get_job_log(startd)
@@ -444,12 +684,17 @@ def main():
         result_success = dict(
             sql=sql,
             object_list=out_result_set,
+            object_count=object_count,
             rc=rc,
             start=str(startd),
             end=str(endd),
             delta=str(delta),
             job_log=job_log,
         )
+        if page_size:
+            result_success['resume_token'] = next_token
+        if output_file:
+            result_success['output_file'] = output_file
         module.exit_json(**result_success)
 
 
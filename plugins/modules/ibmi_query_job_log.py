@@ -20,6 +20,7 @@ short_description: Query the specific job log.
 version_added: '1.0.0'
 description:
   - Query the specific job log.
+  - The messages are filtered by the query, only the columns asked for are read from the job log.
 options:
   job_number:
     description:
@@ -36,6 +37,59 @@ options:
       - job name
     type: str
     required: yes
+  columns:
+    description:
+      - The columns of QSYS2.JOBLOG_INFO returned for each message.
+      - The first and second level texts of the messages are only read if C(MESSAGE_TEXT) and
+        C(MESSAGE_SECOND_LEVEL_TEXT) are listed.
+      - All the columns except C(MESSAGE_TOKEN_LENGTH) and C(MESSAGE_KEY) are returned if not specified.
+    type: list
+    elements: str
+    choices: ['ORDINAL_POSITION', 'MESSAGE_ID', 'MESSAGE_TYPE', 'MESSAGE_SUBTYPE', 'SEVERITY', 'MESSAGE_TIMESTAMP',
+              'FROM_LIBRARY', 'FROM_PROGRAM', 'FROM_MODULE', 'FROM_PROCEDURE', 'FROM_INSTRUCTION',
+              'TO_LIBRARY', 'TO_PROGRAM', 'TO_MODULE', 'TO_PROCEDURE', 'TO_INSTRUCTION',
+              'FROM_USER', 'MESSAGE_FILE', 'MESSAGE_LIBRARY', 'MESSAGE_TEXT', 'MESSAGE_SECOND_LEVEL_TEXT',
+              'MESSAGE_TOKEN_LENGTH', 'MESSAGE_KEY']
+  min_severity:
+    description:
+      - Only the messages with this severity or higher are returned.
+    type: int
+  message_ids:
+    description:
+      - Only the messages with these message ids are returned, e.g. C(CPF9898).
+    type: list
+    elements: str
+  message_types:
+    description:
+      - Only the messages of these types are returned.
+    type: list
+    elements: str
+    choices: ['COMMAND', 'COMPLETION', 'DIAGNOSTIC', 'ESCAPE', 'INFORMATIONAL', 'INQUIRY',
+              'NOTIFY', 'REPLY', 'REQUEST', 'SENDER']
+  start_time:
+    description:
+      - Only the messages sent at or after this time are returned, e.g. C(2020-05-20 21:41:40).
+    type: str
+  end_time:
+    description:
+      - Only the messages sent at or before this time are returned, e.g. C(2020-05-20 22:00:00).
+    type: str
+  since_ordinal:
+    description:
+      - Only the messages after this ordinal position are returned.
+      - Set it to the C(last_ordinal) of a previous query to read the messages added since that query.
+    type: int
+  limit:
+    description:
+      - The max number of messages returned, in the order of C(order). All the messages are returned if set to 0.
+    type: int
+    default: 0
+  order:
+    description:
+      - The order of the messages returned, by their ordinal position.
+    type: str
+    choices: ['oldest_first', 'newest_first']
+    default: 'oldest_first'
   become_user:
     description:
       - The name of the user profile that the IBM i task will run under.
@@ -55,6 +109,28 @@ EXAMPLES = r'''
     job_number: "025366"
     job_user: "QUSER"
     job_name: "QZDASOINIT"
+
+- name: Query the escape messages of severity 30 or higher, without the second level texts
+  ibm.power_ibmi.ibmi_query_job_log:
+    job_number: "025366"
+    job_user: "QUSER"
+    job_name: "QZDASOINIT"
+    min_severity: 30
+    message_types:
+      - "ESCAPE"
+    columns:
+      - "ORDINAL_POSITION"
+      - "MESSAGE_ID"
+      - "MESSAGE_TIMESTAMP"
+      - "MESSAGE_TEXT"
+
+- name: Query the messages added to the job log since the previous query, 100 at a time
+  ibm.power_ibmi.ibmi_query_job_log:
+    job_number: "025366"
+    job_user: "QUSER"
+    job_name: "QZDASOINIT"
+    since_ordinal: "{{ previous_query.last_ordinal }}"
+    limit: 100
 '''
 
 RETURN = r'''
@@ -85,14 +161,25 @@ job_log:
             "TO_PROCEDURE": "QSQSRVR",
             "TO_PROGRAM": "QSQSRVR"
         }]
+last_ordinal:
+    description: The highest ordinal position of the messages returned, C(since_ordinal) or 0 if no message is returned.
+    returned: when rc is 0
+    type: int
+    sample: 5
 sql:
-    description: the sql executed
+    description: the sql executed, the values of its parameter markers are in C(parameters)
     returned: always
     type: str
     sample: "SELECT ORDINAL_POSITION, MESSAGE_ID, MESSAGE_TYPE, MESSAGE_SUBTYPE, SEVERITY,
              MESSAGE_TIMESTAMP, FROM_LIBRARY, FROM_PROGRAM, FROM_MODULE, FROM_PROCEDURE, FROM_INSTRUCTION,
              TO_LIBRARY, TO_PROGRAM, TO_MODULE, TO_PROCEDURE, TO_INSTRUCTION, FROM_USER, MESSAGE_FILE,
-             MESSAGE_LIBRARY, MESSAGE_TEXT, MESSAGE_SECOND_LEVEL_TEXT FROM TABLE(QSYS2.JOBLOG_INFO('025366/QUSER/QZDASOINIT'))"
+             MESSAGE_LIBRARY, MESSAGE_TEXT, MESSAGE_SECOND_LEVEL_TEXT FROM TABLE(QSYS2.JOBLOG_INFO('025366/QUSER/QZDASOINIT')) A
+             WHERE SEVERITY >= ? ORDER BY ORDINAL_POSITION"
+parameters:
+    description: the values of the parameter markers of the sql executed
+    returned: always
+    type: list
+    sample: [30]
 start:
     description: The command execution start time
     returned: always
@@ -129,6 +216,7 @@ import datetime
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_module as imodule
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_job_log
 
 __ibmi_module_version__ = "2.0.1"
 
@@ -139,6 +227,16 @@ def main():
             job_number=dict(type='str', required=True),
             job_name=dict(type='str', required=True),
             job_user=dict(type='str', required=True),
+            columns=dict(type='list', elements='str',
+                         choices=ibmi_job_log.JOB_LOG_COLUMNS + ibmi_job_log.JOB_LOG_OTHER_COLUMNS),
+            min_severity=dict(type='int'),
+            message_ids=dict(type='list', elements='str'),
+            message_types=dict(type='list', elements='str', choices=ibmi_job_log.JOB_LOG_MESSAGE_TYPES),
+            start_time=dict(type='str'),
+            end_time=dict(type='str'),
+            since_ordinal=dict(type='int'),
+            limit=dict(type='int', default=0),
+            order=dict(type='str', choices=['oldest_first', 'newest_first'], default='oldest_first'),
             become_user=dict(type='str'),
             become_user_password=dict(type='str', no_log=True),
         ),
@@ -148,14 +246,26 @@ def main():
     job_number = module.params['job_number']
     job_name = module.params['job_name']
     job_user = module.params['job_user']
+    columns = module.params['columns']
+    since_ordinal = module.params['since_ordinal']
+    limit = module.params['limit']
     become_user = module.params['become_user']
     become_user_password = module.params['become_user_password']
 
-    sql = f"SELECT ORDINAL_POSITION, MESSAGE_ID, MESSAGE_TYPE, MESSAGE_SUBTYPE, SEVERITY, \
-        MESSAGE_TIMESTAMP, FROM_LIBRARY, FROM_PROGRAM, FROM_MODULE, FROM_PROCEDURE, FROM_INSTRUCTION, \
-        TO_LIBRARY, TO_PROGRAM, TO_MODULE, TO_PROCEDURE, TO_INSTRUCTION, FROM_USER, MESSAGE_FILE, \
-        MESSAGE_LIBRARY, MESSAGE_TEXT, MESSAGE_SECOND_LEVEL_TEXT \
-        FROM TABLE(QSYS2.JOBLOG_INFO('{job_number}/{job_user}/{job_name}')) A"
+    if limit < 0:
+        module.fail_json(rc=ibmi_util.IBMi_PARAM_NOT_VALID, msg="Value specified for limit must not be negative")
+
+    sql, parameters = ibmi_job_log.select_statement(
+        f'{job_number}/{job_user}/{job_name}',
+        columns=columns,
+        start_time=module.params['start_time'],
+        end_time=module.params['end_time'],
+        since_ordinal=since_ordinal,
+        min_severity=module.params['min_severity'],
+        message_ids=module.params['message_ids'],
+        message_types=module.params['message_types'],
+        limit=limit,
+        newest_first=module.params['order'] == 'newest_first')
 
     startd = datetime.datetime.now()
     try:
@@ -165,13 +275,28 @@ def main():
         message = f'Exception occurred: {inst}'
         module.fail_json(rc=999, msg=message)
     job_log = []
-    rc, out, err, job_log = ibmi_module.itoolkit_run_sql_once(sql)
+    out = []
+    err = None
+    ordinals = [] if since_ordinal is None else [since_ordinal]
+    try:
+        for message in ibmi_module.db_iter_result_list(sql, parameters=parameters):
+            # the ordinal position is always selected for last_ordinal
+            ordinals.append(int(message[ibmi_job_log.JOB_LOG_ORDINAL_COLUMN]))
+            if columns and ibmi_job_log.JOB_LOG_ORDINAL_COLUMN not in columns:
+                del message[ibmi_job_log.JOB_LOG_ORDINAL_COLUMN]
+            out.append(message)
+        rc = ibmi_util.IBMi_COMMAND_RC_SUCCESS
+    except Exception as inst:
+        rc = ibmi_util.IBMi_SQL_RC_ERROR
+        err = str(inst)
+    job_log = ibmi_module.get_task_job_log()
 
     endd = datetime.datetime.now()
     delta = endd - startd
     if rc:
         result_failed = dict(
             sql=sql,
+            parameters=parameters,
             job_log=job_log,
             stderr=err,
             stdout=out,
@@ -185,7 +310,9 @@ def main():
 
     result = dict(
         sql=sql,
+        parameters=parameters,
         job_log=out,
+        last_ordinal=max(ordinals) if ordinals else 0,
         stderr=err,
         rc=rc,
         start=str(startd),
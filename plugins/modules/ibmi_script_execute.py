@@ -218,28 +218,26 @@ def main():
 
             command = ''
             if type == 'CL':
+                commands = []
                 for line in f:
                     line_command = line.strip()
                     if line_command != '':
                         if not line_command.endswith(":"):
                             command = command + line_command + ' '
                         else:
-                            if line_command.endswith(":"):
-                                command = command + line_command[:-1]
-                            else:
-                                command = command + line_command
-                            rc, out, error = ibmi_module.itoolkit_run_command(command)
-                            if rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS:
-                                break
+                            commands.append(command + line_command[:-1])
                             command = ''
                     elif command != '':
-                        rc, out, error = ibmi_module.itoolkit_run_command(command)
-                        if rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS:
-                            break
+                        commands.append(command)
                         command = ''
                 if command != '':
-                    rc, out, error = ibmi_module.itoolkit_run_command(command)
+                    commands.append(command)
+                # Run the whole script in one XMLSERVICE call, it stops at the first failed command
+                rc, out, error = ibmi_util.IBMi_COMMAND_RC_SUCCESS, '', ''
+                for command, (rc, out, error) in zip(commands, ibmi_module.itoolkit_run_command_batch(commands, stop_on_error=True)):
                     ibmi_util.log_debug("run command: " + command, module._name)
+                    if rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS:
+                        break
             else:
                 command = f"QSYS/RUNSQLSTM SRCSTMF('{src}') ERRLVL({severity_level}) {parameters}"
                 rc, out, error = ibmi_module.itoolkit_run_command(command)
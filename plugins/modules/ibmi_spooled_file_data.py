@@ -20,6 +20,8 @@ short_description: Returns the content of a spooled file.
 version_added: '1.2.0'
 description:
   - The C(ibmi_spooled_file_data) returns the content of a spooled file.
+  - The spooled file is copied to a stream file which is decoded and filtered a chunk at a time, or read with
+    SYSTOOLS.SPOOLED_FILE_DATA if C(retrieval_method) is C(sql).
 options:
   job_name:
     description:
@@ -42,8 +44,32 @@ options:
     description:
       - If supplied, only return lines that match this shell-style (fnmatch) wildcard.
         If this parameter is omitted, all the spooled file content is returned.
+      - Lines containing the value are also returned.
     type: str
     default: '*'
+  max_lines:
+    description:
+      - The max number of lines returned, the first lines matching C(spooled_data_filter).
+        The rest of the spooled file is not read.
+      - All the lines are returned if set to 0.
+    type: int
+    default: 0
+  tail:
+    description:
+      - The number of lines returned from the end, the last lines matching C(spooled_data_filter).
+      - All the lines are returned if set to 0. It cannot be used with C(max_lines).
+    type: int
+    default: 0
+  retrieval_method:
+    description:
+      - How the spooled file is read.
+      - C(stream_file) copies the spooled file to a stream file with CPYSPLF and decodes it with the CCSID of the stream file.
+      - C(sql) reads the lines from SYSTOOLS.SPOOLED_FILE_DATA without a stream file. C(spooled_data_filter),
+        C(max_lines) and C(tail) are applied by the query, except a C(spooled_data_filter) with a C([...]) set of
+        characters, which is applied to the lines returned.
+    type: str
+    choices: ['stream_file', 'sql']
+    default: 'stream_file'
   become_user:
     description:
       - The name of the user profile that the IBM i task will run under.
@@ -66,6 +92,14 @@ EXAMPLES = r'''
   ibm.power_ibmi.ibmi_spooled_file_data:
     job_name: '024800/CHANGLE/QDFTJOBD'
     spooled_file_name: 'QPSECUSR'
+
+- name: print the last 20 lines of a job log containing CPF
+  ibm.power_ibmi.ibmi_spooled_file_data:
+    job_name: '024800/CHANGLE/QDFTJOBD'
+    spooled_file_name: 'QPJOBLOG'
+    spooled_data_filter: 'CPF'
+    tail: 20
+    retrieval_method: 'sql'
 '''
 
 RETURN = r'''
@@ -98,6 +132,11 @@ spooled_data:
         " QBRMS            *NO           *NO           *NO                                       ",
 
     ]
+truncated:
+    description: Whether more lines match than the lines returned because of C(max_lines) or C(tail).
+    returned: when rc as 0(success)
+    type: bool
+    sample: false
 job_log:
     description: The IBM i job log of the task executed.
     returned: when rc as non-zero(failure) and error happened for CL command CPYSPLF used in this module.
@@ -127,7 +166,11 @@ job_log:
         }]
 '''
 
+import codecs
+import collections
 import os
+import re
+import subprocess
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_module as imodule
@@ -135,6 +178,143 @@ import fnmatch
 
 __ibmi_module_version__ = "2.0.1"
 
+IBMi_SPOOLED_FILE_CHUNK_SIZE = 1024 * 1024
+IBMi_DEFAULT_CCSID = 37
+# the characters str.splitlines() splits lines at
+IBMi_LINE_BREAKS = '\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+# the python codecs of the CCSIDs not named cp<CCSID>
+IBMi_CCSID_ENCODINGS = {367: 'ascii', 819: 'latin-1', 1200: 'utf-16-be', 1208: 'utf-8', 13488: 'utf-16-be'}
+
+
+def python_encoding(ccsid):
+    '''Returns the python codec of ccsid, e.g. cp037, None if python has none'''
+    name = IBMi_CCSID_ENCODINGS.get(ccsid, 'cp%03d' % ccsid)
+    try:
+        codecs.lookup(name)
+    except LookupError:
+        return None
+    return name
+
+
+def iter_lines(stream, encoding, chunk_size=IBMi_SPOOLED_FILE_CHUNK_SIZE):
+    '''Decodes the binary stream a chunk at a time, yields the same lines as str.splitlines()'''
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        pending = pending + decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            break
+        lines = pending.splitlines()
+        # the last line may continue in the next chunk, a \r at the end may be followed by \n
+        if pending.endswith('\r'):
+            pending = lines.pop() + '\r'
+        elif pending[-1:] in IBMi_LINE_BREAKS:
+            pending = ''
+        else:
+            pending = lines.pop()
+        for line in lines:
+            yield line
+    for line in pending.splitlines():
+        yield line
+
+
+def line_filter(spooled_data_filter):
+    '''Returns a function telling whether a line matches the fnmatch pattern or contains it, None for all lines'''
+    if spooled_data_filter == '*':
+        return None
+    pattern = re.compile(fnmatch.translate(spooled_data_filter))
+    return lambda line: pattern.match(line) is not None or spooled_data_filter in line
+
+
+def like_pattern(spooled_data_filter):
+    '''Returns the LIKE patterns of the lines matching or containing the fnmatch pattern, None if it has a
+    set of characters LIKE cannot express'''
+    if '[' in spooled_data_filter:
+        return None
+    escaped = ''.join('\\' + ch if ch in '%_\\' else ch for ch in spooled_data_filter)
+    contains = '%' + escaped + '%'
+    return escaped.replace('*', '%').replace('?', '_'), contains
+
+
+def select_lines(lines, match, max_lines, tail):
+    '''Returns the lines matching, the first max_lines or the last tail of them, and whether any
+    matching line was left out'''
+    if match:
+        lines = (line for line in lines if match(line))
+    if tail:
+        selected = collections.deque(maxlen=tail)
+        count = 0
+        for line in lines:
+            selected.append(line)
+            count = count + 1
+        return list(selected), count > tail
+    selected = []
+    for line in lines:
+        if max_lines and len(selected) == max_lines:
+            return selected, True
+        selected.append(line)
+    return selected, False
+
+
+def stream_file_ccsid(module, path):
+    ccsid = IBMi_DEFAULT_CCSID
+    command = f'attr {path} CCSID'
+    rc, out, err = module.run_command(command, use_unsafe_shell=False)
+    ibmi_util.log_info(f"run command: {command}, rc={rc}, out={out}, err={err}", module._name)
+    if not rc and out.strip().isdigit():
+        ccsid = int(out.strip())
+    return ccsid
+
+
+def read_stream_file(module, path, match, max_lines, tail):
+    '''Returns the lines of the stream file selected by select_lines, decoded with a python codec of its
+    CCSID or by iconv for the CCSIDs python has no codec for, e.g. the DBCS EBCDIC CCSIDs'''
+    ccsid = stream_file_ccsid(module, path)
+    encoding = python_encoding(ccsid)
+    if encoding:
+        with open(path, 'rb') as stream:
+            return select_lines(iter_lines(stream, encoding), match, max_lines, tail)
+    command = ['iconv', '-f', 'IBM-' + str(ccsid).rjust(3, '0'), '-t', 'UTF-8', path]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        selected = select_lines(iter_lines(process.stdout, 'utf-8'), match, max_lines, tail)
+    finally:
+        process.stdout.close()
+        err = process.stderr.read()
+        rc = process.wait()
+    # iconv is killed by SIGPIPE when max_lines stops reading
+    if rc and not (max_lines and selected[1]):
+        raise Exception(f'Error occurred when run command:{" ".join(command)}, error:{err.decode("utf-8", "replace")}')
+    return selected
+
+
+def read_spooled_file_data(ibmi_module, job_name, spooled_file_name, spooled_file_number, spooled_data_filter, max_lines, tail):
+    '''Returns the lines of the spooled file selected by select_lines, read by SYSTOOLS.SPOOLED_FILE_DATA.
+    The filter, max_lines and tail are applied by the query if the filter can be a LIKE pattern'''
+    sql = "SELECT SPOOLED_DATA FROM TABLE(SYSTOOLS.SPOOLED_FILE_DATA(JOB_NAME => ?, SPOOLED_FILE_NAME => ?, " \
+          "SPOOLED_FILE_NUMBER => ?)) A"
+    parameters = [job_name, spooled_file_name, spooled_file_number]
+    patterns = like_pattern(spooled_data_filter) if spooled_data_filter != '*' else None
+    match = line_filter(spooled_data_filter) if patterns is None else None
+    if patterns:
+        sql = sql + " WHERE SPOOLED_DATA LIKE ? ESCAPE '\\' OR SPOOLED_DATA LIKE ? ESCAPE '\\'"
+        parameters.extend(patterns)
+    max_rows = None
+    if match is None and (max_lines or tail):
+        # one more row tells whether lines were left out
+        max_rows = (max_lines or tail) + 1
+    if tail and match is None:
+        sql = sql + " ORDER BY ORDINAL_POSITION DESC"
+    else:
+        sql = sql + " ORDER BY ORDINAL_POSITION"
+    lines = (row['SPOOLED_DATA'] for row in ibmi_module.db_iter_result_list(sql, max_rows=max_rows, parameters=parameters))
+    if tail and match is None:
+        selected = list(lines)
+        truncated = len(selected) > tail
+        return list(reversed(selected[:tail])), truncated
+    return select_lines(lines, match, max_lines, tail)
+
 
 def main():
     module = AnsibleModule(
@@ -143,9 +323,13 @@ def main():
             spooled_file_name=dict(type='str', required=True),
             spooled_file_number=dict(type='str', default='*LAST'),
             spooled_data_filter=dict(type='str', default='*'),
+            max_lines=dict(type='int', default=0),
+            tail=dict(type='int', default=0),
+            retrieval_method=dict(type='str', default='stream_file', choices=['stream_file', 'sql']),
             become_user=dict(type='str'),
             become_user_password=dict(type='str', no_log=True),
         ),
+        mutually_exclusive=[['max_lines', 'tail']],
         supports_check_mode=True,
     )
 
@@ -155,10 +339,14 @@ def main():
     spooled_file_name = module.params['spooled_file_name'].upper()
     spooled_file_number = module.params['spooled_file_number']
     spooled_data_filter = module.params['spooled_data_filter']
+    max_lines = module.params['max_lines']
+    tail = module.params['tail']
+    retrieval_method = module.params['retrieval_method']
     become_user = module.params['become_user']
     become_user_password = module.params['become_user_password']
 
-    spooled_data = []
+    if max_lines < 0 or tail < 0:
+        module.fail_json(rc=ibmi_util.IBMi_PARAM_NOT_VALID, msg='Value specified for max_lines and tail must not be negative')
 
     try:
         ibmi_module = imodule.IBMiModule(
@@ -167,6 +355,15 @@ def main():
         message = f'Exception occurred: {inst}'
         module.fail_json(rc=999, msg=message)
 
+    if retrieval_method == 'sql':
+        try:
+            spooled_data, truncated = read_spooled_file_data(ibmi_module, job_name, spooled_file_name, spooled_file_number,
+                                                             spooled_data_filter, max_lines, tail)
+        except Exception as inst:
+            message = f'Exception occurred:{str(inst)}'
+            module.fail_json(rc=ibmi_util.IBMi_SQL_RC_ERROR, msg=message)
+        module.exit_json(rc=0, spooled_data=spooled_data, truncated=truncated)
+
     ifs_spooled_file_path = f"/TMP/ANSIBLE_{spooled_file_name}_{job_name.replace('/', '_')}.TXT"
     if os.path.exists(ifs_spooled_file_path):
         os.remove(ifs_spooled_file_path)
@@ -182,41 +379,19 @@ def main():
         module.fail_json(msg=message, **result)
 
     try:
-        ccsid = 'IBM-037'  # default CCSID
-        # get file CCSID
-        command = f'attr {ifs_spooled_file_path} CCSID'
-        rc, out, err = module.run_command(command, use_unsafe_shell=False)
-        ibmi_util.log_info(
-            f"run command: {command}, rc={rc}, out={out}, err={err}", module._name)
-        if not rc:
-            # convert to format like IBM-037, IBM-1399, IBM-500 etc....
-            ccsid = 'IBM-' + out.strip().rjust(3, '0')
-        rc, out, err = module.run_command(command, use_unsafe_shell=False)
-
-        # convert file content to utf-8
-        command = f'iconv -f {ccsid} -t UTF-8 {ifs_spooled_file_path}'
-        rc, out, err = module.run_command(command, use_unsafe_shell=False)
-        ibmi_util.log_info(
-            f"run command: {command}, rc={rc}, out={out}, err={err}", module._name)
-        if not rc:
-            spooled_data = out.splitlines()
-            if spooled_data_filter != '*':
-                spooled_data_temp = []
-                for line in spooled_data:
-                    if (fnmatch.fnmatch(line, spooled_data_filter)) or (spooled_data_filter in line):
-                        spooled_data_temp.append(line)
-                spooled_data = spooled_data_temp
-        else:
-            message = f'Error occurred when run command:{command}, error:{str(err)}'
-            module.fail_json(rc=rc, msg=message)
-        os.remove(ifs_spooled_file_path)
+        # the stream file is decoded and filtered a chunk at a time
+        spooled_data, truncated = read_stream_file(module, ifs_spooled_file_path, line_filter(spooled_data_filter), max_lines, tail)
     except Exception as inst:
         message = f'Exception occurred:{str(inst)}'
         module.fail_json(rc=999, msg=message)
+    finally:
+        if os.path.exists(ifs_spooled_file_path):
+            os.remove(ifs_spooled_file_path)
 
     result = dict(
         rc=rc,
         spooled_data=spooled_data,
+        truncated=truncated,
     )
 
     module.exit_json(**result)
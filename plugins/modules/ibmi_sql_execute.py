@@ -178,7 +178,7 @@ def main():
         message = f'Exception occurred: {inst}'
         module.fail_json(rc=999, msg=message)
 
-    rc, out, err, job_log = ibmi_module.itoolkit_sql_callproc_once(sql)
+    rc, out, err, job_log = ibmi_module.itoolkit_sql_callproc_once(sql, defer_job_log=True)
     job_name_info = ibmi_module.get_current_job_name()
 
     endd = datetime.datetime.now()
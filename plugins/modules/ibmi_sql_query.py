@@ -49,6 +49,19 @@ options:
     type: list
     elements: str
     default: []
+  max_rows:
+    description:
+      - The max number of rows returned, the query stops fetching rows after them.
+      - All the rows are returned if set to 0.
+    type: int
+    default: 0
+  columns:
+    description:
+      - The names of the columns returned for each row, the other columns of the query are not decoded.
+      - All the columns are returned if not specified.
+    type: list
+    elements: str
+    default: []
   become_user:
     description:
       - The name of the user profile that the IBM i task will run under.
@@ -72,6 +85,14 @@ EXAMPLES = r'''
     sql: 'select * from Persons'
     become_user: 'USER1'
     become_user_password: 'yourpassword'
+
+- name: Query the first 100 rows of table Persons with two of its columns.
+  ibm.power_ibmi.ibmi_sql_query:
+    sql: 'select * from Persons'
+    max_rows: 100
+    columns:
+      - 'FIRSTNAME'
+      - 'LASTNAME'
 '''
 
 RETURN = r'''
@@ -191,6 +212,8 @@ def main():
             expected_row_count=dict(type='int', default=-1),
             joblog=dict(type='bool', default=False),
             hex_columns=dict(type='list', default=[], elements='str'),
+            max_rows=dict(type='int', default=0),
+            columns=dict(type='list', default=[], elements='str'),
             become_user=dict(type='str'),
             become_user_password=dict(type='str', no_log=True),
         ),
@@ -207,9 +230,14 @@ def main():
         check_row_count = True
     joblog = module.params['joblog']
     hex_columns = module.params['hex_columns']
+    max_rows = module.params['max_rows']
+    columns = module.params['columns']
     become_user = module.params['become_user']
     become_user_password = module.params['become_user_password']
 
+    if max_rows < 0:
+        module.fail_json(rc=ibmi_util.IBMi_PARAM_NOT_VALID, msg="Value specified for max_rows must not be negative")
+
     startd = datetime.datetime.now()
     try:
         ibmi_module = imodule.IBMiModule(
@@ -219,7 +247,8 @@ def main():
         module.fail_json(rc=999, msg=message)
 
     job_log = []
-    rc, out, err, job_log = ibmi_module.itoolkit_run_sql_once(sql, hex_columns)
+    rc, out, err, job_log = ibmi_module.itoolkit_run_sql_once(
+        sql, hex_columns, defer_job_log=True, max_rows=max_rows or None, columns=columns or None)
     job_name_info = ibmi_module.get_current_job_name()
 
     endd = datetime.datetime.now()
@@ -46,11 +46,26 @@ options:
     default: ["*NONE"]
   check_interval:
     description:
-      - The time interval between current and next checks of the expected status of the submitted job.
+      - The max time interval between current and next checks of the expected status of the submitted job.
+        The first check is one second after the job is submitted and the interval doubles after each check up to
+        C(check_interval), less a random part of up to 20 percent, so that jobs submitted together are not checked
+        at the same time.
         This option will be ignored if C(*NONE) is specified for option status.
     type: str
     default: "1m"
     required: false
+  wait_method:
+    description:
+      - How the module waits for the submitted job.
+      - C(poll) checks the status of the job at the intervals of C(check_interval).
+      - C(message) submits the job with a message queue created in QGPL for the task and blocks until the job
+        completion message is sent to it, the status of the job is checked once the job ends.
+        It only applies when all the expected statuses are C(*OUTQ) or C(*COMPLETE) and no C(MSGQ) is specified in
+        C(parameters), otherwise C(poll) is used.
+    type: str
+    choices: ["poll", "message"]
+    default: "poll"
+    required: false
   parameters:
     description:
       - The parameters that SBMJOB will take. Other than CMD, all other parameters need to be specified here.
@@ -85,6 +100,13 @@ EXAMPLES = r'''
     check_interval: '30s'
     time_out: '80s'
     status: ['*OUTQ', '*COMPLETE']
+
+- name: Submit a batch job and block until the job completion message arrives
+  ibm.power_ibmi.ibmi_submit_job:
+    cmd: 'CALL QGPL/PGM1'
+    time_out: '10m'
+    status: ['*OUTQ', '*COMPLETE']
+    wait_method: 'message'
 '''
 
 RETURN = r'''
@@ -137,6 +159,21 @@ stderr_lines:
         "CPF2111:Library TESTLIB already exists."
     ]
     returned: When rc as non-zero(failure)
+wait_summary:
+    description:
+      - How the module waited for the job, the number of status checks, of completion messages received, the seconds
+        waited, the latency, the longest seconds the job could have been in the expected status before it was seen,
+        and whether the time_out was reached.
+    type: dict
+    sample: {
+        "latency": 2.113,
+        "messages": 0,
+        "method": "poll",
+        "polls": 4,
+        "seconds": 6.874,
+        "timed_out": false
+    }
+    returned: When job has been submitted and task has waited for the job status for some time
 '''
 
 HAS_ITOOLKIT = True
@@ -144,10 +181,10 @@ HAS_IBM_DB = True
 
 import datetime
 import re
-import time
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_module as imodule
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_job_wait
 
 __ibmi_module_version__ = "2.0.1"
 
@@ -188,11 +225,6 @@ def convert_wait_time_to_seconds(input_wait_time):
     return wait_time
 
 
-def wait_for_certain_time(input_wait_time):
-    wait_time = convert_wait_time_to_seconds(input_wait_time)
-    time.sleep(wait_time)
-
-
 def main():
     module = AnsibleModule(
         argument_spec=dict(
@@ -200,6 +232,7 @@ def main():
             time_out=dict(type='str', default='1m'),
             status=dict(type='list', default=["*NONE"], elements='str'),
             check_interval=dict(type='str', default='1m'),
+            wait_method=dict(type='str', default='poll', choices=['poll', 'message']),
             parameters=dict(type='str', default=''),
             become_user=dict(type='str'),
             become_user_password=dict(type='str', no_log=True),
@@ -213,6 +246,7 @@ def main():
     time_out = module.params['time_out']
     check_interval = module.params['check_interval']
     wait_for_job_status = module.params['status']
+    wait_method = module.params['wait_method']
     parameters = module.params['parameters']
     become_user = module.params['become_user']
     become_user_password = module.params['become_user_password']
@@ -239,35 +273,47 @@ def main():
         module.fail_json(msg='Value specified for status option is not valid. Valid values are '
                              '*NONE, *ACTIVE, *COMPLETE, *JOBQ, *OUTQ', **result_failed_parameter_check)
 
+    completion_queue = None
+    if wait_method == 'message' and set(wait_for_job_status) <= set(ibmi_job_wait.JOB_END_STATUSES) and \
+            not re.search(r'\bMSGQ\s*\(', parameters, re.IGNORECASE):
+        completion_queue = ibmi_job_wait.CompletionQueue(ibmi_module)
+        if completion_queue.create():
+            cl_sbmjob = cl_sbmjob.rstrip() + " " + completion_queue.parameter()
+        else:
+            completion_queue = None
+
+    try:
+        run_sbmjob(module, ibmi_module, cl_sbmjob, wait_for_job_status, time_out, check_interval, completion_queue)
+    finally:
+        if completion_queue:
+            completion_queue.delete()
+
+
+def run_sbmjob(module, ibmi_module, cl_sbmjob, wait_for_job_status, time_out, check_interval, completion_queue):
     startd = datetime.datetime.now()
 
     # args = ['system', cl_sbmjob]
     # rc, out, err = module.run_command(args, use_unsafe_shell=False)
     rc, out, err = ibmi_module.itoolkit_run_command(cl_sbmjob)
 
-    current_job_log = ibmi_module.itoolkit_get_job_log(startd)
-    message_description = ''
-    for i in current_job_log:
-        if i["MESSAGE_ID"] == "CPC1221":
-            message_description = i["MESSAGE_TEXT"]
-            break
+    job_submitted = ''
+    if rc == IBMi_COMMAND_RC_SUCCESS:
+        job_submitted = ibmi_job_wait.submitted_job(ibmi_module, startd)
 
-    if rc != IBMi_COMMAND_RC_SUCCESS:
+    if rc != IBMi_COMMAND_RC_SUCCESS or not job_submitted:
+        current_job_log = ibmi_module.itoolkit_get_job_log(startd)
         result_failed = dict(
             # size=input_size,
             # age=input_age,
             # age_stamp=input_age_stamp,
             stderr=err,
-            rc=rc,
+            rc=rc if rc != IBMi_COMMAND_RC_SUCCESS else IBMi_COMMAND_RC_ERROR,
             sbmjob_cmd=cl_sbmjob,
             out=current_job_log,
             # changed=True,
         )
         module.fail_json(msg='Submit job failed. ', **result_failed)
     elif '*NONE' in wait_for_job_status:
-        submitted_job = re.search(r'\d{6}/[A-Za-z0-9#_]{1,10}/[A-Za-z0-9#_]{1,10}', message_description)
-        job_submitted = submitted_job.group()
-
         result_success = dict(
             rc=rc,
             job_submitted=job_submitted,
@@ -276,34 +322,20 @@ def main():
         )
         module.exit_json(**result_success)
 
-    submitted_job = re.search(r'\d{6}/[A-Za-z0-9#_]{1,10}/[A-Za-z0-9#_]{1,10}', message_description)
-    job_submitted = submitted_job.group()
     ibmi_util.log_debug("job_submitted: " + job_submitted, module._name)
-    sql_get_job_info = "SELECT V_JOB_STATUS as \"job_status\", " \
-                       "V_ACTIVE_JOB_STATUS as \"active_job_status\", " \
-                       "V_RUN_PRIORITY as \"run_priority\", " \
-                       "V_SBS_NAME as \"sbs_name\", " \
-                       "V_CLIENT_IP_ADDRESS as \"ip_address\"" \
-                       " FROM TABLE(QSYS2.GET_JOB_INFO('" + job_submitted + "')) A"
-    rc, out, err_msg = ibmi_module.itoolkit_run_sql(sql_get_job_info)
-
+    columns = "V_JOB_STATUS as \"job_status\", " \
+              "V_ACTIVE_JOB_STATUS as \"active_job_status\", " \
+              "V_RUN_PRIORITY as \"run_priority\", " \
+              "V_SBS_NAME as \"sbs_name\", " \
+              "V_CLIENT_IP_ADDRESS as \"ip_address\""
     time_out_in_seconds = convert_wait_time_to_seconds(time_out)
-    returned_job_status = ''
-    if isinstance(out, list) and len(out) == 1:
-        returned_job_status = out[0]['job_status'].strip()
-    ibmi_util.log_debug("job_status: " + returned_job_status, module._name)
-
-    while returned_job_status not in wait_for_job_status:
-        rc, out, err_msg = ibmi_module.itoolkit_run_sql(sql_get_job_info)
-        returned_job_status = ''
-        if isinstance(out, list) and len(out) == 1:
-            returned_job_status = out[0]['job_status'].strip()
-        ibmi_util.log_debug("job_status: " + returned_job_status, module._name)
-        wait_for_certain_time(check_interval)
-        current_time = datetime.datetime.now()
-        running_time = (current_time - startd).seconds
-        if running_time > time_out_in_seconds:
-            break
+    time_out_in_seconds = max(time_out_in_seconds - (datetime.datetime.now() - startd).total_seconds(), 0)
+    waiter = ibmi_job_wait.JobWaiter(ibmi_module, time_out_in_seconds,
+                                     convert_wait_time_to_seconds(check_interval), columns)
+    rc, rows, err_msg = waiter.wait([job_submitted], wait_for_job_status, completion_queue)
+    out = [rows[job_submitted]] if job_submitted in rows else []
+    returned_job_status = waiter.status(rows.get(job_submitted))
+    wait_summary = dict(waiter.summary(), method='message' if completion_queue else 'poll')
 
     ibmi_util.log_debug("job_status: " + returned_job_status, module._name)
     if returned_job_status not in wait_for_job_status:
@@ -326,6 +358,7 @@ def main():
             delta=str(delta),
             job_submitted=job_submitted,
             sbmjob_cmd=cl_sbmjob,
+            wait_summary=wait_summary,
             # changed=True,
         )
         module.fail_json(msg='non-zero return code: ' + rc_msg, **result_failed)
@@ -338,6 +371,7 @@ def main():
             delta=str(delta),
             job_submitted=job_submitted,
             sbmjob_cmd=cl_sbmjob,
+            wait_summary=wait_summary,
             # changed=True,
         )
         module.exit_json(**result_success)
@@ -60,6 +60,28 @@ options:
       - The path can be absolute or relative.
     type: path
     default: '~/.ssh/id_rsa'
+  max_channels:
+    description:
+      - The number of SFTP channels opened on the SSH connection to transfer the files at the same time.
+      - The largest files are transferred first.
+    type: int
+    default: 4
+  only_changed:
+    description:
+      - Specified if skip the files whose copy on the remote host is the same as the src.
+      - A file under /QSYS.LIB on the remote host is the same when its size and the sha256 checksum recorded when
+        it was synchronized by this module are the same as the src.
+      - Other files are the same when their size and sha256 checksum, computed on the remote host, are the same as the src.
+      - The checksums of the src files are cached in C(checksum_database) while their size and modification time are unchanged.
+    type: bool
+    default: False
+  checksum_database:
+    description:
+      - The sqlite3 database on the current host which caches the checksums of the src files and records the checksums of the
+        synchronized files.
+      - Only used when C(only_changed) is C(true).
+    type: str
+    default: '/etc/ibmi_ansible/sync_files/checksum_cache.sqlite3'
 
 notes:
     - Need install paramiko package on target IBM i.
@@ -87,6 +109,26 @@ EXAMPLES = r'''
     remote_host: 'host.com'
     remote_user: 'user'
     private_key: '/home/test/id_rsa'
+
+- name: Synchronize a list of save files to host.com on 8 SFTP channels.
+  ibm.power_ibmi.ibmi_sync_files:
+    src_list:
+      - {'src': '/qsys.lib/ptflib.lib/qsi84219.file'}
+      - {'src': '/qsys.lib/ptflib.lib/qsi84220.file'}
+    dest: '/qsys.lib/ptflib.lib/'
+    remote_host: 'host.com'
+    remote_user: 'user'
+    max_channels: 8
+
+- name: Synchronize the save files again, only the changed ones are transferred.
+  ibm.power_ibmi.ibmi_sync_files:
+    src_list:
+      - {'src': '/qsys.lib/ptflib.lib/qsi84219.file'}
+      - {'src': '/qsys.lib/ptflib.lib/qsi84220.file'}
+    dest: '/qsys.lib/ptflib.lib/'
+    remote_host: 'host.com'
+    remote_user: 'user'
+    only_changed: true
 '''
 
 RETURN = r'''
@@ -116,22 +158,58 @@ msg:
     type: str
     sample: 'No files were successfully transferred.'
 success_list:
-    description: The success transferred list.
+    description: The success transferred list, with the bytes, seconds and bytes_per_second of each transfer.
     returned: always
     type: list
     sample: [
         {
+            "bytes": 1245184,
+            "bytes_per_second": 10465406,
             "dest": "/qsys.lib/fish.lib/",
+            "seconds": 0.119,
             "src": "/tmp/c1.file"
         },
         {
+            "bytes": 540672,
+            "bytes_per_second": 6436571,
             "dest": "/qsys.lib/fish.lib/",
+            "seconds": 0.084,
             "src": "/tmp/c2.SAVF"
         },
         {
+            "bytes": 27,
+            "bytes_per_second": 1350,
+            "seconds": 0.02,
             "src": "/tmp/c3.log"
         }
     ]
+skipped_list:
+    description: The list of files not transferred because the remote host has the same copy, when only_changed is true.
+    returned: always
+    type: list
+    sample: [
+        {
+            "dest": "/qsys.lib/fish.lib/",
+            "src": "/tmp/c2.SAVF"
+        }
+    ]
+transfer_summary:
+    description:
+      - The number of files and bytes transferred, the seconds the transfers took and the bytes per second of all the SFTP channels.
+      - The number of save files and bytes copied to a staging file because the save file could not be read directly
+        from /QSYS.LIB, and the peak bytes of the staging files at the same time.
+    returned: when files were transferred
+    type: dict
+    sample: {
+        "bytes": 1785883,
+        "bytes_per_second": 14882358,
+        "channels": 3,
+        "files": 3,
+        "peak_staged_bytes": 0,
+        "seconds": 0.12,
+        "staged_bytes": 0,
+        "staged_files": 0
+    }
 fail_list:
     description: The fail transferred list.
     returned: always
@@ -161,11 +239,14 @@ stderr_lines:
 '''
 
 import os
+import time
 import datetime
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils._text import to_bytes, to_text
 from tempfile import mkdtemp
 from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_util
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_sftp
+from ansible_collections.ibm.power_ibmi.plugins.module_utils.ibmi import ibmi_fix_repo_db
 __ibmi_module_version__ = "2.0.1"
 HAS_PARAMIKO = True
 
@@ -181,6 +262,59 @@ def return_error(module, error, result):
     module.fail_json(**result)
 
 
+SYNC_SENT_TABLE = 'sync_files_sent'
+CHECKSUM_ALGORITHM = 'sha256'
+
+
+def build_migrations():
+    return [
+        ibmi_fix_repo_db.CHECKSUM_CACHE_SCHEMA + [
+            f'CREATE TABLE IF NOT EXISTS {SYNC_SENT_TABLE} (remote_host TEXT NOT NULL, dest TEXT NOT NULL, '
+            'size INTEGER, checksum TEXT, add_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (remote_host, dest))',
+        ],
+    ]
+
+
+def find_unchanged(conn, sftp, transport, remote_host, entries):
+    '''Returns the indexes of the entries whose dest has the size and checksum of the src, and the
+    checksums of the src files'''
+    checksums, stats = ibmi_fix_repo_db.get_checksums(conn, [src for i, src, dest in entries], CHECKSUM_ALGORITHM)
+    sent = {}
+    for dest, size, checksum in conn.execute(
+            f'SELECT dest, size, checksum FROM {SYNC_SENT_TABLE} WHERE remote_host = ?', (remote_host,)):
+        sent[dest] = (size, checksum)
+    unchanged = set()
+    to_hash = []
+    for i, src, dest in entries:
+        if checksums.get(src) is None:
+            continue
+        try:
+            remote_size = sftp.stat(dest).st_size
+        except Exception:
+            continue
+        if remote_size != os.path.getsize(src):
+            continue
+        if dest[0:9].upper() == '/QSYS.LIB':
+            # the objects under /QSYS.LIB are compared with the checksum of the last transfer
+            if sent.get(dest) == (remote_size, checksums[src]):
+                unchanged.add(i)
+        else:
+            to_hash.append((i, src, dest))
+    remote_checksums = ibmi_sftp.remote_checksums(transport, [dest for i, src, dest in to_hash])
+    for (i, src, dest), remote_checksum in zip(to_hash, remote_checksums):
+        if remote_checksum == checksums[src]:
+            unchanged.add(i)
+    return unchanged, checksums
+
+
+def record_sent(conn, remote_host, sent):
+    '''sent is a list of (dest, size, checksum) of the transferred files'''
+    with conn:
+        conn.executemany(
+            f'INSERT OR REPLACE INTO {SYNC_SENT_TABLE} (remote_host, dest, size, checksum) VALUES(?, ?, ?, ?)',
+            [(remote_host, dest, size, checksum) for dest, size, checksum in sent])
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
@@ -188,7 +322,10 @@ def main():
             dest=dict(type='str', default=''),
             remote_user=dict(type='str', required=True),
             remote_host=dict(type='str', required=True),
-            private_key=dict(type='path', default='~/.ssh/id_rsa')
+            private_key=dict(type='path', default='~/.ssh/id_rsa'),
+            max_channels=dict(type='int', default=ibmi_sftp.IBMi_SFTP_MAX_CHANNELS),
+            only_changed=dict(type='bool', default=False),
+            checksum_database=dict(type='str', default='/etc/ibmi_ansible/sync_files/checksum_cache.sqlite3'),
         ),
         supports_check_mode=True,
     )
@@ -200,6 +337,7 @@ def main():
         delta='',
         success_list=[],
         fail_list=[],
+        skipped_list=[],
         msg=''
     )
 
@@ -212,9 +350,15 @@ def main():
         remote_user = module.params['remote_user']
         remote_host = module.params['remote_host']
         private_key = module.params['private_key']
+        max_channels = module.params['max_channels']
+        only_changed = module.params['only_changed']
+        checksum_database = module.params['checksum_database']
         success_list = []
+        skipped_list = []
         fail_list = []
         startd = datetime.datetime.now()
+        if max_channels < 1:
+            return_error(module, f"max_channels {max_channels} must be greater than 0.", result)
 
         ifs_dir = mkdtemp("", "ansible_for_i_temp", None)
         ibmi_util.log_debug("mkdtemp " + ifs_dir, module._name)
@@ -223,13 +367,9 @@ def main():
 
         try:
             private_key = to_bytes(private_key, errors='surrogate_or_strict')
-            p_key = paramiko.RSAKey.from_private_key_file(private_key)
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(hostname=remote_host, port=22, username=remote_user, pkey=p_key)
-            transport = paramiko.Transport((remote_host, 22))
-            transport.connect(username=remote_user, pkey=p_key)
+            transport = ibmi_sftp.connect(remote_host, remote_user, private_key)
             sftp = paramiko.SFTPClient.from_transport(transport)
+            remote_home = ibmi_sftp.RemoteHome(transport)
         except Exception as e:
             for i in range(len(src_list)):
                 src_list[i]['fail_reason'] = f"{to_text(e)}. "
@@ -237,12 +377,10 @@ def main():
             return_error(module, f"Exception. {to_text(e)}. Use -vvv for more information.", result)
 
         if dest:
-            if dest.startswith('~'):
-                stdin1, stdout1, stderr1 = ssh.exec_command("echo $HOME")
-                dest_home_path = stdout1.read().decode('utf-8')
-                if dest_home_path is None:
-                    return_error(module, "Get the dest 'HOME' path failed. ", result)
-                dest = os.path.join(dest_home_path.strip(), os.path.relpath(dest, '~/'))
+            try:
+                dest = remote_home.expand(dest)
+            except OSError as e:
+                return_error(module, to_text(e), result)
             try:
                 sftp.stat(dest)
             except Exception as e:
@@ -250,6 +388,11 @@ def main():
                     return_error(module, f"dest: {dest} is not a directory.", result)
                 return_error(module, f"Exception. {to_text(e)}. Use -vvv for more information.", result)
 
+        entries = []
+        transfers = []
+        transfer_idx = []
+        remote_dirs = set()
+        failed = {}
         for i in range(len(src_list)):
             final_dest = dest
             src_basename = os.path.basename(src_list[i]['src'])
@@ -267,49 +410,97 @@ def main():
             else:
                 final_dest = (final_dest + '/' + src_basename).replace("//", "/")
 
-            if final_dest.startswith('~'):
-                stdin1, stdout1, stderr1 = ssh.exec_command("echo $HOME")
-                dest_home_path = stdout1.read().decode('utf-8')
-                if dest_home_path is None:
-                    return_error(module, "Get the dest 'HOME' path failed. ", result)
-                final_dest = os.path.join(dest_home_path.strip(), os.path.relpath(final_dest, '~/'))
-
-            if src_list[i]['src'][0:9].upper() == '/QSYS.LIB' and os.path.splitext(src_basename)[-1].upper() != '.MBR':
-                ibmi_util.log_debug("cp " + src_list[i]['src'] + " " + ifs_dir, module._name)
-                rc, out, err = module.run_command(['cp', src_list[i]['src'], ifs_dir], use_unsafe_shell=False)
-                if rc == 0:
-                    final_src = ifs_dir + "/" + src_basename
-                else:
-                    src_list[i]['fail_reason'] = f"Copy file to current host tmp dir failed. cp {src_list[i]['src']} {ifs_dir}. {err}"
-                    fail_list.append(src_list[i])
-                    continue
-            elif src_list[i]['src'].startswith('~'):
+            try:
+                final_dest = remote_home.expand(final_dest)
+            except OSError as e:
+                return_error(module, to_text(e), result)
+
+            if src_list[i]['src'].startswith('~'):
                 src_home_path = os.getenv('HOME', None)
                 if src_home_path is None:
                     return_error(module, "getenv 'HOME' failed. ", result)
-                final_src = os.path.join(src_home_path, os.path.relpath(src_list[i]['src'], '~/'))
+                entries.append((i, os.path.join(src_home_path, os.path.relpath(src_list[i]['src'], '~/')), final_dest))
             else:
-                final_src = src_list[i]['src']
+                # a save file is read straight from /QSYS.LIB, it is copied to ifs_dir only if that fails
+                entries.append((i, src_list[i]['src'], final_dest))
 
+        def stage(src):
+            if src[0:9].upper() != '/QSYS.LIB' or os.path.splitext(src)[-1].upper() == '.MBR':
+                return None
+            # a directory per copy, the channels may stage files with the same name at the same time
+            copy_dir = mkdtemp("", "stage", ifs_dir)
+            ibmi_util.log_debug("cp " + src + " " + copy_dir, module._name)
+            rc, out, err = module.run_command(['cp', src, copy_dir], use_unsafe_shell=False)
+            if rc != 0:
+                raise OSError(f"Copy file to current host tmp dir failed. cp {src} {copy_dir}. {err}")
+            return os.path.join(copy_dir, os.path.basename(src))
+
+        unchanged = set()
+        checksums = {}
+        if only_changed and entries:
             try:
-                ibmi_util.log_debug("sftp: put " + final_src + " " + final_dest, module._name)
-                if final_dest[0:9].upper() != '/QSYS.LIB':
-                    try:
-                        sftp.mkdir(os.path.dirname(final_dest))
-                    except Exception as e:
-                        ibmi_util.log_debug(f"sftp: mkdir failed. Dir may be exist. Error: {to_text(e)}")
-                sftp.put(final_src, final_dest)
-                success_list.append(src_list[i])
+                conn = ibmi_fix_repo_db.connect(checksum_database, build_migrations(), 'ibmi_sync_files')
             except Exception as e:
-                if 'size mismatch' in to_text(e):
-                    src_list[i]['fail_reason'] = f"Can't sync file to /QSYS.LIB. Put {final_src} to remote host fail. Error message: {to_text(e)}"
+                return_error(module, f"Open checksum_database {checksum_database} failed. {to_text(e)}", result)
+            unchanged, checksums = find_unchanged(conn, sftp, transport, remote_host, entries)
+
+        for i, final_src, final_dest in entries:
+            if i in unchanged:
+                ibmi_util.log_debug(f"skip {final_src}, {final_dest} is the same", module._name)
+                skipped_list.append(src_list[i])
+                continue
+            if final_dest[0:9].upper() != '/QSYS.LIB':
+                remote_dirs.add(os.path.dirname(final_dest))
+            transfers.append((final_src, final_dest))
+            transfer_idx.append(i)
+
+        for remote_dir in sorted(remote_dirs):
+            try:
+                sftp.mkdir(remote_dir)
+            except Exception as e:
+                ibmi_util.log_debug(f"sftp: mkdir failed. Dir may be exist. Error: {to_text(e)}")
+
+        entries_by_idx = dict((entry[0], entry) for entry in entries)
+        if transfers:
+            for final_src, final_dest in transfers:
+                ibmi_util.log_debug("sftp: put " + final_src + " " + final_dest, module._name)
+            transfer_start = time.time()
+            transfer_results, staging = ibmi_sftp.put_files(transport, transfers, max_channels, stage=stage)
+            transfer_seconds = time.time() - transfer_start
+            sent = []
+            for i, (final_src, final_dest), transfer in zip(transfer_idx, transfers, transfer_results):
+                error = transfer.get('error')
+                if error is None:
+                    src_list[i].update(transfer)
+                    success_list.append(src_list[i])
+                    if only_changed and checksums.get(entries_by_idx[i][1]):
+                        sent.append((final_dest, transfer['bytes'], checksums[entries_by_idx[i][1]]))
+                elif 'size mismatch' in to_text(error):
+                    src_list[i]['fail_reason'] = f"Can't sync file to /QSYS.LIB. Put {final_src} to remote host fail. Error message: {to_text(error)}"
+                    failed[i] = src_list[i]
                 else:
-                    src_list[i]['fail_reason'] = f"{to_text(e)}. Put {final_src} to remote host exception."
-                fail_list.append(src_list[i])
+                    src_list[i]['fail_reason'] = f"{to_text(error)}. Put {final_src} to remote host exception."
+                    failed[i] = src_list[i]
+            if sent:
+                record_sent(conn, remote_host, sent)
+            if success_list:
+                total_bytes = sum(item['bytes'] for item in success_list)
+                result['transfer_summary'] = dict(
+                    files=len(success_list),
+                    bytes=total_bytes,
+                    seconds=round(transfer_seconds, 3),
+                    bytes_per_second=int(total_bytes / transfer_seconds) if transfer_seconds > 0 else total_bytes,
+                    channels=min(max_channels, len(transfers)),
+                    staged_files=staging['files'],
+                    staged_bytes=staging['bytes'],
+                    peak_staged_bytes=staging['peak_bytes'],
+                )
+        fail_list = [failed[i] for i in sorted(failed)]
 
         endd = datetime.datetime.now()
         delta = endd - startd
-        if success_list:
+        result['skipped_list'] = skipped_list
+        if success_list or skipped_list:
             result['msg'] = f"Complete synchronize file list to remote host {remote_host}"
             result.update({'stderr': '', 'rc': 0, 'delta': str(delta), 'success_list': success_list, 'fail_list': fail_list})
             module.exit_json(**result)
@@ -321,10 +512,12 @@ def main():
     except Exception as e:
         return_error(module, f"Exception. {to_text(e)}. Use -vvv for more information.", result)
     finally:
-        if 'ssh' in vars():
-            ssh.close()
+        if 'conn' in vars():
+            conn.close()
         if 'sftp' in vars():
             sftp.close()
+        if 'transport' in vars():
+            transport.close()
         rc, out, err = module.run_command(['rm', '-rf', ifs_dir], use_unsafe_shell=False)
 
 
@@ -56,6 +56,28 @@ options:
       - The path can be absolute or relative.
     type: str
     default: '~/.ssh/id_rsa'
+  max_channels:
+    description:
+      - The number of SFTP channels opened on the SSH connection to transfer the files at the same time.
+      - The largest files are transferred first.
+    type: int
+    default: 4
+  only_changed:
+    description:
+      - Specified if skip the files whose copy on IBM i node B is the same as the src.
+      - A file under /QSYS.LIB on IBM i node B is the same when its size and the sha256 checksum recorded when
+        it was synchronized are the same as the src.
+      - Other files are the same when their size and sha256 checksum, computed on IBM i node B, are the same as the src.
+      - The checksums of the src files are cached in C(checksum_database) while their size and modification time are unchanged.
+    type: bool
+    default: False
+  checksum_database:
+    description:
+      - The sqlite3 database on IBM i node A which caches the checksums of the src files and records the checksums of the
+        synchronized files.
+      - Only used when C(only_changed) is C(true).
+    type: str
+    default: '/etc/ibmi_ansible/sync_files/checksum_cache.sqlite3'
 
 notes:
     - ansible.cfg needs to specify interpreter_python=/QOpenSys/pkgs/bin/python3 under [defaults] section.
@@ -83,6 +105,14 @@ EXAMPLES = r'''
       - {'src': '/qsys.lib/c4.file/test.mbr', 'dest': '/qsys.lib/test.lib/c5.file'}
       - {'src': '~/c6.txt', 'dest': '~/testfolder'}
     private_key: '/home/test/id_rsa'
+
+- name: Synchronize the PTF save files, skip the ones IBM i node B already has.
+  ibm.power_ibmi.ibmi_synchronize_files:
+    src_list:
+      - {'src': '/qsys.lib/ptflib.lib/qsi84219.file'}
+      - {'src': '/qsys.lib/ptflib.lib/qsi84220.file'}
+    dest: '/qsys.lib/ptflib.lib/'
+    only_changed: true
 '''
 
 RETURN = r'''
@@ -107,7 +137,7 @@ rc:
     type: int
     sample: 255
 success_list:
-    description: The success transferred list.
+    description: The success transferred list, with the bytes, seconds and bytes_per_second of each transfer.
     returned: always
     type: list
     sample: [
@@ -123,6 +153,33 @@ success_list:
             "src": "/tmp/c3.log"
         }
     ]
+skipped_list:
+    description: The list of files not transferred because IBM i node B has the same copy, when only_changed is true.
+    returned: always
+    type: list
+    sample: [
+        {
+            "dest": "/qsys.lib/fish.lib/",
+            "src": "/tmp/c2.SAVF"
+        }
+    ]
+transfer_summary:
+    description:
+      - The number of files and bytes transferred, the seconds the transfers took and the bytes per second of all the SFTP channels.
+      - The number of save files and bytes copied to a staging file because the save file could not be read directly
+        from /QSYS.LIB, and the peak bytes of the staging files at the same time.
+    returned: when files were transferred
+    type: dict
+    sample: {
+        "bytes": 1785883,
+        "bytes_per_second": 14882358,
+        "channels": 3,
+        "files": 3,
+        "peak_staged_bytes": 0,
+        "seconds": 0.12,
+        "staged_bytes": 0,
+        "staged_files": 0
+    }
 fail_list:
     description: The fail transferred list.
     returned: always
@@ -22,6 +22,7 @@ description:
   - The C(ibmi_sysval) module displays the information of the specified system value.
   - Type of requisite values meaning refer to https://www.ibm.com/support/knowledgecenter/en/ssw_ibm_i_74/apis/qwcrsval.htm
   - If the returned system valus is a list, set C(check) to C(equal_as_list) to compare it with the C(expect) value.
+  - All the system values are retrieved by one QWCRSVAL call, or one call per system value if that fails.
 options:
   sysvalue:
     description:
@@ -133,6 +134,11 @@ sysval:
                 "type": "10i0",
                 "value": "65535"
             }]
+calls:
+    description: The number of QWCRSVAL calls made, 1 if all the system values are retrieved by one call.
+    returned: always
+    type: int
+    sample: 1
 fail_list:
     description: the failed parameters
     returned: when there are failed parameters
@@ -305,24 +311,62 @@ def get_range_value(expect):
     return inc_min, range_min, range_max, inc_max
 
 
-def get_system_value(imodule, sysvaluename, expect=None, check='equal'):
+# The type of each system value, a name listed more than once takes its last type
+sysval_types = dict((key, value['type']) for value in sysval_array for key in value['key'])
+
+
+def type_length(sysval_type):
+    '''Returns the bytes of the data of a system value type, e.g. 4 for 10i0 and 20 for 20A'''
+    if sysval_type == '10i0':
+        return 4
+    return int(sysval_type[:-1])
+
+
+def new_system_value(sysvaluename, expect=None, check='equal'):
     sysvalue = {}
     sysvalue['rc'] = 0
     sysvalue['name'] = sysvaluename.strip().upper()
-    for value in sysval_array:
-        for key in value['key']:
-            if (sysvalue['name'] == key):
-                sysvalue['type'] = value['type']
-                if expect is not None:
-                    sysvalue['expect'] = expect
-                    if not check:
-                        check = 'equal'
-                    sysvalue['check'] = check
-                break
+    if sysvalue['name'] in sysval_types:
+        sysvalue['type'] = sysval_types[sysvalue['name']]
+        if expect is not None:
+            sysvalue['expect'] = expect
+            sysvalue['check'] = check if check else 'equal'
 
     if sysvalue.get('type') is None:
         sysvalue['msg'] = 'Unknown System Value Name'
         sysvalue['rc'] = -1
+    return sysvalue
+
+
+def set_system_value(sysvalue, msg, value=None):
+    '''Sets the value of the QWCRSVAL call and checks it against the expected value'''
+    sysvalue['msg'] = msg
+    if value is not None:
+        sysvalue['value'] = value
+        if 'expect' in sysvalue:
+            sysvalue['compliant'] = chk_system_value(
+                sysvalue['value'], sysvalue['expect'], sysvalue['check'])
+            if sysvalue['compliant'] is False:
+                sysvalue['msg'] = 'Compliant check failed'
+                sysvalue['rc'] = -2
+                return sysvalue
+        ibmi_util.log_debug(str(sysvalue), 'set_system_value')
+    return sysvalue
+
+
+def error_code_parm():
+    return (
+        iDS('ERRC0100_t', {'len': 'errlen'})
+        .addData(iData('bytesProvided', '10i0', '', {'setlen': 'errlen'}))
+        .addData(iData('bytesAvailable', '10i0', ''))
+        .addData(iData('messageID', '7A', ''))
+        .addData(iData('reserved', '1A', ''))
+    )
+
+
+def get_system_value(imodule, sysvaluename, expect=None, check='equal'):
+    sysvalue = new_system_value(sysvaluename, expect, check)
+    if sysvalue['rc'] < 0:
         return sysvalue
 
     conn = imodule.get_connection()
@@ -348,13 +392,7 @@ def get_system_value(imodule, sysvaluename, expect=None, check='equal'):
         .addParm(iData('rcvlen', '10i0', '', {'setlen': 'qwcrslen'}))
         .addParm(iData('count', '10i0', '1'))
         .addParm(iData('valueName', '10A', sysvalue['name']))
-        .addParm(
-            iDS('ERRC0100_t', {'len': 'errlen'})
-            .addData(iData('bytesProvided', '10i0', '', {'setlen': 'errlen'}))
-            .addData(iData('bytesAvailable', '10i0', ''))
-            .addData(iData('messageID', '7A', ''))
-            .addData(iData('reserved', '1A', ''))
-        )
+        .addParm(error_code_parm())
     )
     itool.call(itransport)
 
@@ -363,24 +401,71 @@ def get_system_value(imodule, sysvaluename, expect=None, check='equal'):
 
     if 'success' in qwcrsval:
         qwcrsval_t = qwcrsval['QWCRSVAL_t']
-        sysvalue['msg'] = qwcrsval['success']
         ibmi_util.log_debug(str(qwcrsval_t), sys._getframe().f_code.co_name)
-        if int(qwcrsval_t['count']) > 0:
-            sysvalue['value'] = qwcrsval_t['data']
-            if 'expect' in sysvalue:
-                sysvalue['compliant'] = chk_system_value(
-                    sysvalue['value'], sysvalue['expect'], check)
-                if sysvalue['compliant'] is False:
-                    sysvalue['msg'] = 'Compliant check failed'
-                    sysvalue['rc'] = -2
-                    return sysvalue
-            ibmi_util.log_debug(str(sysvalue), sys._getframe().f_code.co_name)
-        return sysvalue
+        value = qwcrsval_t['data'] if int(qwcrsval_t['count']) > 0 else None
+        return set_system_value(sysvalue, qwcrsval['success'], value)
     sysvalue['msg'] = qwcrsval['error']
     sysvalue['rc'] = -1
     return sysvalue
 
 
+def get_system_values(imodule, names):
+    '''Retrieves the system values of names, known names without duplicates, by one QWCRSVAL call.
+    Returns a dict of name to the value and the message of the call, or None if the values are
+    not returned in the layout expected, e.g. a value is not available on the release. The data of
+    all the types are multiples of 4 bytes, so the table entries follow each other without padding.
+    A character value may be shorter than its type, e.g. the 2 bytes of QSECURITY in a 4A entry,
+    the bytes after its length are the padding of the entry'''
+    if not names:
+        return {}
+    receiver = iDS('QWCRSVAL_t', {'len': 'qwcrslen', 'io': 'out'}).addData(iData('count', '10i0', ''))
+    for idx in range(len(names)):
+        receiver.addData(iData(f'offset{idx}', '10i0', ''))
+    for idx, name in enumerate(names):
+        (receiver
+         .addData(iData(f'sysvalue{idx}', '10A', ''))
+         .addData(iData(f'dataType{idx}', '1A', ''))
+         .addData(iData(f'infoStatus{idx}', '1A', ''))
+         .addData(iData(f'length{idx}', '10i0', ''))
+         .addData(iData(f'data{idx}', sysval_types[name], '')))
+    value_names = iDS('valueNames')
+    for idx, name in enumerate(names):
+        value_names.addData(iData(f'valueName{idx}', '10A', name))
+
+    itool = iToolKit()
+    itool.add(
+        iPgm('qwcrsval', 'QWCRSVAL', {'lib': 'QSYS'})
+        .addParm(receiver)
+        .addParm(iData('rcvlen', '10i0', '', {'setlen': 'qwcrslen'}))
+        .addParm(iData('count', '10i0', str(len(names))))
+        .addParm(value_names)
+        .addParm(error_code_parm())
+    )
+    itool.call(DatabaseTransport(imodule.get_connection()))
+
+    qwcrsval = itool.dict_out('qwcrsval')
+    ibmi_util.log_debug(str(qwcrsval), sys._getframe().f_code.co_name)
+    if 'success' not in qwcrsval:
+        return None
+    qwcrsval_t = qwcrsval['QWCRSVAL_t']
+    if int(qwcrsval_t['count']) != len(names):
+        return None
+    values = {}
+    offset = 4 + 4 * len(names)
+    for idx, name in enumerate(names):
+        length = type_length(sysval_types[name])
+        data_length = int(qwcrsval_t[f'length{idx}'])
+        if (int(qwcrsval_t[f'offset{idx}']) != offset or qwcrsval_t[f'sysvalue{idx}'].strip() != name
+                or data_length > length):
+            return None
+        data = qwcrsval_t[f'data{idx}']
+        if sysval_types[name] != '10i0':
+            data = data[:data_length]
+        values[name] = (data, qwcrsval['success'])
+        offset += 16 + length
+    return values
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
@@ -407,7 +492,8 @@ def main():
         rc=0,
         message='',
         sysval=[],
-        fail_list=[]
+        fail_list=[],
+        calls=0
     )
     rc = 0
 
@@ -417,9 +503,28 @@ def main():
     except Exception as inst:
         module.fail_json(rc=999, msg=f'Exception occurred: {inst}')
 
-    for value in sysvalue:
-        sysval = get_system_value(
-            ibmi_module, value.get('name'), value.get('expect'), value.get('check'))
+    sysvals = [new_system_value(value.get('name'), value.get('expect'), value.get('check')) for value in sysvalue]
+    names = []
+    for sysval in sysvals:
+        if sysval['rc'] == 0 and sysval['name'] not in names:
+            names.append(sysval['name'])
+    try:
+        if names:
+            result['calls'] += 1
+        values = get_system_values(ibmi_module, names)
+    except Exception as inst:
+        ibmi_util.log_info(f'Retrieving the system values by one call failed: {inst}', module._name)
+        values = None
+
+    for value, sysval in zip(sysvalue, sysvals):
+        if sysval['rc'] == 0:
+            if values is not None:
+                set_system_value(sysval, values[sysval['name']][1], values[sysval['name']][0])
+            else:
+                # retrieve the values one by one, e.g. one of them is not available on the release
+                result['calls'] += 1
+                sysval = get_system_value(
+                    ibmi_module, value.get('name'), value.get('expect'), value.get('check'))
         if sysval['rc'] < 0:
             rc = sysval['rc']
             result['fail_list'].append(sysval)
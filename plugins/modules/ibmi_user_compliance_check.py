@@ -24,10 +24,12 @@ description:
   - User can input multi value for the multi-value fields. It includes field
   - SPECIAL_AUTHORITIES, USER_ACTION_AUDIT_LEVEL, USER_OPTIONS, SUPPLEMENTAL_GROUP_LIST, LOCALE_JOB_ATTRIBUTES.
   - If some fields value do not match the user's expected value, the list of users will be returned
+  - The users are checked by one SQL statement, the list of users is passed in a temporary table.
 options:
   users:
     description:
       - Specifies a list of user names.
+      - Specify C(*ALL) to check all the user profiles.
     type: list
     elements: str
     required: yes
@@ -163,15 +165,30 @@ sql1:
     type: str
     sample: 'select * from Persons'
 sql2:
-    description: The sql statement executed by the task.
+    description: Empty, the users are checked by the statement of sql1.
     returned: always
     type: str
-    sample: 'select * from Persons'
+    sample: ''
 rc:
     description: The return code (0 means success, non-zero means failure)
     returned: always
     type: int
     sample: 255
+start:
+    description: The user compliance check start time.
+    returned: always
+    type: str
+    sample: '2019-12-02 11:07:53.757435'
+end:
+    description: The user compliance check end time.
+    returned: always
+    type: str
+    sample: '2019-12-02 11:07:54.064969'
+delta:
+    description: The user compliance check delta time.
+    returned: always
+    type: str
+    sample: '0:00:00.307534'
 result_set:
     description: The result set of user information includes all fields specified by user.
     returned: When rc as 0(success) and the value of field of user who is specified by users parameter does not match the user's expected value
@@ -295,6 +312,41 @@ parmname_array = [
 ]
 
 
+# The fields of several values separated by blanks, a user matches if the values are the expected ones in any order
+MULTI_VALUE_FIELDS = [
+    'SPECIAL_AUTHORITIES',
+    'USER_ACTION_AUDIT_LEVEL',
+    'USER_OPTIONS',
+    'SUPPLEMENTAL_GROUP_LIST',
+    'LOCALE_JOB_ATTRIBUTES',
+]
+NUMERIC_FIELDS = [
+    'SIGN_ON_ATTEMPTS_NOT_VALID',
+    'PASSWORD_EXPIRATION_INTERVAL',
+    'DAYS_UNTIL_PASSWORD_EXPIRES',
+    'SUPPLEMENTAL_GROUP_COUNT',
+    'MAXIMUM_ALLOWED_STORAGE',
+    'STORAGE_USED',
+    'MESSAGE_QUEUE_SEVERITY',
+    'USER_ID_NUMBER',
+    'GROUP_ID_NUMBER',
+    'USER_EXPIRATION_INTERVAL',
+    'DAYS_USED_COUNT',
+    'SIZE',
+]
+# The fields compared without a null check
+NOT_NULL_FIELDS = [
+    'SUPPLEMENTAL_GROUP_COUNT',
+    'AUTHORITY_COLLECTION_ACTIVE',
+    'AUTHORITY_COLLECTION_REPOSITORY_EXISTS',
+]
+ALL_USERS = '*ALL'
+USERS_TABLE = 'SESSION.ANSIBLE_COMPLIANCE_USERS'
+# Users inserted into USERS_TABLE by one statement
+IBMi_USERS_INSERT_BATCH_SIZE = 500
+MISMATCH_COLUMN = 'ANSIBLE_FIELD_MISMATCH'
+
+
 def is_number(str):
     try:
         if str == 'NaN':
@@ -305,80 +357,102 @@ def is_number(str):
         return False
 
 
-def build_sql(fields, users):
-
-    # sql1_part1 is built for adding seclet column
-    sql1_part1 = "SELECT AUTHORIZATION_NAME"
-    # sql1_part2 is built for condition part
-    sql1_part2 = " FROM QSYS2.USER_INFO WHERE ("
-
-    need_sql2 = False
-
-    counter1 = 1
-    counter2 = 1
+def build_rules(fields):
+    '''Returns the checks of the multi-value fields and HOME_DIRECTORY, done on the rows fetched,
+    a list of (field, expected values as a set, expected values, check home directory)'''
+    expected = {}
     for field in fields:
-        sql1_part1 = sql1_part1 + ", " + field['name'].upper()
-        if (field['name'].upper() == 'SPECIAL_AUTHORITIES' or
-                field['name'].upper() == 'USER_ACTION_AUDIT_LEVEL' or
-                field['name'].upper() == 'USER_OPTIONS' or
-                field['name'].upper() == 'SUPPLEMENTAL_GROUP_LIST' or
-                field['name'].upper() == 'LOCALE_JOB_ATTRIBUTES' or
-                field['name'].upper() == 'HOME_DIRECTORY'):
-            need_sql2 = True
-            counter2 += 1
+        name = field['name'].upper()
+        if name in MULTI_VALUE_FIELDS or name == 'HOME_DIRECTORY':
+            expected[name] = list(filter(None, field['expect']))
+    rules = []
+    for name in MULTI_VALUE_FIELDS + ['HOME_DIRECTORY']:
+        if name in expected:
+            rules.append((name, set(expected[name]), expected[name], name == 'HOME_DIRECTORY'))
+    return rules
+
+
+def row_mismatch(row, rules):
+    '''Returns True if a field of the rules does not have its expected values. A multi-value field
+    matches if it has as many values as expected and each of them is expected'''
+    for name, expect_set, expect_list, home_directory in rules:
+        if home_directory:
+            if not expect_list:
+                if row[name].strip() != '':
+                    return True
+            elif expect_list[0].upper() != row[name].upper():
+                return True
         else:
-            if (counter1 == 1):
-                if (field['expect'][0].strip() == ''):
-                    sql1_part2 = sql1_part2 + field['name'].upper() + " is not null"
-                else:
-                    if (field['name'].upper() == 'SUPPLEMENTAL_GROUP_COUNT' or
-                            field['name'].upper() == 'AUTHORITY_COLLECTION_ACTIVE' or
-                            field['name'].upper() == 'AUTHORITY_COLLECTION_REPOSITORY_EXISTS'):
-                        sql1_part2 = sql1_part2 + field['name'].upper() + " <> '" + field['expect'][0].upper() + "'"
-                    else:
-                        sql1_part2 = sql1_part2 + "(" + field['name'].upper() + " <> '" + field['expect'][0].upper() +\
-                            "' OR " + field['name'].upper() + " is null)"
-            else:
-                if (field['expect'][0].strip() == ''):
-                    sql1_part2 = sql1_part2 + " OR " + field['name'].upper() + " is not null"
-                else:
-                    if (field['name'].upper() == 'SUPPLEMENTAL_GROUP_COUNT' or
-                            field['name'].upper() == 'AUTHORITY_COLLECTION_ACTIVE' or
-                            field['name'].upper() == 'AUTHORITY_COLLECTION_REPOSITORY_EXISTS'):
-                        sql1_part2 = sql1_part2 + " OR " + field['name'].upper() + " <> '" + field['expect'][0].upper() + "'"
-                    else:
-                        sql1_part2 = sql1_part2 + " OR " + "(" + field['name'].upper() + " <> '" + field['expect'][0].upper() + \
-                            "' OR " + field['name'].upper() + " is null)"
-            counter1 += 1
-
-    sql1 = ""
-    sql2 = ""
-    # build sql1 for fetching the no matched record
-    if counter1 > 1:
-        sql1 = sql1_part1 + sql1_part2 + ")"
-        counter1 = 1
-        sql1 = sql1 + " AND AUTHORIZATION_NAME IN("
-        for user in users:
-            if (counter1 == 1):
-                sql1 = sql1 + "'" + user.upper() + "'"
-            else:
-                sql1 = sql1 + ", '" + user.upper() + "'"
-            counter1 += 1
-        sql1 = sql1 + ")"
-
-    # build sql2 for fetching the value of multi-value field
-    if need_sql2 and counter2 > 1:
-        sql2 = sql1_part1 + " FROM QSYS2.USER_INFO WHERE AUTHORIZATION_NAME IN("
-        counter2 = 1
-        for user in users:
-            if (counter2 == 1):
-                sql2 = sql2 + "'" + user.upper() + "'"
-            else:
-                sql2 = sql2 + ", '" + user.upper() + "'"
-            counter2 += 1
-        sql2 = sql2 + ")"
-
-    return sql1, sql2
+            values = row[name].split()
+            if len(values) != len(expect_list) or not expect_set.issuperset(values):
+                return True
+    return False
+
+
+def build_sql(fields, all_users):
+    '''Returns the statement to fetch the users and its parameters. The users whose single-value fields
+    do not have the expected values are selected by the statement. With multi-value fields, all the users
+    are selected and MISMATCH_COLUMN tells whether a single-value field does not match'''
+    columns = ["AUTHORIZATION_NAME"]
+    conditions = []
+    parameters = []
+    has_rules = False
+    for field in fields:
+        name = field['name'].upper()
+        columns.append(name)
+        if name in MULTI_VALUE_FIELDS or name == 'HOME_DIRECTORY':
+            has_rules = True
+        elif field['expect'][0].strip() == '':
+            conditions.append(f"{name} IS NOT NULL")
+        elif name in NOT_NULL_FIELDS:
+            conditions.append(f"{name} <> ?")
+            parameters.append(field['expect'][0].upper())
+        else:
+            conditions.append(f"({name} <> ? OR {name} IS NULL)")
+            parameters.append(field['expect'][0].upper())
+
+    condition = " OR ".join(conditions)
+    user_filter = "" if all_users else f"AUTHORIZATION_NAME IN (SELECT AUTHORIZATION_NAME FROM {USERS_TABLE})"
+    if has_rules:
+        if conditions:
+            columns.append(f"CASE WHEN ({condition}) THEN 1 ELSE 0 END AS {MISMATCH_COLUMN}")
+        where = user_filter
+    else:
+        where = f"({condition})" + (" AND " + user_filter if user_filter else "")
+    sql = "SELECT " + ", ".join(columns) + " FROM QSYS2.USER_INFO"
+    if where:
+        sql = sql + " WHERE " + where
+    return sql, parameters, has_rules
+
+
+def load_users(ibmi_module, users):
+    '''Inserts the users into the temporary table USERS_TABLE, so the statement of build_sql() does
+    not carry a list of the names in its text'''
+    cursor = ibmi_module.get_connection().cursor()
+    try:
+        cursor.execute(f"DECLARE GLOBAL TEMPORARY TABLE {USERS_TABLE} (AUTHORIZATION_NAME VARCHAR(10) NOT NULL) "
+                       "ON COMMIT PRESERVE ROWS WITH REPLACE NOT LOGGED")
+        names = sorted(set(user.upper() for user in users))
+        for i in range(0, len(names), IBMi_USERS_INSERT_BATCH_SIZE):
+            batch = names[i:i + IBMi_USERS_INSERT_BATCH_SIZE]
+            cursor.execute(f"INSERT INTO {USERS_TABLE} (AUTHORIZATION_NAME) VALUES " + ", ".join("(?)" for name in batch), batch)
+    finally:
+        cursor.close()
+
+
+def check_users(ibmi_module, sql, parameters, rules, has_rules):
+    '''Fetches the rows of sql and checks each row once as it is fetched. Returns the users whose
+    fields do not match, first the users with a single-value field not matching, then the others'''
+    mismatched = []
+    rule_mismatched = []
+    for row in ibmi_module.db_iter_result_list(sql, parameters=parameters):
+        if not has_rules:
+            mismatched.append(row)
+        elif row.pop(MISMATCH_COLUMN, 0):
+            mismatched.append(row)
+        elif row_mismatch(row, rules):
+            rule_mismatched.append(row)
+    return mismatched + rule_mismatched
 
 
 def main():
@@ -398,15 +472,6 @@ def main():
     joblog = module.params['joblog']
     become_user = module.params['become_user']
     become_user_password = module.params['become_user_password']
-    # initialize variables
-    check_special_authorities = False
-    check_user_action_audit_level = False
-    check_user_option = False
-    check_supplemental_group_list = False
-    check_locale_job_attributes = False
-    check_home_directory = False
-    out1 = []
-    out2 = []
     # check input value
     for field in fields:
         if field.get('name') is None:
@@ -429,203 +494,65 @@ def main():
         if (field['name'].upper() not in parmname_array):
             module.fail_json(rc=ibmi_util.IBMi_PARAM_NOT_VALID,
                              msg="Input attribute name is not available")
-        if field['name'].upper() == 'SPECIAL_AUTHORITIES':
-            check_special_authorities = True
-            special_authorities_expect = list(filter(None, field['expect']))
-        elif field['name'].upper() == 'USER_ACTION_AUDIT_LEVEL':
-            check_user_action_audit_level = True
-            user_action_audit_level_expect = list(filter(None, field['expect']))
-        elif field['name'].upper() == 'USER_OPTIONS':
-            check_user_option = True
-            user_option_expect = list(filter(None, field['expect']))
-        elif field['name'].upper() == 'SUPPLEMENTAL_GROUP_LIST':
-            check_supplemental_group_list = True
-            supplemental_group_list_expect = list(filter(None, field['expect']))
-        elif field['name'].upper() == 'LOCALE_JOB_ATTRIBUTES':
-            check_locale_job_attributes = True
-            locale_job_attributes_expect = list(filter(None, field['expect']))
-        elif field['name'].upper() == 'HOME_DIRECTORY':
-            check_home_directory = True
-            home_directory_expect = list(filter(None, field['expect']))
-        elif (field['name'].upper() == 'SIGN_ON_ATTEMPTS_NOT_VALID' or
-                field['name'].upper() == 'PASSWORD_EXPIRATION_INTERVAL' or
-                field['name'].upper() == 'DAYS_UNTIL_PASSWORD_EXPIRES' or
-                field['name'].upper() == 'SUPPLEMENTAL_GROUP_COUNT' or
-                field['name'].upper() == 'MAXIMUM_ALLOWED_STORAGE' or
-                field['name'].upper() == 'STORAGE_USED' or
-                field['name'].upper() == 'MESSAGE_QUEUE_SEVERITY' or
-                field['name'].upper() == 'USER_ID_NUMBER' or
-                field['name'].upper() == 'GROUP_ID_NUMBER' or
-                field['name'].upper() == 'USER_EXPIRATION_INTERVAL' or
-                field['name'].upper() == 'DAYS_USED_COUNT' or
-                field['name'].upper() == 'SIZE'):
+        if field['name'].upper() in NUMERIC_FIELDS:
             if len(field['expect']) > 1:
                 module.fail_json(rc=256, msg=f"Field {field['name'].upper()} should be only one value")
             if field['expect'][0].strip() != '' and not is_number(field['expect'][0]):
                 module.fail_json(rc=256, msg=f"Field {field['name'].upper()} should be numerical")
 
+    all_users = any(user.strip().upper() == ALL_USERS for user in users)
+
     try:
         ibmi_module = imodule.IBMiModule(become_user_name=become_user, become_user_password=become_user_password)
     except Exception as inst:
         message = f'Exception occurred: {inst}'
         module.fail_json(rc=999, msg=message)
 
-    # Check to see if the user exists
+    # Check to see if the user exists, the commands of a batch of users run by one XMLSERVICE call,
+    # a missing user does not stop the checks of the users after it
     user_not_existed = []
-    for user in users:
-        chkobj_cmd = f'QSYS/CHKOBJ OBJ(QSYS/{user}) OBJTYPE(*USRPRF)'
-        ibmi_util.log_info("Command to run: " + chkobj_cmd, module._name)
-        rc, out, err, job_log = ibmi_module.itoolkit_run_command_once(chkobj_cmd)
-        if rc != 0:
-            user_not_existed.append(user)
-
-    sql1, sql2 = build_sql(fields, users)
-    if sql1 != "":
-        startd = datetime.datetime.now()
-        rc, out1, err = ibmi_module.itoolkit_run_sql(sql1)
-        if joblog or (rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS):
-            job_log = ibmi_module.itoolkit_get_job_log(startd)
-        else:
-            job_log = []
-
-        if rc:
-            result_failed = dict(
-                stderr=err,
-                sql1=sql1,
-                sql2=sql2,
-                rc=rc,
-                job_log=job_log,
-            )
-            message = f'non-zero return code:{rc}'
-            module.fail_json(msg=message, **result_failed)
-
-    if sql2 != "":
-        # fetch records of all users information specified by user
-        startd = datetime.datetime.now()
-        rc, out2, err = ibmi_module.itoolkit_run_sql(sql2)
-        if joblog or (rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS):
-            job_log = ibmi_module.itoolkit_get_job_log(startd)
-        else:
-            job_log = []
-
-        if rc:
-            result_failed = dict(
-                stderr=err,
-                sql1=sql1,
-                sql2=sql2,
-                rc=rc,
-                job_log=job_log,
-            )
-            message = f'non-zero return code:{rc}'
-            module.fail_json(msg=message, **result_failed)
-
-        if out2:
-            real_out2 = []
-            for item in out2:
-                # compare the column SPECIAL_AUTHORITIES
-                if check_special_authorities:
-                    special_authorities_list = item['SPECIAL_AUTHORITIES'].split()
-                    not_expected_value = False
-                    if (len(special_authorities_list) == len(special_authorities_expect)):
-                        for special_authorities_value in special_authorities_list:
-                            if special_authorities_value not in special_authorities_expect:
-                                not_expected_value = True
-                                break
-                    else:
-                        not_expected_value = True
-
-                    if not_expected_value:
-                        real_out2.append(item)
-                        continue
-
-                # compare the column USER_ACTION_AUDIT_LEVEL
-                if check_user_action_audit_level:
-                    user_action_audit_level_list = item['USER_ACTION_AUDIT_LEVEL'].split()
-                    not_expected_value = False
-                    if (len(user_action_audit_level_list) == len(user_action_audit_level_expect)):
-                        for user_action_audit_level_value in user_action_audit_level_list:
-                            if user_action_audit_level_value not in user_action_audit_level_expect:
-                                not_expected_value = True
-                                break
-                    else:
-                        not_expected_value = True
-
-                    if not_expected_value:
-                        real_out2.append(item)
-                        continue
-
-                # compare the column USER_OPTIONS
-                if check_user_option:
-                    user_option_list = item['USER_OPTIONS'].split()
-                    not_expected_value = False
-                    if (len(user_option_list) == len(user_option_expect)):
-                        for user_option_value in user_option_list:
-                            if user_option_value not in user_option_expect:
-                                not_expected_value = True
-                                break
-                    else:
-                        not_expected_value = True
-
-                    if not_expected_value:
-                        real_out2.append(item)
-                        continue
-
-                # compare the column SUPPLEMENTAL_GROUP_LIST
-                if check_supplemental_group_list:
-                    supplemental_group_list = item['SUPPLEMENTAL_GROUP_LIST'].split()
-                    not_expected_value = False
-                    if (len(supplemental_group_list) == len(supplemental_group_list_expect)):
-                        for supplemeental_group_value in supplemental_group_list:
-                            if supplemeental_group_value not in supplemental_group_list_expect:
-                                not_expected_value = True
-                                break
-                    else:
-                        not_expected_value = True
-
-                    if not_expected_value:
-                        real_out2.append(item)
-                        continue
-
-                # compare the column LOCALE_JOB_ATTRIBUTES
-                if check_locale_job_attributes:
-                    locale_job_attributes_list = item['LOCALE_JOB_ATTRIBUTES'].split()
-                    not_expected_value = False
-                    if (len(locale_job_attributes_list) == len(locale_job_attributes_expect)):
-                        for locale_job_attributes_value in locale_job_attributes_list:
-                            if locale_job_attributes_value not in locale_job_attributes_expect:
-                                not_expected_value = True
-                                break
-                    else:
-                        not_expected_value = True
-
-                    if not_expected_value:
-                        real_out2.append(item)
-                        continue
-
-                if check_home_directory:
-                    home_directory = item['HOME_DIRECTORY']
-                    if len(home_directory_expect) == 0:
-                        if home_directory.strip() != '':
-                            real_out2.append(item)
-                            continue
-                    else:
-                        if home_directory_expect[0].upper() != home_directory.upper():
-                            real_out2.append(item)
-                            continue
-            if out1:
-                out1_name_list = []
-                for item in out1:
-                    out1_name_list.append(item['AUTHORIZATION_NAME'].upper())
-                out = out1
-                for item in real_out2:
-                    if item['AUTHORIZATION_NAME'].upper() not in out1_name_list:
-                        out.append(item)
-            else:
-                out = real_out2
-        else:
-            out = out1
+    checkd = datetime.datetime.now()
+    if not all_users:
+        chkobj_cmds = [f'QSYS/CHKOBJ OBJ(QSYS/{user}) OBJTYPE(*USRPRF)' for user in users]
+        ibmi_util.log_info(f"Commands to run: {len(chkobj_cmds)} CHKOBJ of the users", module._name)
+        for user, (rc, out, err) in zip(users, ibmi_module.itoolkit_run_command_batch(chkobj_cmds, stop_on_error=False)):
+            if rc != 0:
+                user_not_existed.append(user)
+
+    sql1, parameters, has_rules = build_sql(fields, all_users)
+    sql2 = ""
+    rules = build_rules(fields)
+    startd = datetime.datetime.now()
+    try:
+        if not all_users:
+            load_users(ibmi_module, users)
+        out = check_users(ibmi_module, sql1, parameters, rules, has_rules)
+        rc = ibmi_util.IBMi_COMMAND_RC_SUCCESS
+        err = None
+    except Exception as inst:
+        out = []
+        rc = ibmi_util.IBMi_SQL_RC_ERROR
+        err = str(inst)
+    endd = datetime.datetime.now()
+    delta = endd - checkd
+    if joblog or (rc != ibmi_util.IBMi_COMMAND_RC_SUCCESS):
+        job_log = ibmi_module.itoolkit_get_job_log(startd)
     else:
-        out = out1
+        job_log = []
+
+    if rc:
+        result_failed = dict(
+            stderr=err,
+            sql1=sql1,
+            sql2=sql2,
+            rc=rc,
+            job_log=job_log,
+            start=str(checkd),
+            end=str(endd),
+            delta=str(delta),
+        )
+        message = f'non-zero return code:{rc}'
+        module.fail_json(msg=message, **result_failed)
 
     if len(user_not_existed) == 0:
         result_success = dict(
@@ -634,6 +561,9 @@ def main():
             sql2=sql2,
             rc=rc,
             job_log=job_log,
+            start=str(checkd),
+            end=str(endd),
+            delta=str(delta),
         )
     else:
         result_success = dict(
@@ -643,6 +573,9 @@ def main():
             sql2=sql2,
             rc=rc,
             job_log=job_log,
+            start=str(checkd),
+            end=str(endd),
+            delta=str(delta),
         )
     module.exit_json(**result_success)
 